@@ -2,7 +2,6 @@
 import os
 import traceback
 import logging
-from threading import Thread
 
 import firstcut
 from flask import Flask, request, jsonify
@@ -17,6 +16,18 @@ CORS(app)
 # CONFIG
 TMP_DIR = './tmp'  # directory where audio/video files are temporarily stored
 KEEP_LOG_SEC = int(os.getenv('KEEP_LOG_SEC', '180'))
+STREAM_SAMPLE_LENGTH = int(os.getenv('STREAM_SAMPLE_LENGTH', '30000000'))  # audio longer than this is streamed
+MAX_SAMPLE_LENGTH = 30000000  # max sample length to process on memory
+MAX_STREAM_SAMPLE_LENGTH = int(os.getenv('MAX_STREAM_SAMPLE_LENGTH', '1000000000'))  # max sample length to stream
+NOISE_PROFILE_DIR = os.getenv('NOISE_PROFILE_DIR', './noise_profile')  # directory of noise profile library
+CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', str(pow(2, 32))))  # byte budget of decoded audio cache
+N_WORKERS = int(os.getenv('N_WORKERS', '2'))  # number of jobs to process concurrently
+MAX_QUEUE_SIZE = int(os.getenv('MAX_QUEUE_SIZE', '16'))  # number of jobs waiting for a worker
+WORKER_BACKEND = os.getenv('WORKER_BACKEND', 'thread')  # `thread` or `process` to run the jobs
+RESULT_CACHE_SEC = float(os.getenv('RESULT_CACHE_SEC', '600'))  # time to reuse the result of identical request
+PREVIEW_CACHE_BYTES = int(os.getenv('PREVIEW_CACHE_BYTES', str(pow(2, 30))))  # byte budget of previews in memory
+N_PREVIEW_WORKERS = int(os.getenv('N_PREVIEW_WORKERS', '2'))  # number of files to decode for preview concurrently
+MAX_PREVIEW_PARAMETERS = 100
 PORT = int(os.getenv("PORT", "8008"))
 FIREBASE_SERVICE_ACCOUNT = os.getenv('FIREBASE_SERVICE_ACCOUNT', None)
 FIREBASE_APIKEY = os.getenv('FIREBASE_APIKEY', None)
@@ -27,13 +38,17 @@ FIREBASE_GMAIL = os.getenv('FIREBASE_GMAIL', None)
 FIREBASE_PASSWORD = os.getenv('FIREBASE_PASSWORD', None)
 
 
-def main():
-    """ Main API server """
-    job_status_instance = firstcut.Status(keep_log_second=KEEP_LOG_SEC)
+# resources used by the jobs, which are set by `init_worker` in each process running the jobs
+job_status_instance = None
+decode_cache = None
+noise_profile_library = None
+firebase = None
+
 
-    # connect to firebaase
+def connect_firebase():
+    """ connect to firebase (None to run without it) """
     try:
-        firebase = firstcut.FireBaseConnector(
+        return firstcut.FireBaseConnector(
                 apiKey=FIREBASE_APIKEY,
                 authDomain=FIREBASE_AUTHDOMAIN,
                 databaseURL=FIREBASE_DATABASEURL,
@@ -43,69 +58,172 @@ def main():
                 password=FIREBASE_PASSWORD)
     except Exception:
         logging.exception('run without FireBase')
-        firebase = None
-
-    def _audio_clip(job_id, file_name, interval, ratio, crossfade, max_sample):
-        """ Audio clipping function
-
-         Parameter
-        ------------
-        job_id: unique job id
-        file_name: file name to process
-        interval: min_interval_sec
-        ratio: cutoff_ratio
-        crossfade: crossfade_sec
-        """
-        try:
-            logging.info('validate file_name')
-            job_status_instance.update(job_id=job_id, progress=0, status='validate file_name')
-            basename = os.path.basename(file_name).split('.')
-            raw_format = basename[-1]
-            name = '.'.join(basename[:-1])
-            if firebase is None:
-                # referring local file
-                if not os.path.exists(file_name):
-                    raise ValueError('file not found: {}'.format(file_name))
-                path_file = file_name
-            else:
-                path_file = os.path.join(TMP_DIR, '{}_{}_raw.{}'.format(name, job_id, raw_format))
-                if not os.path.exists(path_file):
-                    msg = 'download {} from firebase to {}'.format(file_name, path_file)
-                    job_status_instance.update(job_id=job_id, status=msg)
-                    logging.info(msg)
-                    firebase.download(file_name=file_name, path=path_file)
-
-            job_status_instance.update(status='start processing', job_id=job_id, progress=20)
-            logging.info('start processing')
-            editor = firstcut.Editor(path_file, max_sample_length=max_sample)
-            editor.amplitude_clipping(min_interval_sec=interval, cutoff_ratio=ratio, crossfade_sec=crossfade)
-
-            if editor.if_amplitude_clipping:
-                msg = 'save tmp folder: {}'.format(TMP_DIR)
-                job_status_instance.update(job_id=job_id, progress=70, status=msg)
-                logging.info(msg)
-                base_name = '{}_{}_processed'.format(name, job_id)
-                if firebase is None:
-                    file_name = editor.export(os.path.join(TMP_DIR, base_name))
-                    url = ''
-                else:
-                    logging.info('upload to firebase')
-                    job_status_instance.update(job_id=job_id, progress=75, status='upload to firebase')
-                    file_name = editor.export(os.path.join(TMP_DIR, base_name))
-                    url = firebase.upload(file_path=file_name)
-                to_clean = os.path.join(TMP_DIR, '{}_{}_*'.format(name, job_id))
-                msg = 'clean local storage: {}'.format(to_clean)
+        return None
+
+
+def init_worker(status):
+    """ Set the resources used by the jobs
+
+     Parameter
+    ------------
+    status: `firstcut.Status`, or `firstcut.StatusProxy` in a worker process
+    """
+    global job_status_instance, decode_cache, noise_profile_library, firebase
+    job_status_instance = status
+    decode_cache = firstcut.DecodeCache(os.path.join(TMP_DIR, 'cache'), max_bytes=CACHE_MAX_BYTES)
+    noise_profile_library = firstcut.NoiseProfileLibrary(NOISE_PROFILE_DIR)
+    firebase = connect_firebase()
+
+
+def get_source_id(file_name):
+    """ id of the content of the file: ETag on firebase, or content hash of local file (None if it's not available) """
+    if firebase is None:
+        return decode_cache.content_hash(file_name) if os.path.exists(file_name) else None
+    etag = firebase.get_etag(file_name)
+    return None if etag is None else '{}:{}'.format(file_name, etag)
+
+
+def fetch_file(file_name, path_download, source_id, job_id=None):
+    """ Local path of the file: the file itself without firebase, or the file downloaded from firebase
+
+     Parameter
+    ------------
+    file_name: file name to process
+    path_download: path to download the file to, unless the same content is in the cache
+    source_id: id by `get_source_id` (None not to use the cache)
+    job_id: job id to report the download
+    """
+    if firebase is None:
+        # referring local file
+        if not os.path.exists(file_name):
+            raise ValueError('file not found: {}'.format(file_name))
+        return file_name
+    # same content submitted before is in the cache
+    path_file = None if source_id is None else decode_cache.get_source(source_id)
+    if path_file is not None:
+        logging.info('use cached file: {}'.format(path_file))
+        return path_file
+    msg = 'download {} from firebase to {}'.format(file_name, path_download)
+    if job_id is not None:
+        job_status_instance.update(job_id=job_id, status=msg)
+    logging.info(msg)
+    firebase.download(file_name=file_name, path=path_download)
+    if source_id is not None:
+        path_download = decode_cache.register_source(source_id, path_download)
+    return path_download
+
+
+def _audio_clip(job_id, file_name, interval, ratio, crossfade, max_sample, noise_profile_id=None, source_id=None):
+    """ Audio clipping function
+
+     Parameter
+    ------------
+    job_id: unique job id
+    file_name: file name to process
+    interval: min_interval_sec
+    ratio: cutoff_ratio
+    crossfade: crossfade_sec
+    noise_profile_id: noise profile to denoise audio, where the silence is detected on and the output is rendered
+        from the denoised audio
+    source_id: id of the file content by `get_source_id`, given by the request handler
+    max_sample: max sample length of the input (audio processed on memory is also limited by `MAX_SAMPLE_LENGTH`)
+    """
+    try:
+        logging.info('validate file_name')
+        job_status_instance.update(job_id=job_id, progress=0, status='validate file_name')
+        basename = os.path.basename(file_name).split('.')
+        raw_format = basename[-1]
+        name = '.'.join(basename[:-1])
+        path_file = fetch_file(file_name, os.path.join(TMP_DIR, '{}_{}_raw.{}'.format(name, job_id, raw_format)),
+                               source_id=source_id, job_id=job_id)
+
+        job_status_instance.update(status='start processing', job_id=job_id, progress=20)
+        logging.info('start processing')
+        editor = firstcut.Editor(path_file, cache=decode_cache)
+        base_name = '{}_{}_processed'.format(name, job_id)
+        if editor.length > max_sample:
+            raise ValueError('sample data exceeds max sample size: {} > {}'.format(editor.length, max_sample))
+        if not editor.has_video and editor.length > STREAM_SAMPLE_LENGTH and noise_profile_id is None:
+            # long audio is clipped by streaming with bounded memory instead of loading it on memory
+            msg = 'clip by streaming: {} samples'.format(editor.length)
+            job_status_instance.update(job_id=job_id, progress=30, status=msg)
+            logging.info(msg)
+            file_name = os.path.join(TMP_DIR, '{}.{}'.format(base_name, editor.format))
+            firstcut.stream_clip(path_file, file_name, min_interval_sec=interval, cutoff_ratio=ratio,
+                                 crossfade_sec=crossfade)
+        else:
+            if editor.length > MAX_SAMPLE_LENGTH:
+                raise ValueError('sample data exceeds max sample size to process on memory: {} > {}'.format(
+                    editor.length, MAX_SAMPLE_LENGTH))
+            if noise_profile_id is not None:
+                msg = 'noise reduction with profile: {}'.format(noise_profile_id)
+                job_status_instance.update(job_id=job_id, progress=30, status=msg)
                 logging.info(msg)
-                job_status_instance.update(job_id=job_id, progress=95, status=msg)
-                # os.system('rm -rf {}'.format(to_clean))
-            else:
-                url = '' if firebase is None else firebase.get_url(file_name)
-            # update job status
-            job_status_instance.complete(job_id=job_id, url=url, file_name=file_name)
+                editor.noise_reduction(noise_profile=noise_profile_library.load(noise_profile_id))
+            editor.amplitude_clipping(min_interval_sec=interval, cutoff_ratio=ratio, crossfade_sec=crossfade,
+                                      denoised_audio=noise_profile_id is not None)
+            msg = 'save tmp folder: {}'.format(TMP_DIR)
+            job_status_instance.update(job_id=job_id, progress=70, status=msg)
+            logging.info(msg)
+            file_name = editor.export(os.path.join(TMP_DIR, base_name))
 
-        except Exception:
-            job_status_instance.error(job_id=job_id, error_message=traceback.format_exc())
-            logging.exception('raise error')
+        if firebase is None:
+            url = ''
+        else:
+            logging.info('upload to firebase')
+            job_status_instance.update(job_id=job_id, progress=75, status='upload to firebase')
+            url = firebase.upload(file_path=file_name)
+        to_clean = os.path.join(TMP_DIR, '{}_{}_*'.format(name, job_id))
+        msg = 'clean local storage: {}'.format(to_clean)
+        logging.info(msg)
+        job_status_instance.update(job_id=job_id, progress=95, status=msg)
+        # os.system('rm -rf {}'.format(to_clean))
+        # update job status
+        job_status_instance.complete(job_id=job_id, url=url, file_name=file_name)
+
+    except Exception:
+        job_status_instance.error(job_id=job_id, error_message=traceback.format_exc())
+        logging.exception('raise error')
+
+
+def main():
+    """ Main API server """
+    status = firstcut.Status(keep_log_second=KEEP_LOG_SEC)
+    init_worker(status)
+    if WORKER_BACKEND == 'process':
+        # jobs run in worker processes with their own resources (the processes are started by a fork server, so
+        # don't inherit the threads and connections of this process), and report the status through a queue
+        scheduler = firstcut.JobScheduler(n_workers=N_WORKERS, max_queue=MAX_QUEUE_SIZE, backend='process',
+                                          status=status, initializer=init_worker)
+    else:
+        scheduler = firstcut.JobScheduler(n_workers=N_WORKERS, max_queue=MAX_QUEUE_SIZE)
+    request_cache = firstcut.RequestCache(ttl_second=RESULT_CACHE_SEC)
+    status.add_listener(request_cache.finish)
+    preview_cache = firstcut.PreviewCache(max_bytes=PREVIEW_CACHE_BYTES, max_load=N_PREVIEW_WORKERS)
+
+    def get_preview(file_name, max_sample):
+        """ `ClipPreview` of the file from the cache, or the file decoded (through the decode cache) """
+        source_id = get_source_id(file_name)
+
+        def load():
+            basename = os.path.basename(file_name).split('.')
+            path_download = os.path.join(TMP_DIR, '{}_{}_raw.{}'.format(
+                '.'.join(basename[:-1]), firstcut.Status.random_string(), basename[-1]))
+            path_file = fetch_file(file_name, path_download, source_id=source_id)
+            try:
+                editor = firstcut.Editor(path_file, cache=decode_cache)
+                if editor.length > max_sample:
+                    raise ValueError('sample data exceeds max sample size: {} > {}'.format(editor.length, max_sample))
+                return firstcut.ClipPreview(editor)
+            finally:
+                # downloaded file isn't kept unless it's moved to the decode cache
+                if path_file == path_download and os.path.exists(path_download):
+                    os.remove(path_download)
+
+        preview = preview_cache.get(source_id, load)
+        if preview.length > max_sample:
+            raise ValueError('sample data exceeds max sample size: {} > {}'.format(preview.length, max_sample))
+        return preview
 
     @app.route("/audio_clip", methods=["POST"])
     def audio_clip():
@@ -144,9 +262,9 @@ def main():
             return BadRequest(msg)
         logging.info(' * parameter `cutoff_ratio`: {}'.format(cutoff_ratio))
 
-        # parameter
-        max_sample_length = post_body.get('max_sample_length', '30000000')
-        max_sample_length, msg = firstcut.validate_numeric(max_sample_length, 0, 30000000)
+        # parameter: long audio is streamed up to `MAX_STREAM_SAMPLE_LENGTH`
+        max_sample_length = post_body.get('max_sample_length', str(MAX_STREAM_SAMPLE_LENGTH))
+        max_sample_length, msg = firstcut.validate_numeric(max_sample_length, 0, MAX_STREAM_SAMPLE_LENGTH)
         if max_sample_length is None:
             return BadRequest(msg)
         logging.info(' * parameter `max_sample_length`: {}'.format(max_sample_length))
@@ -158,13 +276,93 @@ def main():
             return BadRequest(msg)
         logging.info(' * parameter `crossfade_sec`: {}'.format(crossfade_sec))
 
+        # parameter
+        noise_profile_id = post_body.get('noise_profile_id', None)
+        if noise_profile_id is not None and noise_profile_id not in noise_profile_library:
+            return BadRequest('unknown noise profile: {}'.format(noise_profile_id))
+        logging.info(' * parameter `noise_profile_id`: {}'.format(noise_profile_id))
+
         # run process
         job_id = job_status_instance.register_job()
         logging.info(' - job_id: {}'.format(job_id))
-        args = [job_id, file_name, min_interval_sec, cutoff_ratio, crossfade_sec, max_sample_length]
-        thread = Thread(target=_audio_clip, args=args)
-        thread.start()
-        return jsonify(job_id=job_id)
+
+        # identical request is attached to the job in progress, or gets the result of the completed job
+        source_id = get_source_id(file_name)
+        if source_id is not None:
+            key = firstcut.RequestCache.request_key(
+                source_id, file_name=file_name, min_interval_sec=min_interval_sec, cutoff_ratio=cutoff_ratio,
+                crossfade_sec=crossfade_sec, max_sample_length=max_sample_length, noise_profile_id=noise_profile_id)
+            attached_id, result = request_cache.attach(key, job_id)
+            if attached_id != job_id:
+                if result is None:
+                    job_status_instance.remove(job_id)
+                    logging.info(' - attach to job in progress: {}'.format(attached_id))
+                    return jsonify(job_id=attached_id, queue_position=scheduler.position(attached_id))
+                logging.info(' - use result of job: {}'.format(attached_id))
+                job_status_instance.complete(job_id=job_id, **result)
+                return jsonify(job_id=job_id, queue_position=None)
+
+        args = [job_id, file_name, min_interval_sec, cutoff_ratio, crossfade_sec, max_sample_length, noise_profile_id,
+                source_id]
+        job_status_instance.update(job_id=job_id, status='queued')
+        try:
+            position = scheduler.submit(job_id, _audio_clip, args)
+        except firstcut.QueueFullError as e:
+            job_status_instance.remove(job_id)
+            request_cache.discard(job_id)
+            logging.info(' - rejected: {}'.format(e))
+            response = jsonify(error_message='server is busy: {}'.format(e))
+            response.status_code = 503
+            response.headers['Retry-After'] = str(scheduler.retry_after)
+            return response
+        return jsonify(job_id=job_id, queue_position=position)
+
+    @app.route("/preview", methods=["POST"])
+    def preview():
+        """ Preview of audio clip: intervals to drop and edited duration for each parameter, without rendering """
+        if request.headers.get("Content-Type") != 'application/json':
+            return BadRequest("Bad Content-Type `{}`. Only application/json is allowed.".format(request.headers))
+        post_body = request.get_json()
+        file_name = post_body.get('file_name', '')
+        if file_name == "":
+            return BadRequest('Parameter `file_name` is required')
+        if not len(os.path.basename(file_name).split('.')) > 1:
+            return BadRequest('file dose not have any identifiers: {}'.format(file_name))
+
+        # parameter: a list of parameters, or a single parameter
+        parameters = post_body.get('parameters', [post_body])
+        if type(parameters) is not list or not 0 < len(parameters) <= MAX_PREVIEW_PARAMETERS:
+            return BadRequest('`parameters` should be a list of up to {} parameters'.format(MAX_PREVIEW_PARAMETERS))
+        validated = []
+        for p in parameters:
+            if type(p) is not dict:
+                return BadRequest('parameter should be an object: {}'.format(p))
+            min_interval_sec, msg = firstcut.validate_numeric(p.get('min_interval_sec', '0.12'), 0.0, 10000, True)
+            if min_interval_sec is None:
+                return BadRequest(msg)
+            cutoff_ratio, msg = firstcut.validate_numeric(p.get('cutoff_ratio', '0.9'), 0.0, 1.0, is_float=True)
+            if cutoff_ratio is None:
+                return BadRequest(msg)
+            crossfade_sec, msg = firstcut.validate_numeric(p.get('crossfade_sec', '0.1'), 0.0, 10000, is_float=True)
+            if crossfade_sec is None:
+                return BadRequest(msg)
+            validated.append(dict(min_interval_sec=min_interval_sec, cutoff_ratio=cutoff_ratio,
+                                  crossfade_sec=crossfade_sec))
+        max_sample_length, msg = firstcut.validate_numeric(
+            post_body.get('max_sample_length', str(MAX_SAMPLE_LENGTH)), 0, MAX_SAMPLE_LENGTH)
+        if max_sample_length is None:
+            return BadRequest(msg)
+
+        try:
+            clip_preview = get_preview(file_name, max_sample_length)
+        except firstcut.QueueFullError as e:
+            response = jsonify(error_message='server is busy: {}'.format(e))
+            response.status_code = 503
+            response.headers['Retry-After'] = '1'
+            return response
+        except ValueError as e:
+            return BadRequest(str(e))
+        return jsonify(duration=clip_preview.length_sec, previews=clip_preview.preview(validated))
 
     @app.route("/job_status", methods=["GET"])
     def job_status():
@@ -176,20 +374,33 @@ def main():
         if job_id == '':
             return BadRequest('`job_id` is required.')
         status = job_status_instance.get_status(job_id)
+        position = scheduler.position(job_id)
+        if position is not None:
+            status = dict(status, queue_position=position)
         return jsonify(status)
 
     @app.route("/drop_job_status", methods=["GET"])
     def drop_job_status():
         """ drop completed job statuses """
-        before = len(job_status_instance.get_job_ids)
-        job_status_instance.drop()
-        after = len(job_status_instance.get_job_ids)
-        return jsonify(status='drop {} job status'.format(before - after))
+        dropped = job_status_instance.drop()
+        return jsonify(status='drop {} job status'.format(len(dropped)))
 
     @app.route("/job_ids", methods=["GET"])
     def job_ids():
-        """ get list of job ids """
-        return jsonify(job_ids=job_status_instance.get_job_ids)
+        """ get list of job ids (paginated by `offset` and `limit`) """
+        offset, msg = firstcut.validate_numeric(request.args.get('offset', '0'), 0, pow(2, 31))
+        if offset is None:
+            return BadRequest(msg)
+        limit, msg = firstcut.validate_numeric(request.args.get('limit', '100'), 1, 1000)
+        if limit is None:
+            return BadRequest(msg)
+        return jsonify(job_ids=job_status_instance.job_ids(offset=offset, limit=limit),
+                       total=len(job_status_instance), offset=offset, limit=limit)
+
+    @app.route("/noise_profile_ids", methods=["GET"])
+    def noise_profile_ids():
+        """ get list of noise profile ids """
+        return jsonify(noise_profile_ids=noise_profile_library.profile_ids)
 
     @app.route("/drop_file_firebase", methods=["GET"])
     def drop_file_firebase():
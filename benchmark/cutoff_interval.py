@@ -0,0 +1,58 @@
+""" Benchmark silence interval detection: `itertools.groupby` (legacy) vs run-length with NumPy
+
+python benchmark/cutoff_interval.py
+"""
+import logging
+from itertools import groupby
+from time import time
+
+import numpy as np
+
+from firstcut.interval import get_mask_interval
+
+logging.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s', level=logging.INFO, datefmt='%Y-%m-%d %H:%M:%S')
+MAX_SAMPLE_LENGTH = 30000000  # same cap as `max_sample_length` in api.py
+MAX_SAMPLE_LENGTH_LEGACY = 100000  # legacy implementation is quadratic, so stop early
+FRAME_RATE = 48000
+
+
+def legacy(mask_to_drop, min_interval):
+    """ previous implementation of `Editor.get_cutoff_interval` """
+    mask_chunk = list(map(lambda x: list(x[1]), groupby(mask_to_drop)))
+    length = list(map(lambda x: len(x), mask_chunk))
+    partition = list(map(lambda x: [sum(length[:x]), sum(length[:x + 1])], range(len(length))))
+    return list(map(
+        lambda y: [y[2][0], y[2][1]],
+        filter(lambda x: x[0][0] and x[1] >= min_interval, zip(mask_chunk, length, partition))))
+
+
+def speech_like_signal(n):
+    """ int16 noise with amplitude modulated by random 'syllables' """
+    envelope = np.repeat(np.random.rand(n // 2000 + 1), 2000)[:n]
+    return (np.random.randn(n) * 3000 * envelope).astype(np.int16)
+
+
+def timeit(func, *args):
+    start = time()
+    out = func(*args)
+    return time() - start, out
+
+
+if __name__ == '__main__':
+    np.random.seed(0)
+    min_interval = int(0.12 * FRAME_RATE)
+    logging.info('{:>10} | {:>12} | {:>10} | {:>12} | {:>10}'.format(
+        'samples', 'numpy (sec)', 'ns/sample', 'legacy (sec)', 'ns/sample'))
+    n = 10000
+    while n <= MAX_SAMPLE_LENGTH:
+        wave = speech_like_signal(n)
+        mask = np.abs(wave) <= 500
+        t_np, out_np = timeit(get_mask_interval, mask, min_interval)
+        if n <= MAX_SAMPLE_LENGTH_LEGACY:
+            t_legacy, out_legacy = timeit(legacy, mask, min_interval)
+            assert out_np.tolist() == out_legacy
+            legacy_log = '{:>12.4f} | {:>10.1f}'.format(t_legacy, t_legacy / n * 1e9)
+        else:
+            legacy_log = '{:>12} | {:>10}'.format('-', '-')
+        logging.info('{:>10} | {:>12.4f} | {:>10.2f} | {}'.format(n, t_np, t_np / n * 1e9, legacy_log))
+        n = min(n * 3, MAX_SAMPLE_LENGTH) if n < MAX_SAMPLE_LENGTH else n + 1
@@ -0,0 +1,71 @@
+""" Benchmark NMF: previous implementation (legacy) vs update over preallocated work buffers (the results are
+compared in `tests/test_noise_reduction.py`)
+
+python benchmark/nmf.py
+"""
+import logging
+from time import time
+
+import numpy as np
+
+from firstcut.nmf import nmf, euclid_divergence, kl_divergence, EPS
+
+logging.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s', level=logging.INFO, datefmt='%Y-%m-%d %H:%M:%S')
+FRAME_RATE = 16000
+HOP_LENGTH = 512  # librosa.stft default
+N_FFT = 2048
+N_ITER = 20
+
+
+def legacy(y, r: int = 20, n_iter: int = 50, div: str = "kl", init_h=None, init_u=None):
+    """ previous implementation of `nmf.nmf` """
+    m, n = y.shape
+    u = np.random.rand(r, n) if init_u is None else np.array(init_u)
+    h = np.random.rand(m, r) if init_h is None else np.array(init_h)
+    cost = np.zeros(n_iter)
+    lam = np.dot(h, u)
+    for i in range(n_iter):
+        if div == "euc":
+            cost[i] = euclid_divergence(y, lam)
+            h *= np.dot(y, u.T) / (np.dot(np.dot(h, u), u.T) + EPS)
+            u *= np.dot(h.T, y) / (np.dot(np.dot(h.T, h), u) + EPS)
+        else:
+            cost[i] = kl_divergence(y, lam)
+            numerator_h = np.dot((y / (np.dot(h, u) + EPS)), u.T)
+            denominator_h = np.tile(u.sum(axis=1), (m, 1))
+            h *= numerator_h / (denominator_h + EPS)
+            numerator_u = np.dot(h.T, (y / (np.dot(h, u) + EPS)))
+            denominator_u = np.tile(h.sum(axis=0), (n, 1))
+            u *= numerator_u / (denominator_u.T + EPS)
+        lam = np.dot(h, u)
+    return [h, u, cost]
+
+
+def spectrogram_like(n):
+    """ non-negative matrix of low rank with noise, in the shape of magnitude spectrogram """
+    h = np.random.rand(N_FFT // 2 + 1, 10) ** 4
+    u = np.random.rand(10, n) ** 2
+    return (np.dot(h, u) + np.random.rand(N_FFT // 2 + 1, n) * 0.01).astype(np.float32)
+
+
+def timeit(func, *args, **kwargs):
+    start = time()
+    out = func(*args, **kwargs)
+    return time() - start, out
+
+
+if __name__ == '__main__':
+    np.random.seed(0)
+    logging.info('{:>6} | {:>4} | {:>8} | {:>12} | {:>12} | {:>12} | {:>8}'.format(
+        'min', 'div', 'frames', 'legacy (sec)', 'fused (sec)', 'no cost (sec)', 'speedup'))
+    for minute in [1, 10]:
+        y = spectrogram_like(minute * 60 * FRAME_RATE // HOP_LENGTH + 1)
+        init_h = np.random.rand(y.shape[0], 20)
+        init_u = np.random.rand(20, y.shape[1])
+        for div in ['kl', 'euc']:
+            shared = dict(r=20, n_iter=N_ITER, div=div, init_h=init_h, init_u=init_u)
+            t_legacy, _ = timeit(legacy, y, **shared)
+            t_fused, _ = timeit(nmf, y, **shared)
+            t_no_cost, _ = timeit(nmf, y, cost_interval=0, **shared)
+            logging.info('{:>6} | {:>4} | {:>8} | {:>12.2f} | {:>12.2f} | {:>12.2f} | {:>7.1f}x'.format(
+                minute, div, y.shape[1], t_legacy, t_fused, t_no_cost, t_legacy / t_no_cost))
@@ -0,0 +1,44 @@
+""" Benchmark `JobScheduler` over editing jobs, thread vs process backend: time to construct the scheduler, latency
+of the first job submitted to it, and throughput over a burst of jobs
+
+python benchmark/scheduler.py
+"""
+import logging
+import os
+from time import time, sleep
+
+import firstcut
+
+logging.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s', level=logging.INFO, datefmt='%Y-%m-%d %H:%M:%S')
+SAMPLE = './sample_data/vc_1.mp3'
+N_JOBS = 16
+
+
+def job(n):
+    """ clip and render the audio with pydub as `api._audio_clip` does """
+    editor = firstcut.Editor(SAMPLE)
+    editor.amplitude_clipping(min_interval_sec=0.12, cutoff_ratio=0.9, crossfade_sec=0.1)
+    editor.audio_edit.raw_data
+
+
+if __name__ == '__main__':
+    logging.info('{} jobs on {} cores'.format(N_JOBS, os.cpu_count()))
+    for backend in ['thread', 'process']:
+        for n_workers in sorted({1, 2, 4, os.cpu_count()}):
+            start = time()
+            scheduler = firstcut.JobScheduler(n_workers=n_workers, max_queue=N_JOBS, backend=backend)
+            startup = time() - start
+
+            start = time()
+            scheduler.submit('first', job, (0,))
+            while scheduler.n_waiting + scheduler.n_running > 0:
+                sleep(0.001)
+            latency = time() - start
+
+            start = time()
+            for n in range(N_JOBS):
+                scheduler.submit(str(n), job, (n,))
+            scheduler.shutdown()
+            elapsed = time() - start
+            logging.info('\t {:7} {} workers: startup {:.2f} sec, first job {:.2f} sec, {:.2f} jobs/sec'.format(
+                backend, n_workers, startup, latency, N_JOBS / elapsed))
@@ -0,0 +1,64 @@
+""" Benchmark noise reduction: NMF vs spectral gating on speech with synthetic stationary noise (hum and hiss), in
+speed and scale-invariant SDR against the speech before adding the noise
+
+python benchmark/spectral_gate.py
+"""
+import logging
+from time import time
+
+import numpy as np
+
+import firstcut
+from firstcut.nmf import nmf_filter
+from firstcut.spectral_gate import spectral_gate
+
+logging.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s', level=logging.INFO, datefmt='%Y-%m-%d %H:%M:%S')
+SAMPLES = ['./sample_data/vc_6.wav', './sample_data/vc_3.wav']
+DURATION_SEC = [None, 60]  # original, and repeated up to the duration
+NOISE_LEVEL = 0.01
+
+
+def si_sdr(reference, estimate):
+    """ scale-invariant signal-to-distortion ratio (dB) """
+    length = min(len(reference), len(estimate))  # nmf output can be shorter by the last frame
+    reference, estimate = reference[:length], estimate[:length]
+    reference, estimate = reference - reference.mean(), estimate - estimate.mean()
+    target = np.dot(estimate, reference) / np.dot(reference, reference) * reference
+    return 10 * np.log10(np.sum(target ** 2) / np.sum((estimate - target) ** 2))
+
+
+def stationary_noise(length: int, frame_rate: int):
+    """ 50Hz hum with harmonics and white noise """
+    t = np.arange(length) / frame_rate
+    hum = sum(np.sin(2 * np.pi * 50 * k * t) / k for k in range(1, 6))
+    return NOISE_LEVEL * (hum / np.abs(hum).max() + np.random.randn(length))
+
+
+if __name__ == '__main__':
+    np.random.seed(0)
+    # warmup
+    spectral_gate(np.random.randn(16000), np.random.randn(4000), 16000)
+    for sample in SAMPLES:
+        editor = firstcut.Editor(sample)
+        # noise reference found on the clean signal as `Editor.noise_reduction` does
+        interval = editor.get_cutoff_interval(cutoff_ratio=0.5, min_interval_sec=0.1)
+        s, e = max(interval, key=lambda x: x[1] - x[0])
+        for duration in DURATION_SEC:
+            clean = editor.wave_array_np_list[0] / pow(2, 15)
+            if duration is not None:
+                clean = np.tile(clean, int(np.ceil(duration * editor.frame_rate / len(clean))))
+            noisy = clean + stationary_noise(len(clean), editor.frame_rate)
+            logging.info('{}: {:.1f} sec, noise reference {:.2f} sec'.format(
+                sample, len(clean) / editor.frame_rate, (e - s) / editor.frame_rate))
+            logging.info('\t noisy        : SI-SDR {:.2f} dB'.format(si_sdr(clean, noisy)))
+
+            start = time()
+            y_nmf = nmf_filter(noisy, noisy[s:e])
+            elapse_nmf = time() - start
+            logging.info('\t nmf          : SI-SDR {:.2f} dB, {:.3f} sec'.format(si_sdr(clean, y_nmf), elapse_nmf))
+
+            start = time()
+            y_gate = spectral_gate(noisy, noisy[s:e], editor.frame_rate)
+            elapse_gate = time() - start
+            logging.info('\t spectral gate: SI-SDR {:.2f} dB, {:.3f} sec ({:.1f}x faster)'.format(
+                si_sdr(clean, y_gate), elapse_gate, elapse_nmf / elapse_gate))
@@ -0,0 +1,47 @@
+""" Benchmark STFT: librosa vs `firstcut.stft` (first call includes the import and the JIT compilation of librosa)
+
+python benchmark/stft.py
+"""
+import logging
+from time import time
+
+import numpy as np
+
+logging.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s', level=logging.INFO, datefmt='%Y-%m-%d %H:%M:%S')
+FRAME_RATE = 16000
+N_FFT = 2048
+HOP_LENGTH = 512
+
+
+def run(name, stft, istft, y):
+    start = time()
+    y_stft = stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH)
+    elapse_stft = time() - start
+    start = time()
+    istft(y_stft, hop_length=HOP_LENGTH, length=y.shape[-1])
+    logging.info('\t {}: stft {:.3f} sec, istft {:.3f} sec'.format(name, elapse_stft, time() - start))
+
+
+if __name__ == '__main__':
+    np.random.seed(0)
+    y_short = np.random.randn(FRAME_RATE).astype(np.float32)
+
+    logging.info('first call (1 sec)')
+    start = time()
+    from firstcut.stft import stft, istft
+    run('firstcut (incl. import {:.3f} sec)'.format(time() - start), stft, istft, y_short)
+    try:
+        start = time()
+        import librosa
+        librosa_import = time() - start
+        run('librosa (incl. import {:.3f} sec)'.format(librosa_import), librosa.stft, librosa.istft, y_short)
+    except ImportError:
+        librosa = None
+
+    for minute in [1, 10]:
+        for channel in [1, 2]:
+            y = np.random.randn(channel, FRAME_RATE * 60 * minute).astype(np.float32)
+            logging.info('{} min, {} channel'.format(minute, channel))
+            run('firstcut', stft, istft, y)
+            if librosa is not None:
+                run('librosa ', librosa.stft, librosa.istft, y)
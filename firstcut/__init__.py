@@ -1,6 +1,11 @@
 from .util import load_file, write_file
-from .cutoff_amplitude import get_cutoff_amplitude
+from .cutoff_amplitude import get_cutoff_amplitude, get_amplitude_histogram, get_cutoff_amplitude_histogram
 from .editor import Editor
+from .edl import EditDecisionList
+from .cache import DecodeCache
+from .stream import stream_clip
+from .preview import ClipPreview, PreviewCache
+from .noise_profile import NoiseProfileLibrary
 from .firebase import FireBaseConnector
-from .api_util import validate_numeric, Status
+from .api_util import validate_numeric, Status, JobScheduler, QueueFullError, StatusProxy, RequestCache
 from .visualization import visualize_cutoff_amplitude, visualize_noise_reduction
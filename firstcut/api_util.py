@@ -1,6 +1,16 @@
-""" API job monitoring/numeric check module """
+""" API job monitoring/scheduling/numeric check module """
+import importlib
+import logging
+import multiprocessing
+import os
 import string
 import random
+from collections import deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from math import ceil
+from threading import Condition, Event, Lock, Thread
 from time import time
 
 
@@ -39,19 +49,53 @@ def validate_numeric(value, min_val, max_val, is_float=False):
     return value, ''
 
 
+class JobRecord:
+    """ Status of a job """
+    __slots__ = ('status', 'status_code', 'unix_timestamp', 'elapsed_time', 'progress', 'last_update', 'result')
+
+    def __init__(self):
+        self.status = 'start_job'
+        self.status_code = '1'
+        self.unix_timestamp = time()
+        self.elapsed_time = 0
+        self.progress = 0
+        self.last_update = self.unix_timestamp
+        self.result = None  # any other field given at completion (eg. url, file_name)
+
+    def to_dict(self):
+        record = {'status': self.status, 'status_code': self.status_code, 'unix_timestamp': self.unix_timestamp,
+                  'elapsed_time': self.elapsed_time, 'progress': self.progress}
+        if self.result is not None:
+            record.update(self.result)
+        return record
+
+
 class Status:
-    """ API job monitoring: status_code = {'1': job in progress, '-1': error, '0': job_completed} """
+    """ API job monitoring: status_code = {'1': job in progress, '-1': error, '0': job_completed}
+    Records are accessed under a lock, and the records of finished jobs are dropped `keep_log_second` after the last
+    update by a background thread. """
 
-    def __init__(self, keep_log_second: int = 300):
+    def __init__(self, keep_log_second: int = 300, sweep_interval_second: float = None):
         """ API job monitoring
 
          Parameter
         ------------
         keep_log_second: int
-            maximum time (second) to keep a log
+            maximum time (second) to keep a log after the job finishes
+        sweep_interval_second: float
+            interval (second) to drop expired records (`min(keep_log_second, 60)` as default, 0 to disable the
+            background thread)
         """
         self.__keep_log_second = keep_log_second
-        self.__id_status_dict = dict()
+        self.__id_status_dict = dict()  # job id -> JobRecord, in order of registration
+        self.__lock = Lock()
+        self.__stop = Event()
+        self.__listeners = []
+        if sweep_interval_second is None:
+            sweep_interval_second = min(keep_log_second, 60)
+        if sweep_interval_second > 0:
+            self.__sweeper = Thread(target=self.__sweep, args=(sweep_interval_second,), daemon=True)
+            self.__sweeper.start()
 
     @staticmethod
     def random_string(string_length: int = 10):
@@ -59,42 +103,39 @@ class Status:
         letters = string.ascii_lowercase
         return ''.join(random.choice(letters) for _ in range(string_length))
 
+    def __len__(self):
+        return len(self.__id_status_dict)
+
     @property
     def get_job_ids(self):
-        return list(self.__id_status_dict.keys())
+        with self.__lock:
+            return list(self.__id_status_dict.keys())
+
+    def job_ids(self, offset: int = 0, limit: int = 100):
+        """ job ids in order of registration from `offset` up to `limit` ids """
+        with self.__lock:
+            return list(islice(self.__id_status_dict.keys(), offset, offset + limit))
 
     def get_status(self, job_id):
         """ return status: dict(status='status message', status_code='1', unix_timestamp='timestamp of job')"""
-        jobs = list(self.__id_status_dict.keys())
-        if job_id not in jobs:
-            error = {'error_message': 'There are no job of {}. Current jobs are {}'.format(job_id, jobs)}
-            return error
-        else:
-            return self.__id_status_dict[job_id]
+        with self.__lock:
+            record = self.__id_status_dict.get(job_id)
+            if record is None:
+                return {'error_message': 'There are no job of {}'.format(job_id)}
+            return record.to_dict()
 
     def register_job(self, job_id=None):
         """ Registering job id to status class """
-        if job_id is None:
-            job_id = self.random_string()
-        n = 0
-        while True:
-            if job_id not in self.__id_status_dict.keys():
-                break
-            else:
+        with self.__lock:
+            if job_id is None:
+                job_id = self.random_string()
+            n = 0
+            while job_id in self.__id_status_dict:
                 job_id = self.random_string()
                 n += 1
                 if n > 10:
-                    jobs = list(self.__id_status_dict.keys())
-                    raise ValueError('Exceed max size of same job_id: {} in {}'.format(job_id, jobs))
-
-        self.__id_status_dict[job_id] = {
-            'status': 'start_job',
-            'status_code': '1',
-            'unix_timestamp': time(),
-            'elapsed_time': 0,
-            'progress': 0
-        }
-
+                    raise ValueError('Exceed max size of same job_id: {}'.format(job_id))
+            self.__id_status_dict[job_id] = JobRecord()
         return job_id
 
     def update(self, job_id, status, refresh: bool = True, progress: float = None):
@@ -102,34 +143,401 @@ class Status:
 
     def complete(self, job_id, **kwargs):
         self.__update_message(job_id, 'completed', '0', refresh=True, progress=100, **kwargs)
+        self.__notify(job_id)
 
     def error(self, job_id, error_message):
         self.__update_message(job_id, error_message, '-1', refresh=True, progress=100)
+        self.__notify(job_id)
+
+    def add_listener(self, callback):
+        """ register function called as `callback(job_id, status)` when a job is completed or failed """
+        self.__listeners.append(callback)
+
+    def __notify(self, job_id):
+        if len(self.__listeners) > 0:
+            status = self.get_status(job_id)
+            for callback in self.__listeners:
+                callback(job_id, status)
 
     def __update_message(self, job_id, status, status_id, refresh: bool = True, progress: float = None, **kwargs):
-        if job_id not in self.__id_status_dict.keys():
-            raise ValueError('job_id is not registered to status dictionary:  %s' % job_id)
-        if refresh:
-            self.__id_status_dict[job_id]['status'] = status
-            self.__id_status_dict[job_id]['status_code'] = status_id
-        else:
-            self.__id_status_dict[job_id]['status'] += status
-            self.__id_status_dict[job_id]['status_code'] += status_id
-        self.__id_status_dict[job_id]['elapsed_time'] = time() - self.__id_status_dict[job_id]['unix_timestamp']
-        for k, v in kwargs.items():
-            self.__id_status_dict[job_id][k] = v
-        if progress is not None:
-            self.__id_status_dict[job_id]['progress'] = progress
+        with self.__lock:
+            record = self.__id_status_dict.get(job_id)
+            if record is None:
+                raise ValueError('job_id is not registered to status dictionary:  %s' % job_id)
+            if refresh:
+                record.status = status
+                record.status_code = status_id
+            else:
+                record.status += status
+                record.status_code += status_id
+            record.last_update = time()
+            record.elapsed_time = record.last_update - record.unix_timestamp
+            if len(kwargs) > 0:
+                record.result = dict(record.result or {}, **kwargs)
+            if progress is not None:
+                record.progress = progress
+
+    def remove(self, job_id):
+        """ remove job record (eg. the job rejected before it starts) """
+        with self.__lock:
+            self.__id_status_dict.pop(job_id, None)
 
     def drop(self):
-        """ drop job record, which is not in progress status """
+        """ drop job record, which is not in progress status and not updated for `keep_log_second` """
         time_now = time()
-        delete_ids = []
-        for k, v in self.__id_status_dict.items():
-            if time_now - v['unix_timestamp'] > self.__keep_log_second:
-                if v['status_code'] != '1':  # if job is not in progress
-                    delete_ids.append(k)
-        if len(delete_ids) != 0:
+        with self.__lock:
+            delete_ids = [k for k, v in self.__id_status_dict.items()
+                          if v.status_code != '1' and time_now - v.last_update > self.__keep_log_second]
             for k in delete_ids:
                 self.__id_status_dict.pop(k)
+        if len(delete_ids) != 0:
+            logging.info('drop {} job status'.format(len(delete_ids)))
+        return delete_ids
+
+    def __sweep(self, interval: float):
+        while not self.__stop.wait(interval):
+            self.drop()
+
+    def close(self):
+        """ stop the background thread dropping expired records """
+        self.__stop.set()
+
+
+class RequestCache:
+    """ Deduplication of identical job requests: a request is attached to the job of the same key while the job is in
+    progress, and gets the result of the job for `ttl_second` after the job is completed (failed job isn't kept).
+    A job which doesn't finish within `timeout_second` isn't attached any more, in case it never reports back. """
+
+    def __init__(self, ttl_second: float = 600, timeout_second: float = 3600):
+        """ Deduplication of identical job requests
+
+         Parameter
+        ------------
+        ttl_second: float
+            time (second) to keep the result of a completed job
+        timeout_second: float
+            time (second) to attach requests to a job in progress
+        """
+        self.ttl_second = ttl_second
+        self.timeout_second = timeout_second
+        self.__in_progress = OrderedDict()  # key -> (job id, start time) in order of start
+        self.__job_key = dict()  # job id -> key
+        self.__result = OrderedDict()  # key -> (job id, result, completion time) in order of completion
+        self.__lock = Lock()
+
+    @staticmethod
+    def request_key(source_id, **params):
+        """ key of the request (`source_id` identifies the content of the input such as ETag or content hash) """
+        return (source_id,) + tuple(sorted(
+            (k, round(v, 6) if isinstance(v, float) else v) for k, v in params.items()))
+
+    def __expire(self):
+        time_now = time()
+        while len(self.__result) > 0:
+            key, (_, _, completion_time) = next(iter(self.__result.items()))
+            if time_now - completion_time <= self.ttl_second:
+                break
+            self.__result.popitem(last=False)
+        while len(self.__in_progress) > 0:
+            key, (job_id, start_time) = next(iter(self.__in_progress.items()))
+            if time_now - start_time <= self.timeout_second:
+                break
+            logging.warning('job is not finished in {} sec: {}'.format(self.timeout_second, job_id))
+            self.__in_progress.popitem(last=False)
+            self.__job_key.pop(job_id, None)
+
+    def attach(self, key, job_id):
+        """ Register the job for the key unless there's a job of the same key
+
+         Parameter
+        ------------
+        key: tuple
+            key by `request_key`
+        job_id: str
+            id of the job to be started for the request
+
+         Return
+        ------------
+        job_id: str
+            the given job id if it's registered, or the id of the job of the same key
+        result: dict
+            result of the job of the same key if it's completed, else None
+        """
+        with self.__lock:
+            self.__expire()
+            if key in self.__result:
+                _job_id, result, _ = self.__result[key]
+                return _job_id, result
+            if key in self.__in_progress:
+                return self.__in_progress[key][0], None
+            self.__in_progress[key] = (job_id, time())
+            self.__job_key[job_id] = key
+            return job_id, None
+
+    def discard(self, job_id):
+        """ remove the job not to be attached (eg. the job rejected before it starts) """
+        with self.__lock:
+            key = self.__job_key.pop(job_id, None)
+            if key is not None:
+                self.__in_progress.pop(key, None)
+
+    def finish(self, job_id, status: dict):
+        """ Record the result of the job (listener of `Status`)
+
+         Parameter
+        ------------
+        job_id: str
+        status: dict
+            status of the job, whose result (except the progress) is kept if the job is completed
+        """
+        with self.__lock:
+            key = self.__job_key.pop(job_id, None)
+            if key is None:
+                return
+            self.__in_progress.pop(key, None)
+            if status.get('status_code') == '0' and self.ttl_second > 0:
+                result = {k: v for k, v in status.items()
+                          if k not in ['status', 'status_code', 'unix_timestamp', 'elapsed_time', 'progress']}
+                self.__result[key] = (job_id, result, time())
+            self.__expire()
+
+    def __len__(self):
+        return len(self.__in_progress) + len(self.__result)
+
+
+class QueueFullError(ValueError):
+    """ job is rejected as the queue of `JobScheduler` is full """
+
+
+class StatusProxy:
+    """ `Status` interface for a job in a worker process, which sends the update to the `Status` of the parent process
+    through a queue """
+
+    def __init__(self, queue):
+        self.__queue = queue
+
+    def update(self, job_id, status, refresh: bool = True, progress: float = None):
+        self.__queue.put(('update', dict(job_id=job_id, status=status, refresh=refresh, progress=progress)))
+
+    def complete(self, job_id, **kwargs):
+        self.__queue.put(('complete', dict(job_id=job_id, **kwargs)))
+
+    def error(self, job_id, error_message):
+        self.__queue.put(('error', dict(job_id=job_id, error_message=error_message)))
+
+
+def warm_worker_process():
+    """ no-op job to start a worker process of `JobScheduler` before the first job comes """
+    return os.getpid()
+
+
+def init_worker_process(queue, preload, initializer, initargs):
+    """ initializer of the worker process of `JobScheduler` """
+    for module in preload:
+        importlib.import_module(module)
+    if initializer is not None:
+        initializer(StatusProxy(queue), *initargs)
+
+
+class JobScheduler:
+    """ Bounded worker pool with FIFO admission queue: at most `n_workers` jobs run at once, and at most `max_queue`
+    jobs wait for a worker, beyond which a job is rejected.
+
+    With `backend='process'`, jobs run in a pool of processes started by a fork server, so the pure python part of the
+    jobs isn't serialized by the GIL, and the worker processes don't inherit the threads and resources of the parent.
+    The `preload` modules are imported by the fork server, and all the worker processes are started in the constructor,
+    so the first jobs don't wait for the process start and the imports.
+    The target and its arguments must be picklable (eg. module level function), and the job reports its progress by
+    the `StatusProxy` given to `initializer`, which is relayed to `status`. If a worker process dies (eg. killed by OOM
+    killer), the jobs running in the pool are failed by `status.error` and the pool is restarted.
+    """
+
+    def __init__(self,
+                 n_workers: int = 2,
+                 max_queue: int = 16,
+                 backend: str = 'thread',
+                 status: Status = None,
+                 initializer=None,
+                 initargs=(),
+                 preload=('moviepy.editor', 'firstcut.editor')):
+        """ Bounded worker pool with FIFO admission queue
+
+         Parameter
+        ------------
+        n_workers: int
+            number of jobs to run concurrently
+        max_queue: int
+            maximum number of jobs waiting for a worker
+        backend: str
+            `thread` or `process` to run the jobs
+        status: Status
+            (process backend) status to relay the update from the worker processes
+        initializer: callable
+            (process backend) called as `initializer(status_proxy, *initargs)` when a worker process starts
+        initargs: tuple
+            (process backend) arguments for `initializer`
+        preload: List
+            (process backend) modules imported by the fork server and when a worker process starts
+        """
+        assert n_workers > 0 and max_queue >= 0, 'invalid scheduler size: {}, {}'.format(n_workers, max_queue)
+        if backend not in ['thread', 'process']:
+            raise ValueError('unknown backend: {}'.format(backend))
+        self.n_workers = n_workers
+        self.max_queue = max_queue
+        self.backend = backend
+        self.__queue = deque()  # (job_id, target, args) in order of submission
+        self.__running = set()
+        self.__condition = Condition()
+        self.__elapsed = None  # moving average of the time (sec) to complete a job
+        self.__closed = False
+        self.__pool = None
+        self.__pool_lock = Lock()
+        self.__status = status
+        self.__status_queue = None
+        self.__abandoned = set()  # jobs failed by a dead worker, whose later update is ignored
+        self.__relay = None
+        if backend == 'process':
+            context = multiprocessing.get_context('forkserver')
+            # no effect if the fork server is already running
+            context.set_forkserver_preload(list(preload))
+            self.__status_queue = context.Queue()
+            self.__pool_args = dict(max_workers=n_workers, mp_context=context, initializer=init_worker_process,
+                                    initargs=(self.__status_queue, preload, initializer, initargs))
+            self.__pool = ProcessPoolExecutor(**self.__pool_args)
+            pids = set(future.result() for future in self.__warm_pool())
+            logging.info('{} worker processes started'.format(len(pids)))
+            self.__relay = Thread(target=self.__relay_status, daemon=True)
+            self.__relay.start()
+        self.__workers = [Thread(target=self.__work, daemon=True) for _ in range(n_workers)]
+        for worker in self.__workers:
+            worker.start()
+
+    def submit(self, job_id, target, args=()):
+        """ Add job to the queue
+
+         Parameter
+        ------------
+        job_id: str
+            id to refer to the job by `position`
+        target: callable
+            function to run by a worker
+        args: tuple
+            arguments for the function
+
+         Return
+        ------------
+        position: int
+            position in the queue (1 for the next job to start)
+        """
+        with self.__condition:
+            if self.__closed:
+                raise ValueError('scheduler is already shut down')
+            if len(self.__queue) >= self.max_queue:
+                raise QueueFullError('queue is full: {} jobs waiting'.format(len(self.__queue)))
+            self.__queue.append((job_id, target, args))
+            self.__condition.notify()
+            return len(self.__queue)
+
+    def position(self, job_id):
+        """ position in the queue (1 for the next job to start), or None if the job isn't waiting """
+        with self.__condition:
+            for n, (_job_id, _, _) in enumerate(self.__queue):
+                if _job_id == job_id:
+                    return n + 1
+        return None
+
+    @property
+    def n_waiting(self):
+        return len(self.__queue)
+
+    @property
+    def n_running(self):
+        return len(self.__running)
+
+    @property
+    def retry_after(self):
+        """ estimated time (sec) until a slot in the queue is available """
+        elapsed = 1.0 if self.__elapsed is None else self.__elapsed
+        return max(int(ceil(elapsed / self.n_workers)), 1)
+
+    def __work(self):
+        while True:
+            with self.__condition:
+                while len(self.__queue) == 0 and not self.__closed:
+                    self.__condition.wait()
+                if len(self.__queue) == 0:
+                    return
+                job_id, target, args = self.__queue.popleft()
+                self.__running.add(job_id)
+            start = time()
+            try:
+                if self.__pool is None:
+                    target(*args)
+                else:
+                    self.__run_process(job_id, target, args)
+            except Exception:
+                logging.exception('job failed: {}'.format(job_id))
+            finally:
+                elapsed = time() - start
+                with self.__condition:
+                    self.__running.discard(job_id)
+                    self.__elapsed = elapsed if self.__elapsed is None else 0.8 * self.__elapsed + 0.2 * elapsed
+
+    def __run_process(self, job_id, target, args):
+        with self.__pool_lock:
+            try:
+                future = self.__pool.submit(target, *args)
+            except BrokenProcessPool:
+                # the pool is broken by the job of other worker, and not restarted yet
+                self.__restart_pool()
+                future = self.__pool.submit(target, *args)
+            pool = self.__pool
+        try:
+            future.result()
+        except BrokenProcessPool:
+            # a dead worker breaks the pool, which fails all the jobs running in the pool
+            logging.error('worker process terminated abruptly: {}'.format(job_id))
+            with self.__pool_lock:
+                if self.__pool is pool:
+                    self.__restart_pool()
+                self.__abandoned.add(job_id)
+            if self.__status is not None:
+                self.__status.error(job_id, 'worker process terminated abruptly')
+
+    def __warm_pool(self):
+        """ start all the worker processes: the pool starts a new process for each job submitted while no process is
+        idle, and the processes take a while to start, so the no-op jobs submitted at once start one process each """
+        return [self.__pool.submit(warm_worker_process) for _ in range(self.n_workers)]
+
+    def __restart_pool(self):
+        logging.info('restart worker processes')
+        self.__pool.shutdown(wait=False)
+        self.__pool = ProcessPoolExecutor(**self.__pool_args)
+        self.__warm_pool()
+
+    def __relay_status(self):
+        while True:
+            message = self.__status_queue.get()
+            if message is None:
+                return
+            method, kwargs = message
+            if self.__status is None or kwargs['job_id'] in self.__abandoned:
+                continue
+            try:
+                getattr(self.__status, method)(**kwargs)
+            except Exception:
+                logging.exception('failed to update status: {}'.format(message))
 
+    def shutdown(self, wait: bool = True):
+        """ stop accepting jobs, and stop the workers once the queue is empty """
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+        if wait:
+            for worker in self.__workers:
+                worker.join()
+            if self.__pool is not None:
+                self.__pool.shutdown(wait=True)
+                # status sent before the workers exit is relayed before the sentinel
+                self.__status_queue.put(None)
+                self.__relay.join()
@@ -0,0 +1,233 @@
+""" Content-addressed on-disk cache of decoded audio, to skip download/decode of the same file submitted repeatedly
+
+cache_dir
+├── lock                              file lock over the processes sharing the cache
+├── source/<sha1 of source id>        content hash of the remote file (eg. file name and its ETag)
+└── <content hash>/                   one entry per file content, evicted as a unit (LRU over mtime)
+    ├── source.<ext>                  the file itself (only if registered by `register_source`)
+    ├── info.json                     probe metadata
+    ├── <decode key>.wave.npy         decoded PCM of shape (sample, channel), loaded by mmap
+    └── <decode key>.histogram.npy    amplitude histogram of the first channel
+"""
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock
+from time import time
+
+import numpy as np
+
+__all__ = 'DecodeCache'
+
+HASH_CHUNK_SIZE = pow(2, 20)
+HASH_MEMO_SIZE = 1024  # number of files to memoize the content hash
+
+
+class DecodeCache:
+    """ Content-addressed on-disk cache of decoded audio with LRU eviction under a byte budget. The cache can be shared
+    by processes: lookup and eviction are serialized by a file lock, and an entry used within `pin_second` isn't
+    evicted, as a job may still read the file it has got (eg. the source video until export). """
+
+    def __init__(self, cache_dir: str, max_bytes: int = pow(2, 32), pin_second: float = 3600):
+        """ Content-addressed on-disk cache of decoded audio
+
+         Parameter
+        ----------------
+        cache_dir: str
+            directory to store the cache
+        max_bytes: int
+            byte budget of the cache, least recently used entries are removed when it's exceeded
+        pin_second: float
+            entries used within this time (second) are not removed even if the budget is exceeded
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.pin_second = pin_second
+        self.__hash_memo = OrderedDict()  # (path, size, mtime) -> content hash in order of access
+        self.__hash_memo_lock = Lock()
+        self.__lock_file = os.path.join(self.cache_dir, 'lock')
+        os.makedirs(os.path.join(self.cache_dir, 'source'), exist_ok=True)
+
+    @contextmanager
+    def __locked(self):
+        """ exclusive lock over the threads and processes (not reentrant) """
+        with open(self.__lock_file, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def decode_key(frame_rate: int, channels: int, sample_format: str = 's16le'):
+        """ Key of decode parameters """
+        return '{}_{}_{}'.format(sample_format, frame_rate, channels)
+
+    def content_hash(self, file_path: str):
+        """ SHA-1 of the file content (memoized by path, size and mtime for recent `HASH_MEMO_SIZE` files) """
+        stat = os.stat(file_path)
+        memo_key = (os.path.realpath(file_path), stat.st_size, stat.st_mtime_ns)
+        with self.__hash_memo_lock:
+            if memo_key in self.__hash_memo:
+                self.__hash_memo.move_to_end(memo_key)
+                return self.__hash_memo[memo_key]
+        sha1 = hashlib.sha1()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                sha1.update(chunk)
+        with self.__hash_memo_lock:
+            self.__hash_memo[memo_key] = sha1.hexdigest()
+            while len(self.__hash_memo) > HASH_MEMO_SIZE:
+                self.__hash_memo.popitem(last=False)
+        return sha1.hexdigest()
+
+    def __entry(self, content_hash: str, file_name: str = None, touch: bool = False):
+        entry_dir = os.path.join(self.cache_dir, content_hash)
+        if touch:
+            os.makedirs(entry_dir, exist_ok=True)
+            os.utime(entry_dir)
+        return entry_dir if file_name is None else os.path.join(entry_dir, file_name)
+
+    def __source_index(self, source_id: str):
+        return os.path.join(self.cache_dir, 'source', hashlib.sha1(source_id.encode()).hexdigest())
+
+    def get_source(self, source_id: str):
+        """ Get path to the cached file of the source id, None if it's not cached """
+        index = self.__source_index(source_id)
+        if not os.path.exists(index):
+            return None
+        with open(index) as f:
+            content_hash = f.read()
+        entry_dir = self.__entry(content_hash)
+        with self.__locked():
+            # the entry touched under the lock is pinned
+            source = [i for i in os.listdir(entry_dir) if i.startswith('source.')] if os.path.exists(entry_dir) else []
+            if len(source) == 0:
+                return None
+            self.__entry(content_hash, touch=True)
+        return os.path.join(entry_dir, source[0])
+
+    def register_source(self, source_id: str, file_path: str):
+        """ Move a downloaded file into the cache
+
+         Parameter
+        ----------------
+        source_id: str
+            identifier of the remote file, which changes when the content changes (eg. file name and its ETag)
+        file_path: str
+            path to the downloaded file
+
+         Return
+        ----------------
+        path to the cached file
+        """
+        content_hash = self.content_hash(file_path)
+        with self.__locked():
+            path = self.__entry(content_hash, 'source{}'.format(os.path.splitext(file_path)[-1]), touch=True)
+            os.replace(file_path, path)
+        self.__write(self.__source_index(source_id), content_hash.encode())
+        self.evict(keep=content_hash)
+        return path
+
+    def load_info(self, content_hash: str):
+        """ Load probe metadata, None if it's not cached """
+        path = self.__entry(content_hash, 'info.json')
+        with self.__locked():
+            if not os.path.exists(path):
+                return None
+            self.__entry(content_hash, touch=True)
+            with open(path) as f:
+                return json.load(f)
+
+    def save_info(self, content_hash: str, info: dict):
+        with self.__locked():
+            self.__write(self.__entry(content_hash, 'info.json', touch=True), json.dumps(info).encode())
+
+    def load_wave(self, content_hash: str, decode_key: str):
+        """ Load decoded PCM of shape (sample, channel) by copy-on-write mmap, None if it's not cached """
+        path = self.__entry(content_hash, '{}.wave.npy'.format(decode_key))
+        with self.__locked():
+            if not os.path.exists(path):
+                return None
+            self.__entry(content_hash, touch=True)
+            # mapped file is readable after its entry is removed
+            return np.load(path, mmap_mode='c')
+
+    def save_wave(self, content_hash: str, decode_key: str, wave_array_np_list: list):
+        """ Save decoded PCM given as a list of channels (written channel by channel without stacking in memory) """
+        with self.__locked():
+            path = self.__entry(content_hash, '{}.wave.npy'.format(decode_key), touch=True)
+        path_tmp = '{}.{}.tmp'.format(path, os.getpid())
+        wave = np.lib.format.open_memmap(path_tmp, mode='w+', dtype=wave_array_np_list[0].dtype,
+                                         shape=(len(wave_array_np_list[0]), len(wave_array_np_list)))
+        for c, w in enumerate(wave_array_np_list):
+            wave[:, c] = w
+        wave.flush()
+        del wave
+        os.replace(path_tmp, path)
+        self.evict(keep=content_hash)
+
+    def load_histogram(self, content_hash: str, decode_key: str):
+        """ Load amplitude histogram, None if it's not cached """
+        path = self.__entry(content_hash, '{}.histogram.npy'.format(decode_key))
+        with self.__locked():
+            if not os.path.exists(path):
+                return None
+            return np.load(path)
+
+    def save_histogram(self, content_hash: str, decode_key: str, histogram):
+        with self.__locked():
+            path = self.__entry(content_hash, '{}.histogram.npy'.format(decode_key), touch=True)
+        path_tmp = '{}.{}.tmp'.format(path, os.getpid())
+        with open(path_tmp, 'wb') as f:
+            np.save(f, histogram)
+        os.replace(path_tmp, path)
+
+    @staticmethod
+    def __write(path: str, data: bytes):
+        """ write file atomically """
+        path_tmp = '{}.{}.tmp'.format(path, os.getpid())
+        with open(path_tmp, 'wb') as f:
+            f.write(data)
+        os.replace(path_tmp, path)
+
+    @property
+    def entries(self):
+        """ list of (content hash, byte size, last access time) """
+        entries = []
+        for content_hash in os.listdir(self.cache_dir):
+            entry_dir = self.__entry(content_hash)
+            if content_hash == 'source' or not os.path.isdir(entry_dir):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry_dir, i)) for i in os.listdir(entry_dir))
+            entries.append((content_hash, size, os.path.getmtime(entry_dir)))
+        return entries
+
+    def evict(self, keep: str = None):
+        """ Remove least recently used entries until the cache fits in the byte budget, except the entries used within
+        `pin_second`
+
+         Parameter
+        ----------------
+        keep: str
+            content hash of the entry not to be removed (eg. the one just written)
+        """
+        with self.__locked():
+            entries = sorted(self.entries, key=lambda x: x[2])
+            total = sum(size for _, size, _ in entries)
+            time_now = time()
+            for content_hash, size, last_access in entries:
+                if total <= self.max_bytes:
+                    break
+                if content_hash == keep or time_now - last_access < self.pin_second:
+                    continue
+                logging.info('evict cache: {} ({} bytes)'.format(content_hash, size))
+                shutil.rmtree(self.__entry(content_hash), ignore_errors=True)
+                total -= size
+        if total > self.max_bytes:
+            logging.warning('cache exceeds the budget by entries in use: {} > {}'.format(total, self.max_bytes))
@@ -1,7 +1,70 @@
 """ Collection of functions to tune cutoff amplitude """
 import numpy as np
 
-__all__ = 'get_cutoff_amplitude'
+__all__ = ('get_cutoff_amplitude', 'get_amplitude_histogram', 'get_cutoff_amplitude_histogram')
+
+INT16_MAX_AMPLITUDE = pow(2, 15)
+HISTOGRAM_BLOCK_SIZE = pow(2, 20)
+
+
+def absolute_amplitude(wave_data):
+    """ Absolute amplitude of wave signal (`np.abs(-32768)` overflows in int16, so read it as uint16) """
+    amplitude = np.abs(wave_data)
+    if amplitude.dtype == np.int16:
+        amplitude = amplitude.view(np.uint16)
+    return amplitude
+
+
+def get_amplitude_histogram(wave_data):
+    """ Get cumulative histogram of absolute amplitude, which is exact over int16 range.
+    Counting is done over 65,536 bins of raw int16 values block by block, and folded into absolute amplitude.
+
+     Parameter
+    -----------
+    wave_data: 1d nd.array
+        mono wave signal (int16)
+
+     Return
+    -----------
+    amplitude histogram: 1d nd.array
+        cumulative count of absolute amplitude (`histogram[a]` is the number of samples with |amplitude| <= a)
+    """
+    assert np.ndim(wave_data) == 1
+    wave_data = np.asarray(wave_data)
+    if wave_data.dtype != np.int16:
+        raise ValueError('amplitude histogram requires int16 signal but {}'.format(wave_data.dtype))
+    count = np.zeros(2 * INT16_MAX_AMPLITUDE, dtype=np.int64)
+    for i in range(0, len(wave_data), HISTOGRAM_BLOCK_SIZE):
+        count += np.bincount(wave_data[i:i + HISTOGRAM_BLOCK_SIZE].view(np.uint16), minlength=len(count))
+
+    # uint16 value u >= 2^15 corresponds to negative amplitude u - 2^16
+    count_abs = np.zeros(INT16_MAX_AMPLITUDE + 1, dtype=np.int64)
+    count_abs[:INT16_MAX_AMPLITUDE] = count[:INT16_MAX_AMPLITUDE]
+    count_abs[1:] += count[INT16_MAX_AMPLITUDE:][::-1]
+    return np.cumsum(count_abs)
+
+
+def get_cutoff_amplitude_histogram(amplitude_histogram, cutoff_ratio=0.5):
+    """ Get cutoff amplitude from amplitude histogram
+
+     Parameter
+    -----------
+    amplitude_histogram: 1d nd.array
+        cumulative histogram attained from `get_amplitude_histogram`
+    cutoff_ratio: float or List
+        cutoff percentile (higher removes more sample), multiple values can be given at once
+
+     Return
+    -----------
+    cutoff amplitude: int (or 1d nd.array if cutoff_ratio is array-like)
+    """
+    length = amplitude_histogram[-1]
+    cutoff_ratio = np.clip(cutoff_ratio, 0.0, 1.0)
+    ind = np.minimum(np.floor(cutoff_ratio * length).astype(np.int64), length - 1)
+    val = np.searchsorted(amplitude_histogram, ind, side='right')
+    if np.ndim(val) == 0:
+        return int(val)
+    return val
 
 
 def get_cutoff_amplitude(wave_data, cutoff_ratio: float = 0.5, method_type: str = 'ratio'):
@@ -13,17 +76,25 @@ def get_cutoff_amplitude(wave_data, cutoff_ratio: float = 0.5, method_type: str
         mono wave signal
     cutoff_ratio: float
         cutoff percentile (higher removes more sample)
+    method_type: str
+        'ratio': sort all the absolute amplitude, O(n log n)
+        'partition': selection by `np.partition`, O(n)
+        'histogram': exact histogram over int16 range, O(n) (int16 signal only)
 
      Return
     -----------
     cutoff amplitude: float
     """
     assert np.ndim(wave_data) == 1
-    if method_type == 'ratio':
+    if method_type in ['ratio', 'partition']:
         cutoff_ratio = np.clip(cutoff_ratio, 0.0, 1.0)
-        single_array_sorted = np.sort(np.abs(wave_data))
-        ind = int(np.floor(cutoff_ratio * len(wave_data)))
-        val = single_array_sorted[min(ind, len(wave_data) - 1)]
+        ind = min(int(np.floor(cutoff_ratio * len(wave_data))), len(wave_data) - 1)
+        if method_type == 'ratio':
+            val = np.sort(absolute_amplitude(wave_data))[ind]
+        else:
+            val = np.partition(absolute_amplitude(wave_data), ind)[ind]
         return int(val)
+    elif method_type == 'histogram':
+        return get_cutoff_amplitude_histogram(get_amplitude_histogram(wave_data), cutoff_ratio=cutoff_ratio)
     else:
         raise ValueError('unknown `method_type`: {}'.format(method_type))
@@ -1,15 +1,20 @@
 """ Core audio/video editor """
 import logging
+import os
 from typing import List, Tuple
-from itertools import groupby
-from tqdm import tqdm
 
 import numpy as np
 from moviepy import editor
 
-from .nmf import nmf_filter
-from .cutoff_amplitude import get_cutoff_amplitude
-from .util import write_file, load_file, write_file_wav
+from .nmf import nmf_filter, N_FFT, HOP_LENGTH
+from .spectral_gate import spectral_gate
+from .cutoff_amplitude import get_cutoff_amplitude, get_amplitude_histogram, get_cutoff_amplitude_histogram, \
+    absolute_amplitude
+from .interval import get_mask_interval, get_frame_energy, frame_to_sample_interval
+from .render import get_keep_interval, assemble_audio, to_audio_segment
+from .edl import EditDecisionList
+from .util import write_file, load_file, load_audio, write_file_wav, probe_keyframe, snap_to_keyframe, \
+    get_file_format, get_media_info, is_mp4_compatible
 from .visualization import visualize_noise_reduction, visualize_cutoff_amplitude, visualize_signal
 
 logging.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s', level=logging.INFO, datefmt='%Y-%m-%d %H:%M:%S')
@@ -22,7 +27,7 @@ class Editor:
     - (ii) process separately
     - (iii) combine `pydub.AudioSegment` for audio interface, and `moviepy.editor` for movie interface """
 
-    def __init__(self, file_path: str, max_sample_length: int = None):
+    def __init__(self, file_path: str, max_sample_length: int = None, decoder: str = 'ffmpeg', cache=None):
         """ Core audio/video editor
 
          Parameter
@@ -31,38 +36,132 @@ class Editor:
             absolute path to file name
         max_sample_length: int
             set a max sample length (to avoid being clogged by extremely long audio file)
+        decoder: str
+            audio decoder, 'ffmpeg' or 'pydub' (see `util.load_file`). With 'ffmpeg', only the metadata is read by
+            ffprobe here (the sample size is estimated from the duration), and the audio is decoded and the video is
+            opened when they are accessed first.
+        cache: DecodeCache
+            cache of the probe metadata, decoded audio and amplitude histogram (only for 'ffmpeg' decoder)
         """
         self.file_path = file_path
-        audio_stats, video_stats = load_file(self.file_path)
-        (self.audio, self.wave_array_np_list, self.__audio_format, self.frame_rate, self.sample_width, self.channels) \
-            = audio_stats
-        self.video, self.__video_format, self.is_mov = video_stats
-        self.length = len(self.wave_array_np_list[0])
-
-        self.length_sec = len(self.audio) / 1000  # self.length / self.frame_rate
-        self.format = self.__audio_format if self.video is None else self.__video_format
+        self.__audio = None
+        self.__video = None
+        self.__wave = None
+        self.__wave_raw = None
+        self.__cache = cache
+        self.__content_hash = None
+        if decoder == 'ffmpeg':
+            # read metadata only: audio/video is decoded/opened when an operation first needs it
+            assert os.path.exists(self.file_path), 'No file: {}'.format(self.file_path)
+            self.__audio_format, self.__video_format = get_file_format(self.file_path)
+            self.__media_info = None
+            if self.__cache is not None:
+                self.__content_hash = self.__cache.content_hash(self.file_path)
+                self.__media_info = self.__cache.load_info(self.__content_hash)
+            if self.__media_info is None:
+                self.__media_info = get_media_info(self.file_path)
+                if self.__cache is not None:
+                    self.__cache.save_info(self.__content_hash, self.__media_info)
+            self.frame_rate = self.__media_info['frame_rate']
+            self.channels = self.__media_info['channels']
+            self.sample_width = 2  # decoded as 16-bit PCM
+            self.length = int(round(self.__media_info['duration'] * self.frame_rate))  # estimated until decoded
+            self.has_video = self.__video_format is not None and self.__media_info['video_codec'] is not None
+            self.is_mov = False
+            if self.channels > 2:
+                raise ValueError('audio has more than two channel: {}'.format(self.channels))
+        elif decoder == 'pydub':
+            audio_stats, video_stats = load_file(self.file_path, decoder=decoder)
+            (self.__audio, self.__wave, self.__audio_format, self.frame_rate, self.sample_width,
+             self.channels) = audio_stats
+            self.__video, self.__video_format, self.is_mov = video_stats
+            self.__wave_raw = self.__wave.copy()
+            self.__media_info = None
+            self.length = len(self.__wave[0])
+            self.has_video = self.__video is not None
+        else:
+            raise ValueError('unknown decoder: {}'.format(decoder))
+
+        self.length_sec = round(1000 * self.length / self.frame_rate) / 1000  # in the same way as pydub.AudioSegment
+        self.format = self.__audio_format if not self.has_video else self.__video_format
         logging.info('audio info')
         logging.info(' * sample size   : {}'.format(self.length))
         logging.info(' * sample sec    : {}'.format(self.length_sec))
         logging.info(' * channel       : {}'.format(self.channels))
         logging.info(' * frame rate    : {}'.format(self.frame_rate))
         logging.info(' * sample width  : {}'.format(self.sample_width))
-        logging.info(' * audio_amp     : {} (max), {} (min)'.format(
-            np.max(self.wave_array_np_list), np.min(self.wave_array_np_list)))
-        if self.video is None:
+        if not self.has_video:
             logging.info(' * no video')
         else:
             logging.info(' * video         : {}'.format(self.__video_format))
         if max_sample_length is not None and self.length > max_sample_length:
             raise ValueError('sample data exceeds max sample size: {} > {}'.format(self.length, max_sample_length))
 
-        self.wave_array_np_list_raw = self.wave_array_np_list.copy()
-        self.audio_edit = None
-        self.video_edit = None
+        self.edl = None
+        self.keyframe_shift = None
+        self.keyframe_report = None
+        self.__audio_edit = None
+        self.__render_denoised = False
+        self.__amplitude_histogram = None
         self.cutoff_ratio = None
+        self.nmf_log = []
+        self.__nmf_state = None
         self.if_noise_reduction = False
         self.if_amplitude_clipping = False
 
+    def __load_audio(self):
+        """ decode audio signal at the first access """
+        if self.__wave is not None:
+            return
+        wave = None
+        if self.__cache is not None:
+            wave = self.__cache.load_wave(self.__content_hash, self.__decode_key)
+        if wave is not None:
+            logging.info('load decoded audio from cache: {}'.format(self.file_path))
+            self.__wave = [wave[:, c] for c in range(wave.shape[1])]
+        else:
+            logging.info('decode audio: {}'.format(self.file_path))
+            self.__wave, self.frame_rate, self.channels = load_audio(
+                self.file_path, frame_rate=self.frame_rate, channels=self.channels,
+                duration=self.__media_info['duration'])
+            # memory-mapped wav file needs no cache
+            if self.__cache is not None and not isinstance(self.__wave[0], np.memmap):
+                self.__cache.save_wave(self.__content_hash, self.__decode_key, self.__wave)
+        self.__wave_raw = self.__wave.copy()
+        self.sample_width = self.__wave[0].itemsize
+        # replace the estimate from metadata by the actual sample size
+        self.length = len(self.__wave[0])
+        self.length_sec = round(1000 * self.length / self.frame_rate) / 1000
+
+    @property
+    def __decode_key(self):
+        return self.__cache.decode_key(frame_rate=self.frame_rate, channels=self.channels)
+
+    @property
+    def wave_array_np_list(self):
+        """ list of numpy array audio signal for each channel (denoised if noise reduction is applied) """
+        self.__load_audio()
+        return self.__wave
+
+    @wave_array_np_list.setter
+    def wave_array_np_list(self, wave_array_np_list):
+        self.__load_audio()
+        self.__wave = wave_array_np_list
+
+    @property
+    def wave_array_np_list_raw(self):
+        """ list of numpy array raw audio signal for each channel """
+        self.__load_audio()
+        return self.__wave_raw
+
+    @property
+    def video(self):
+        """ video as `moviepy.editor` instance (opened on demand) """
+        if self.__video is None and self.has_video:
+            logging.info('open video: {}'.format(self.file_path))
+            self.__video = editor.VideoFileClip(self.file_path)
+        return self.__video
+
     def plot(self, path_to_save: str, figure_type: str = 'signal'):
         shared = {'wave_data': self.wave_array_np_list_raw[0], 'path_to_save': path_to_save,
                   'frame_rate': self.frame_rate}
@@ -78,18 +177,77 @@ class Editor:
             raise ValueError('unknown figure type: {}'.format(figure_type))
         logging.info('plot saved at {}'.format(path_to_save))
 
-    def export(self, export_file_prefix):
+    def export(self, export_file_prefix, video_backend: str = 'ffmpeg', keyframe_tolerance_sec: float = 0.5,
+               keyframe_fallback: bool = True):
         """ Export audio/video file
         If `amplitude_clipping` has applied, the processed file will be exported, or if `noise_reduction` has applied,
         it will also be exported as a wav file. Note that (i) amplitude clipped will use raw audio, not denoised even
-        if the clipping is performed over the denoised audio, since is clearer in many cases. (ii) For video, in the
+        if the clipping is performed over the denoised audio, since is clearer in many cases (unless
+        `amplitude_clipping` is called with `denoised_audio`). (ii) For video, in the
         case where only noise_reduction has applied, it exports the denoised audio only and not combine with video.
+
+         Parameter
+        -------------
+        export_file_prefix: str
+            file prefix for audio/vieo files to be generated
+        video_backend: str
+            'ffmpeg' to cut and encode video in a single ffmpeg process, 'moviepy' to concatenate sub clips, or
+            'stream_copy' to cut video at keyframes without re-encoding (fast but inexact: boundaries are snapped to
+            keyframes, intervals overlapping after snapping are merged, and the audio is copied from the source without
+            crossfade). The shift of each boundary of the intervals to keep is stored at `keyframe_shift`, and the
+            number of cuts lost by merging and the extra duration are stored at `keyframe_report` (see
+            `util.snap_to_keyframe`).
+        keyframe_tolerance_sec: float
+            maximum shift of each boundary for `stream_copy`
+        keyframe_fallback: bool
+            for `stream_copy`, cut and encode video by 'ffmpeg' instead if any boundary is shifted more than
+            `keyframe_tolerance_sec` or any cut is lost by merging (otherwise it only warns). It also falls back to
+            'ffmpeg' if the codecs of the source don't fit mp4 container (see `util.is_mp4_compatible`)
         """
         # TODO: add an option to merge the denoised audio into video to export a new video with denoised audio
         if self.if_amplitude_clipping:
             logging.info('export edited file: {}'.format(export_file_prefix))
-            return write_file(export_file_prefix=export_file_prefix, audio=self.audio_edit, video=self.video_edit,
-                              audio_format=self.__audio_format, video_format=self.__video_format)
+            if video_backend == 'stream_copy' and self.__video_format == 'mp4' and \
+                    not is_mp4_compatible(self.file_path):
+                logging.warning('streams of {} cannot be copied into mp4: fall back to ffmpeg re-encode'.format(
+                    self.file_path))
+                video_backend = 'ffmpeg'
+            if video_backend == 'stream_copy':
+                assert self.video_interval is not None, 'stream_copy is only for edited video'
+                assert not self.__render_denoised, 'stream_copy copies the raw audio, which cannot be denoised'
+                video_interval, self.keyframe_shift = snap_to_keyframe(
+                    self.video_interval, probe_keyframe(self.file_path), tolerance_sec=keyframe_tolerance_sec)
+                self.keyframe_report = dict(
+                    max_shift=float(np.abs(self.keyframe_shift).max(initial=0)),
+                    dropped_cut=len(self.video_interval) - len(video_interval),
+                    extra_duration=float(np.sum(np.diff(video_interval, axis=1)) -
+                                         np.sum(np.diff(np.reshape(self.video_interval, (-1, 2)), axis=1))))
+                logging.info('snap to keyframe: {}'.format(self.keyframe_report))
+                tolerance_met = self.keyframe_report['max_shift'] <= keyframe_tolerance_sec and \
+                    self.keyframe_report['dropped_cut'] == 0
+                if not tolerance_met:
+                    logging.warning('keyframe tolerance ({} sec) is not met: {} cuts dropped, {:.3f} sec extra, max '
+                                    'shift {:.3f} sec'.format(keyframe_tolerance_sec,
+                                                             self.keyframe_report['dropped_cut'],
+                                                             self.keyframe_report['extra_duration'],
+                                                             self.keyframe_report['max_shift']))
+                if tolerance_met or not keyframe_fallback:
+                    return write_file(export_file_prefix=export_file_prefix, audio=None, video=self.file_path,
+                                      audio_format=self.__audio_format, video_format=self.__video_format,
+                                      video_interval=video_interval, stream_copy=True)
+                logging.info('fall back to ffmpeg re-encode')
+                video_backend = 'ffmpeg'
+            if self.video_interval is None:
+                video = None
+            elif video_backend == 'ffmpeg':
+                video = self.file_path
+            elif video_backend == 'moviepy':
+                video = self.video_edit
+            else:
+                raise ValueError('unknown video_backend: {}'.format(video_backend))
+            return write_file(export_file_prefix=export_file_prefix, audio=self.audio_edit, video=video,
+                              audio_format=self.__audio_format, video_format=self.__video_format,
+                              video_interval=self.video_interval)
         if self.if_noise_reduction:
             logging.info('export denoised audio as .wav file: {}'.format(export_file_prefix))
             wave_signal = self.wave_array_np_list[0] / pow(2, 15)
@@ -98,27 +256,69 @@ class Editor:
         else:
             raise ValueError('no edit file found')
 
-    def nmf_noise_reduction(self, noise_reference_interval: (List, Tuple), *args, **kwargs):
-        """ Apply NMF based denoising to audio wave
+    def nmf_noise_reduction(self, noise_reference_interval: (List, Tuple) = None, *args, warm_start: bool = False,
+                            block_sec: float = None, noise_profile: dict = None, **kwargs):
+        """ Apply NMF based denoising to audio wave (iterations and loss of NMF are appended to `nmf_log`)
 
          Parameter
         -------------
         noise_reference_interval: List
             (start, end) indicating the reference noise interval in the raw audio signal
+        warm_start: bool
+            initialize NMF by the result of the previous call
+        block_sec: float
+            block length (sec) of online NMF for long signal (see `nmf.nmf_filter`)
+        noise_profile: dict
+            noise profile loaded from `NoiseProfileLibrary`, whose noise basis is used instead of learning it from
+            `noise_reference_interval`
+        args, kwargs:
+            see `nmf.nmf_filter` (positional arguments follow `y_n`)
         """
         logging.info('NMF noise reduction')
-        assert len(noise_reference_interval) == 2,\
-            'noise_reference_interval should be [start, end] but {}'.format(noise_reference_interval)
-
-        # convert int16 to float32
-        signal = self.wave_array_np_list[0] / pow(2, 15)
-        s, e = noise_reference_interval
-        signal_noise = self.wave_array_np_list[0][s:e] / pow(2, 15)
-        mono = nmf_filter(signal, y_n=signal_noise, *args, **kwargs)
-        denoised_waves = [mono] * len(self.wave_array_np_list)
+        # convert int16 to float32 (channels are denoised at once by NMF with shared bases)
+        signal = np.stack(self.wave_array_np_list) / pow(2, 15)
+        if noise_profile is not None:
+            for k, v in [('frame_rate', self.frame_rate), ('n_fft', N_FFT), ('hop_length', HOP_LENGTH)]:
+                if noise_profile[k] != v:
+                    raise ValueError('noise profile has different {}: {} != {}'.format(k, noise_profile[k], v))
+            signal_noise = None
+        else:
+            assert noise_reference_interval is not None and len(noise_reference_interval) == 2,\
+                'noise_reference_interval should be [start, end] but {}'.format(noise_reference_interval)
+            s, e = noise_reference_interval
+            signal_noise = signal[:, s:e]
+        denoised, self.__nmf_state = nmf_filter(
+            signal, signal_noise, *args, init_state=self.__nmf_state if warm_start else None, return_state=True,
+            block_size=None if block_sec is None else int(block_sec * self.frame_rate),
+            basis_noise=None if noise_profile is None else noise_profile['h'], **kwargs)
+        self.nmf_log.append({k: self.__nmf_state[k] for k in ['n_iter_noise', 'loss_noise', 'n_iter', 'loss']})
+        logging.info('NMF: {}'.format(self.nmf_log[-1]))
 
         # revert float32 to int16
-        self.wave_array_np_list = list(map(lambda w: (w * pow(2, 15)).astype(np.int16), denoised_waves))
+        self.wave_array_np_list = [
+            np.clip(w * pow(2, 15), -pow(2, 15), pow(2, 15) - 1).astype(np.int16) for w in denoised]
+        self.__amplitude_histogram = None
+        self.if_noise_reduction = True
+
+    def spectral_gate_noise_reduction(self, noise_reference_interval: (List, Tuple), *args, **kwargs):
+        """ Apply spectral gating to audio wave, which is faster than NMF but assumes stationary noise
+
+         Parameter
+        -------------
+        noise_reference_interval: List
+            (start, end) indicating the reference noise interval in the raw audio signal
+        kwargs:
+            see `spectral_gate.spectral_gate`
+        """
+        logging.info('spectral gate noise reduction')
+        assert noise_reference_interval is not None and len(noise_reference_interval) == 2,\
+            'noise_reference_interval should be [start, end] but {}'.format(noise_reference_interval)
+        s, e = noise_reference_interval
+        signal = np.stack(self.wave_array_np_list) / np.float32(pow(2, 15))
+        denoised = spectral_gate(signal, signal[:, s:e], self.frame_rate, *args, **kwargs)
+        self.wave_array_np_list = [
+            np.clip(w * pow(2, 15), -pow(2, 15), pow(2, 15) - 1).astype(np.int16) for w in denoised]
+        self.__amplitude_histogram = None
         self.if_noise_reduction = True
 
     def noise_reduction(self,
@@ -126,9 +326,14 @@ class Editor:
                         cutoff_ratio: float = 0.5,
                         max_interval_ratio: int = 0.15,
                         n_iter: int = 1,
-                        custom_noise_reference_interval: List = None):
-        """ Noise Reduction based on unsupervised NMF: noise reference interval is identified based on
-        `cutoff_amplitude` technique.
+                        custom_noise_reference_interval: List = None,
+                        tol: float = 1e-4,
+                        warm_start: bool = True,
+                        block_sec: float = None,
+                        noise_profile: dict = None,
+                        method: str = 'nmf'):
+        """ Noise Reduction based on unsupervised NMF or spectral gating: noise reference interval is identified
+        based on `cutoff_amplitude` technique.
 
         signal = raw_signal
         while iteration < max_step:
@@ -149,10 +354,31 @@ class Editor:
         noise_reference_interval: List
             (start, end) indicating the reference noise interval in the raw audio signal
             if this is given, noise reference identification isn't performed
+        tol: float
+            relative tolerance of early stopping of NMF, so NMF can stop before its `n_iter` iterations (None to run
+            all of them, see `nmf.nmf_filter`)
+        warm_start: bool
+            initialize NMF of each iteration by the result of the previous one
+        block_sec: float
+            block length (sec) of online NMF for long signal (see `nmf.nmf_filter`)
+        noise_profile: dict
+            noise profile loaded from `NoiseProfileLibrary`, if this is given, noise reference identification isn't
+            performed and the noise basis of the profile is used (only for `nmf`)
+        method: str
+            `nmf` (see `nmf_noise_reduction`) or `spectral_gate` (see `spectral_gate_noise_reduction`), which is
+            faster but suits stationary noise only
         """
-
-        if custom_noise_reference_interval is not None:
-            self.nmf_noise_reduction(custom_noise_reference_interval)
+        if method not in ['nmf', 'spectral_gate']:
+            raise ValueError('unknown noise reduction method: {}'.format(method))
+        if method == 'spectral_gate':
+            if noise_profile is not None:
+                raise ValueError('noise profile is available only for `nmf`')
+            if custom_noise_reference_interval is not None:
+                self.spectral_gate_noise_reduction(custom_noise_reference_interval)
+                return
+        elif noise_profile is not None or custom_noise_reference_interval is not None:
+            self.nmf_noise_reduction(custom_noise_reference_interval, tol=tol, block_sec=block_sec,
+                                     noise_profile=noise_profile)
             return
 
         max_interval = len(self.wave_array_np_list[0]) * max_interval_ratio
@@ -172,10 +398,20 @@ class Editor:
                 if i > 0 and max_interval < interval:
                     logging.info('break as the interval is exceed max length: {} > {}'.format(interval, max_interval))
                     break
-                self.nmf_noise_reduction(noise_reference_interval=longest_interval)
+                if method == 'spectral_gate':
+                    self.spectral_gate_noise_reduction(noise_reference_interval=longest_interval)
+                else:
+                    self.nmf_noise_reduction(noise_reference_interval=longest_interval, warm_start=warm_start,
+                                             tol=tol, block_sec=block_sec)
                 i += 1
 
-    def get_cutoff_interval(self, cutoff_ratio: float, min_interval_sec: float, in_second: bool = False):
+    def get_cutoff_interval(self,
+                            cutoff_ratio: float,
+                            min_interval_sec: float,
+                            in_second: bool = False,
+                            frame_sec: float = None,
+                            hop_sec: float = None,
+                            energy_type: str = 'rms'):
         """ Get intervals to drop based on amplitude
 
          Parameter
@@ -183,9 +419,16 @@ class Editor:
         min_interval_sec: float
             see `amplitude_clipping`
         cutoff_ratio: float
-            see `amplitude_clipping`
+            cutoff percentile of the absolute amplitude of the samples, or if `frame_sec` is given, of the energy of
+            the frames, so the cutoff (and the intervals to drop) depends on `frame_sec` and `hop_sec` in frame mode
         in_second: bool
             return signals_to_drop in second otherwise sample index
+        frame_sec: float
+            if given, compare frame-level energy instead of each sample with the cutoff (frame length in second)
+        hop_sec: float
+            hop of the frames in second (`frame_sec` as default)
+        energy_type: str
+            frame-level energy, 'rms' or 'peak'
 
          Return
         ---------
@@ -194,25 +437,36 @@ class Editor:
         """
         # get amplitude threshold with mono wave signal
         logging.info('get cutoff amplitude: (cutoff_ratio {}, min_interval: {})'.format(cutoff_ratio, min_interval_sec))
-        min_amplitude = get_cutoff_amplitude(self.wave_array_np_list[0], cutoff_ratio=cutoff_ratio)
         min_interval = int(min_interval_sec * self.frame_rate)
+        if frame_sec is None:
+            if self.wave_array_np_list[0].dtype == np.int16:
+                min_amplitude = get_cutoff_amplitude_histogram(self.amplitude_histogram, cutoff_ratio=cutoff_ratio)
+            else:
+                min_amplitude = get_cutoff_amplitude(
+                    self.wave_array_np_list[0], cutoff_ratio=cutoff_ratio, method_type='partition')
 
-        # get mask position: delete the chunk if its longer than min length
-        logging.info('get masking position')
-        mask_to_drop = np.array(np.abs(self.wave_array_np_list[0]) <= min_amplitude)
-        mask_chunk = list(map(lambda x: list(x[1]), groupby(mask_to_drop)))
-        length = list(map(lambda x: len(x), mask_chunk))
-        partition = list(map(lambda x: [sum(length[:x]), sum(length[:x + 1])], range(len(length))))
+            # get mask position: delete the chunk if its longer than min length
+            logging.info('get masking position')
+            mask_to_drop = absolute_amplitude(self.wave_array_np_list[0]) <= min_amplitude
+            interval = get_mask_interval(mask_to_drop, min_interval)
+        else:
+            frame_length = max(int(frame_sec * self.frame_rate), 1)
+            hop_length = frame_length if hop_sec is None else max(int(hop_sec * self.frame_rate), 1)
+            logging.info('get frame energy: (frame {}, hop {}, {})'.format(frame_length, hop_length, energy_type))
+            energy = get_frame_energy(self.wave_array_np_list[0], frame_length, hop_length, energy_type=energy_type)
+            min_energy = get_cutoff_amplitude(energy, cutoff_ratio=cutoff_ratio, method_type='partition')
+
+            # get mask position in frame, and map it back to sample
+            logging.info('get masking position')
+            interval = get_mask_interval(energy <= min_energy)
+            interval = frame_to_sample_interval(interval, frame_length, hop_length, self.length)
+            interval = interval[interval[:, 1] - interval[:, 0] >= max(min_interval, 1)]
         if in_second:
             # mask in audio file (second)
-            signals_to_drop = list(map(
-                lambda y: [float(y[2][0] / self.frame_rate), float(y[2][1] / self.frame_rate)],
-                filter(lambda x: x[0][0] and x[1] >= min_interval, zip(mask_chunk, length, partition))))
+            signals_to_drop = (interval / self.frame_rate).tolist()
         else:
             # raw signal in the removal interval
-            signals_to_drop = list(map(
-                lambda y: [y[2][0], y[2][1]],
-                filter(lambda x: x[0][0] and x[1] >= min_interval, zip(mask_chunk, length, partition))))
+            signals_to_drop = interval.tolist()
         logging.info('{} masking position'.format(len(signals_to_drop)))
         return signals_to_drop
 
@@ -220,17 +474,35 @@ class Editor:
                            min_interval_sec: float = 0.12,
                            cutoff_ratio: float = 0.5,
                            crossfade_sec: float = None,
-                           denoised_audio: bool = False):
+                           denoised_audio: bool = False,
+                           frame_sec: float = None,
+                           hop_sec: float = None,
+                           energy_type: str = 'rms'):
         """ Amplitude-based truncation. In a given audio signal, where every sampling point has amplitude
         less than `min_amplitude` and the length is greater than `min_interval`, will be removed. Note that
-        even if the audio has multi-channel, first channel will be processed.
+        even if the audio has multi-channel, first channel will be processed. Only the edit decision list is
+        computed here, and the edited audio/video is rendered when it's accessed or exported.
 
          Parameter
         ---------------
         min_interval_sec: float
             minimum interval of cutoff (sec)
         cutoff_ratio: float
+            cutoff percentile of amplitude, or of frame energy if `frame_sec` is given (see `get_cutoff_interval`)
         crossfade_sec: float
+        denoised_audio: bool
+            render the edited audio from the denoised signal instead of the raw one (`noise_reduction` should be
+            applied before)
+        frame_sec: float
+            if given, silence is detected over frame-level energy (see `get_cutoff_interval`)
+        hop_sec: float
+            hop of the frames in second
+        energy_type: str
+            frame-level energy, 'rms' or 'peak'
+
+         Return
+        ---------------
+        edit decision list: EditDecisionList
         """
         crossfade_sec = min_interval_sec / 2 if crossfade_sec is None else crossfade_sec
         assert min_interval_sec > 0 and crossfade_sec >= 0
@@ -238,64 +510,87 @@ class Editor:
         logging.info(' * min_interval_sec: {}'.format(min_interval_sec))
         logging.info(' * cutoff_ratio    : {}'.format(cutoff_ratio))
         logging.info(' * crossfade_sec   : {}'.format(crossfade_sec))
-        # if denoised_audio:
-        #     assert self.if_noise_reduction, 'no denoised signal found'
-        #     export_file = self.file_path + '.denoised.wav'
-        #     logging.info('export denoised audio: {}'.format(export_file))
-        #     wave_signal = self.wave_array_np_list[0] / pow(2, 15)  # wav need to be float32
-        #     write_file_wav(export_file_prefix=export_file, wave_signal=wave_signal, frame_rate=self.frame_rate)
-        #     audio_stats, _ = load_file(export_file)
-        #     (self.audio, self.wave_array_np_list, _, self.frame_rate, self.sample_width, self.channels) \
-        #         = audio_stats
-
-        signals_to_drop = self.get_cutoff_interval(cutoff_ratio, min_interval_sec, in_second=True)
-        logging.info('start combining clips')
-        start, end = signals_to_drop.pop(0)
-        cf_sec = min(start/1000, min((end - start) / 2, crossfade_sec))
-        cf_sec = 0 if cf_sec < 0.001 else cf_sec  # clip too small value
-        audio = self.audio[0: (start + cf_sec) * 1000]
-        if self.video is not None:
-            video = [self.video.subclip(0, start + cf_sec / 2)]
-        else:
-            video = None
-        pointer = end
-        prev_cf_sec = cf_sec
-
-        for i in tqdm(list(range(len(signals_to_drop)))):
-
-            start, end = signals_to_drop[i]
-            cf_sec = min((end - start) / 2, crossfade_sec)  # clip cf smaller than crossfade_sec
-            cf_sec = min((len(audio) + start - pointer) / 1000, cf_sec)  # clip cf smaller than tmp audio
-            cf_sec = min((self.length_sec - end) / 1000, cf_sec)  # clip cf smaller than remaining audio
-            cf_sec = 0 if cf_sec < 0.001 else cf_sec  # clip too small value
-            audio = audio.append(self.audio[(pointer - prev_cf_sec) * 1000:(start + cf_sec) * 1000],
-                                 crossfade=prev_cf_sec * 1000)
-            if self.video is not None:
-                video.append(self.video.subclip(pointer - prev_cf_sec / 2, start + cf_sec / 2))
-            prev_cf_sec = cf_sec
-            pointer = end
-
-        if pointer != self.length_sec:
-            audio = audio.append(self.audio[(pointer - prev_cf_sec) * 1000:self.length_sec * 1000],
-                                 crossfade=prev_cf_sec * 1000)
-            if self.video is not None:
-                video.append(self.video.subclip((pointer - prev_cf_sec/2), self.length_sec))
-
-        assert audio is not None
-        logging.info('complete editing: {} sec -> {} sec'.format(self.length_sec, len(audio)/1000))
-        if self.length_sec != len(audio)/1000:
-            self.audio_edit = audio
-            if self.video is not None:
-                assert video
-                logging.info('process video: * {} sub videos'.format(len(video)))
-                self.video_edit = editor.concatenate_videoclips(video)
+        if denoised_audio:
+            assert self.if_noise_reduction, 'no denoised signal found'
+
+        signals_to_drop = self.get_cutoff_interval(
+            cutoff_ratio, min_interval_sec, in_second=True, frame_sec=frame_sec, hop_sec=hop_sec,
+            energy_type=energy_type)
+        keep_interval, crossfade = get_keep_interval(
+            signals_to_drop, crossfade_sec=crossfade_sec, length_sec=self.length_sec, frame_rate=self.frame_rate)
+        self.edl = EditDecisionList(keep_interval, crossfade, frame_rate=self.frame_rate, length_sec=self.length_sec,
+                                    source=self.file_path)
+        self.__audio_edit = None
+        self.__render_denoised = denoised_audio
+        logging.info('complete editing: {} sec -> {} sec ({} clips)'.format(
+            self.length_sec, self.edl.edited_length_sec, len(self.edl)))
         self.cutoff_ratio = cutoff_ratio
         self.if_amplitude_clipping = True
+        return self.edl
+
+    @property
+    def audio(self):
+        """ raw audio as `pydub.AudioSegment` instance (created on demand if the audio is decoded by ffmpeg) """
+        if self.__audio is None:
+            self.__audio = to_audio_segment(np.stack(self.wave_array_np_list_raw, axis=1),
+                                            frame_rate=self.frame_rate, sample_width=self.sample_width)
+        return self.__audio
+
+    @property
+    def audio_edit(self):
+        """ edited audio as `pydub.AudioSegment` instance (rendered from the edit decision list on demand, over the
+        denoised signal if `amplitude_clipping` is called with `denoised_audio`) """
+        if self.edl is None:
+            return None
+        if self.__audio_edit is None:
+            logging.info('render audio: * {} clips'.format(len(self.edl)))
+            wave = self.wave_array_np_list if self.__render_denoised else self.wave_array_np_list_raw
+            wave = assemble_audio(wave, keep_interval=self.edl.keep_interval_sample,
+                                  crossfade=self.edl.crossfade_sample)
+            self.__audio_edit = to_audio_segment(wave, frame_rate=self.frame_rate, sample_width=self.sample_width)
+        return self.__audio_edit
+
+    @property
+    def video_interval(self):
+        """ (start, end) in second of each span of video to keep """
+        if self.edl is None or not self.has_video:
+            return None
+        return self.edl.video_interval
+
+    @property
+    def video_edit(self):
+        """ edited video as `moviepy.editor` instance (sub clips are concatenated on demand) """
+        if self.video_interval is None:
+            return None
+        logging.info('process video: * {} sub videos'.format(len(self.video_interval)))
+        interval = np.clip(self.video_interval, 0, self.video.duration)
+        return editor.concatenate_videoclips([self.video.subclip(s, e) for s, e in interval if s < e])
+
+    @property
+    def noise_profile(self):
+        """ noise basis learnt by the last NMF noise reduction, to be saved by `NoiseProfileLibrary.save` """
+        if self.__nmf_state is None:
+            return None
+        return dict(h=self.__nmf_state['h_noise'], frame_rate=self.frame_rate, n_fft=N_FFT, hop_length=HOP_LENGTH)
+
+    @property
+    def amplitude_histogram(self):
+        """ cumulative histogram of absolute amplitude of the first channel (kept until the signal is denoised) """
+        if self.__amplitude_histogram is None:
+            # histogram of the raw audio is cached
+            use_cache = self.__cache is not None and self.__content_hash is not None and not self.if_noise_reduction
+            if use_cache:
+                self.__amplitude_histogram = self.__cache.load_histogram(self.__content_hash, self.__decode_key)
+            if self.__amplitude_histogram is None:
+                self.__amplitude_histogram = get_amplitude_histogram(self.wave_array_np_list[0])
+                if use_cache:
+                    self.__cache.save_histogram(self.__content_hash, self.__decode_key, self.__amplitude_histogram)
+        return self.__amplitude_histogram
 
     @property
     def file_identifier(self):
         """ file identifier """
-        if self.video is not None:
+        if self.has_video:
             return self.__video_format
         else:
             return self.__audio_format
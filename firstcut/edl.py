@@ -0,0 +1,117 @@
+""" Edit decision list (EDL): result of the analysis, which is rendered to audio/video lazily """
+import json
+import os
+
+import numpy as np
+
+from .util import ffconcat_script
+
+__all__ = 'EditDecisionList'
+
+
+def timecode(second: float, fps: int):
+    """ Convert second to non-drop frame timecode `HH:MM:SS:FF` """
+    frame = int(round(second * fps))
+    return '{:02d}:{:02d}:{:02d}:{:02d}'.format(
+        frame // (3600 * fps), frame // (60 * fps) % 60, frame // fps % 60, frame % fps)
+
+
+class EditDecisionList:
+    """ Edit decision list: spans to keep in the source, and crossfade at each join """
+
+    def __init__(self, keep_interval, crossfade, frame_rate: int, length_sec: float, source: str = None):
+        """ Edit decision list
+
+         Parameter
+        -------------
+        keep_interval: 2d nd.array
+            (start, end) in second of each span of audio to keep, including the region overlapping with the
+            neighbours by crossfade
+        crossfade: 1d nd.array
+            crossfade (sec) between each span and the previous one (the first one is always 0)
+        frame_rate: int
+            frame rate of the source audio
+        length_sec: float
+            length of the source (sec)
+        source: str
+            path to the source file
+        """
+        self.keep_interval = np.asarray(keep_interval, dtype=np.float64).reshape(-1, 2)
+        self.crossfade = np.asarray(crossfade, dtype=np.float64).reshape(-1)
+        assert len(self.keep_interval) == len(self.crossfade), 'inconsistent size: {} != {}'.format(
+            len(self.keep_interval), len(self.crossfade))
+        self.frame_rate = frame_rate
+        self.length_sec = length_sec
+        self.source = source
+
+    def __len__(self):
+        return len(self.keep_interval)
+
+    def __repr__(self):
+        return 'EditDecisionList(clips={}, {} sec -> {} sec)'.format(len(self), self.length_sec, self.edited_length_sec)
+
+    @property
+    def edited_length_sec(self):
+        """ length of the edited audio/video (sec) """
+        return float((self.keep_interval[:, 1] - self.keep_interval[:, 0]).sum() - self.crossfade.sum())
+
+    @property
+    def keep_interval_sample(self):
+        """ (start, end) sample index of each span to keep """
+        return (self.keep_interval * self.frame_rate).astype(np.int64)
+
+    @property
+    def crossfade_sample(self):
+        """ crossfade (sample) between each span and the previous one """
+        return (self.crossfade * self.frame_rate).astype(np.int64)
+
+    @property
+    def video_interval(self):
+        """ (start, end) in second of each span of video to keep: video is cut at the middle of each crossfade """
+        crossfade_next = np.append(self.crossfade[1:], 0)
+        return np.stack(
+            [self.keep_interval[:, 0] + self.crossfade / 2, self.keep_interval[:, 1] - crossfade_next / 2], axis=1)
+
+    def to_dict(self):
+        return {'source': self.source, 'frame_rate': self.frame_rate, 'length_sec': self.length_sec,
+                'keep_interval': self.keep_interval.tolist(), 'crossfade': self.crossfade.tolist()}
+
+    @classmethod
+    def from_dict(cls, dictionary: dict):
+        return cls(**dictionary)
+
+    def to_json(self, path: str = None):
+        """ Export as json string (saved at `path` if given) """
+        json_str = json.dumps(self.to_dict())
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(json_str)
+        return json_str
+
+    @classmethod
+    def from_json(cls, json_str: str):
+        """ Load from json string or path to json file """
+        if os.path.exists(json_str):
+            with open(json_str) as f:
+                json_str = f.read()
+        return cls.from_dict(json.loads(json_str))
+
+    def to_ffmpeg_concat(self, source: str = None):
+        """ Export as ffmpeg concat demuxer script (`ffmpeg -f concat -safe 0 -i script.txt`) over video interval """
+        source = self.source if source is None else source
+        assert source, 'source file is not specified'
+        return ffconcat_script(source, self.video_interval)
+
+    def to_cmx3600(self, title: str = 'firstcut', fps: int = 30, reel: str = 'AX'):
+        """ Export as CMX 3600 EDL over video interval (non-drop frame timecode) """
+        lines = ['TITLE: {}'.format(title), 'FCM: NON-DROP FRAME', '']
+        record = 0.0
+        for n, (start, end) in enumerate(self.video_interval):
+            record_end = record + end - start
+            lines.append('{:03d}  {:<8} {:<5} C        {} {} {} {}'.format(
+                n + 1, reel, 'AA/V', timecode(start, fps), timecode(end, fps), timecode(record, fps),
+                timecode(record_end, fps)))
+            if self.source is not None:
+                lines.append('* FROM CLIP NAME: {}'.format(os.path.basename(self.source)))
+            record = record_end
+        return '\n'.join(lines) + '\n'
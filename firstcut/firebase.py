@@ -57,6 +57,15 @@ class FireBaseConnector:
         url = self.__storage.child(file_name).get_url(token=None)
         return url
 
+    def get_etag(self, file_name: str):
+        """ ETag of the file, which changes when the content is updated (None if it's not available) """
+        try:
+            blob = self.__storage.bucket.get_blob(file_name)
+            return None if blob is None else blob.etag
+        except Exception:
+            logging.exception('failed to get etag: {}'.format(file_name))
+            return None
+
     def upload(self, file_path: str):
         file_name = os.path.basename(file_path)
 
@@ -0,0 +1,115 @@
+""" Silence interval detection: run-length over boolean masks and frame-level energy """
+import numpy as np
+
+from .cutoff_amplitude import absolute_amplitude
+
+__all__ = ('get_mask_interval', 'get_frame_energy', 'frame_to_sample_interval')
+
+FRAME_BLOCK_SIZE = pow(2, 14)
+
+
+def get_mask_interval(mask, min_interval: int = 0):
+    """ Get intervals where the mask is continuously True
+
+     Parameter
+    -----------
+    mask: 1d nd.array
+        boolean mask (eg. `np.abs(wave_data) <= cutoff_amplitude`)
+    min_interval: int
+        minimum length of interval to keep
+
+     Return
+    -----------
+    interval: 2d nd.array
+        array of shape (n, 2) where each row is [start, end) index of a True run
+    """
+    mask = np.asarray(mask, dtype=bool)
+    assert np.ndim(mask) == 1
+    if len(mask) == 0:
+        return np.zeros((0, 2), dtype=np.int64)
+
+    # position where the value changes from the previous one
+    boundary = np.flatnonzero(mask[1:] != mask[:-1]) + 1
+    start = boundary[mask[boundary]]
+    end = boundary[~mask[boundary]]
+    if mask[0]:
+        start = np.concatenate(([0], start))
+    if mask[-1]:
+        end = np.concatenate((end, [len(mask)]))
+    interval = np.stack([start, end], axis=1).astype(np.int64)
+    if min_interval > 0:
+        interval = interval[interval[:, 1] - interval[:, 0] >= min_interval]
+    return interval
+
+
+def get_frame_energy(wave_data, frame_length: int, hop_length: int = None, energy_type: str = 'rms'):
+    """ Get energy of each frame over a strided view of the signal (frames are processed block by block to bound
+    the memory of the float conversion). Tail samples which don't fill a frame are not analyzed, and ValueError is
+    raised if the signal is shorter than a frame.
+
+     Parameter
+    -----------
+    wave_data: 1d nd.array
+        mono wave signal
+    frame_length: int
+        frame length (sample)
+    hop_length: int
+        hop length (sample), `frame_length` as default
+    energy_type: str
+        'rms' (root mean square) or 'peak' (max absolute amplitude)
+
+     Return
+    -----------
+    energy: 1d nd.array
+        energy of each frame, where i-th frame covers [i * hop_length, i * hop_length + frame_length)
+    """
+    assert np.ndim(wave_data) == 1
+    hop_length = frame_length if hop_length is None else hop_length
+    assert frame_length > 0 and hop_length > 0
+    wave_data = np.asarray(wave_data)
+    if len(wave_data) < frame_length:
+        raise ValueError('signal ({} samples) is shorter than a frame ({} samples)'.format(
+            len(wave_data), frame_length))
+    n_frame = 1 + (len(wave_data) - frame_length) // hop_length
+    frames = np.lib.stride_tricks.as_strided(
+        wave_data, shape=(n_frame, frame_length), strides=(hop_length * wave_data.strides[0], wave_data.strides[0]),
+        writeable=False)
+    if energy_type == 'rms':
+        energy = np.zeros(n_frame, dtype=np.float64)
+        for i in range(0, n_frame, FRAME_BLOCK_SIZE):
+            block = frames[i:i + FRAME_BLOCK_SIZE].astype(np.float64)
+            energy[i:i + FRAME_BLOCK_SIZE] = np.sqrt(np.einsum('ij,ij->i', block, block) / frame_length)
+    elif energy_type == 'peak':
+        energy = np.zeros(n_frame, dtype=np.int64)
+        for i in range(0, n_frame, FRAME_BLOCK_SIZE):
+            energy[i:i + FRAME_BLOCK_SIZE] = absolute_amplitude(frames[i:i + FRAME_BLOCK_SIZE]).max(axis=1)
+    else:
+        raise ValueError('unknown `energy_type`: {}'.format(energy_type))
+    return energy
+
+
+def frame_to_sample_interval(interval, frame_length: int, hop_length: int, length: int):
+    """ Map intervals of frame index to sample index
+
+     Parameter
+    -----------
+    interval: 2d nd.array
+        [start, end) of frame index attained from `get_mask_interval` over frame-level mask
+    frame_length: int
+        frame length (sample)
+    hop_length: int
+        hop length (sample)
+    length: int
+        sample size of the signal
+
+     Return
+    -----------
+    interval: 2d nd.array
+        [start, end) of sample index, which spans every sample of the frames in the interval. Interval reaching the
+        last frame is extended to the end of the signal.
+    """
+    interval = np.asarray(interval, dtype=np.int64).reshape(-1, 2)
+    n_frame = 1 + (length - min(frame_length, length)) // hop_length
+    start = interval[:, 0] * hop_length
+    end = np.where(interval[:, 1] >= n_frame, length, (interval[:, 1] - 1) * hop_length + frame_length)
+    return np.stack([start, np.minimum(end, length)], axis=1)
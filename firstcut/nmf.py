@@ -1,13 +1,17 @@
 """ Non-negative Matric Factrization (NMF) """
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 
 import numpy as np
-import librosa
+
+from .stft import stft, istft
 
 logging.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s', level=logging.INFO, datefmt='%Y-%m-%d %H:%M:%S')
 
 EPS = np.spacing(1)
+N_FFT = 2048
+HOP_LENGTH = 512
 
 
 def euclid_divergence(y, yh):
@@ -25,8 +29,13 @@ def nmf(y,
         basis_h: (List, np.array) = None,
         init_h: (List, np.array) = None,
         init_u: (List, np.array) = None,
-        display_log: bool = False):
+        display_log: bool = False,
+        cost_interval: int = 1,
+        tol: float = None,
+        update_h: bool = True):
     """ decompose non-negative matrix to components and activation with NMF
+    Multiplicative update is computed over work buffers allocated once, where `HU` is computed once per half-step
+    (and not at all for "euc", which uses the r x r gram matrix instead).
 
     y ≈　HU
     y ∈ r (m, n)
@@ -36,7 +45,8 @@ def nmf(y,
      Parameter
     ----------------
     y: numpy.array
-        target matrix to decompose
+        target matrix to decompose, or batch of matrices of shape (c, m, n) to decompose with shared h and stacked
+        u of shape (c, k, n) (same as decomposing the matrices concatenated along the columns)
     r: int
         number of bases to decompose
     n_iter: int
@@ -47,22 +57,39 @@ def nmf(y,
         initial value of h matrix. default value is random matrix
     init_u:
         initial value of u matrix. default value is random matrix
+    cost_interval: int
+        compute the cost every `cost_interval` iterations (0 to skip it, unless `display_log`)
+    tol: float
+        stop when the relative decrease of the cost from the previous computation is less than `tol` (the cost is
+        computed at least every iteration if `cost_interval` is 0)
+    update_h: bool
+        update h (False to solve u with h fixed by `init_h`, where each column of u is independent)
 
      Return
     ----------------
     Array of:
     0: matrix of h
     1: matrix of u
-    2: array of cost transition
+    2: array of cost transition over the iterations actually run (nan at the iterations where the cost is not
+       computed)
     """
 
     # size of input spectrogram
-    assert np.ndim(y) == 2
+    assert np.ndim(y) in [2, 3]
+    if div not in ['kl', 'euc']:
+        raise ValueError('unknown divergence: {}'.format(div))
+    batch = None
+    if np.ndim(y) == 3:
+        # batch shares h, so it's same as the matrices concatenated along the columns with u stacked in the same way
+        batch, n_col = y.shape[0], y.shape[2]
+        y = np.concatenate(list(y), axis=1)
+        if init_u is not None:
+            init_u = np.concatenate(list(init_u), axis=1)
     m, n = y.shape
 
     # initialization
-    u = np.random.rand(r, n) if init_u is None else np.array(init_u)
-    h = np.random.rand(m, r) if init_h is None else np.array(init_h)
+    u = np.random.rand(r, n) if init_u is None else np.array(init_u, dtype=np.float64)
+    h = np.random.rand(m, r) if init_h is None else np.array(init_h, dtype=np.float64)
 
     # reflect basis h
     if basis_h is None:
@@ -72,60 +99,123 @@ def nmf(y,
         assert fix_index < h.shape[1], "Over Size: {} > {}".format(fix_index, h.shape[1])
         h[0:, 0:fix_index] = basis_h
 
-    # array to save the value of the euclid divergence
-    cost = np.zeros(n_iter)
+    # array to save the value of the divergence
+    cost = np.full(n_iter, np.nan)
+    if tol is not None and cost_interval <= 0:
+        cost_interval = 1
+    cost_prev = None
 
-    # computation of lam (estimate of y)
-    lam = np.dot(h, u)
+    # work buffers
+    hu = np.empty((m, n))  # estimate of y (lam)
+    buffer = np.empty((m, n))
+    numerator_h, numerator_u = np.empty((m, r)), np.empty((r, n))
+    denominator_h, denominator_u = np.empty((m, r)), np.empty((r, n))
+    y_sum = y.sum(dtype=np.float64)
+    np.dot(h, u, out=hu)
 
     # iterative computation
     for i in range(n_iter):
+        compute_cost = display_log or (cost_interval > 0 and i % cost_interval == 0)
         if div == "euc":
-            # compute euclid divergence
-            cost[i] = euclid_divergence(y, lam)
+            if compute_cost:
+                # compute euclid divergence
+                np.dot(h, u, out=hu)
+                np.subtract(y, hu, out=buffer)
+                cost[i] = 1 / 2 * np.vdot(buffer, buffer)
             # update h
-            h *= np.dot(y, u.T) / (np.dot(np.dot(h, u), u.T) + EPS)
-            if fix_index > 0:
-                h[0:, 0:fix_index] = basis_h
+            if update_h:
+                np.dot(y, u.T, out=numerator_h)
+                np.dot(h, np.dot(u, u.T), out=denominator_h)
+                denominator_h += EPS
+                numerator_h /= denominator_h
+                h *= numerator_h
+                if fix_index > 0:
+                    h[0:, 0:fix_index] = basis_h
             # update u
-            u *= np.dot(h.T, y) / (np.dot(np.dot(h.T, h), u) + EPS)
-        elif div == "kl":
-            # compute euclid divergence
-            cost[i] = kl_divergence(y, lam)
+            np.dot(h.T, y, out=numerator_u)
+            np.dot(np.dot(h.T, h), u, out=denominator_u)
+            denominator_u += EPS
+            numerator_u /= denominator_u
+            u *= numerator_u
+        else:
+            if compute_cost:
+                # compute kl divergence: hu is the estimate of the previous iteration
+                np.add(hu, EPS, out=buffer)
+                np.divide(y, buffer, out=buffer)
+                np.maximum(buffer, EPS, out=buffer)
+                np.log(buffer, out=buffer)
+                buffer *= y
+                cost[i] = buffer.sum() - y_sum + hu.sum()
             # update h
-            numerator_h = np.dot((y / (np.dot(h, u) + EPS)), u.T)
-            denominator_h = np.tile(u.sum(axis=1), (m, 1))
-            h *= numerator_h / (denominator_h + EPS)
-            if fix_index > 0:
-                h[0:, 0:fix_index] = basis_h
+            if update_h:
+                np.add(hu, EPS, out=buffer)
+                np.divide(y, buffer, out=buffer)
+                np.dot(buffer, u.T, out=numerator_h)
+                numerator_h /= u.sum(axis=1) + EPS
+                h *= numerator_h
+                if fix_index > 0:
+                    h[0:, 0:fix_index] = basis_h
+                np.dot(h, u, out=hu)
             # update u
-            numerator_u = np.dot(h.T, (y / (np.dot(h, u) + EPS)))
-            denominator_u = np.tile(h.sum(axis=0), (n, 1))
-            u *= numerator_u / (denominator_u.T + EPS)
-        else:
-            raise ValueError('unknown divergence: {}'.format(div))
-        # recomputation of lam
-        lam = np.dot(h, u)
+            np.add(hu, EPS, out=buffer)
+            np.divide(y, buffer, out=buffer)
+            np.dot(h.T, buffer, out=numerator_u)
+            numerator_u /= (h.sum(axis=0) + EPS)[:, None]
+            u *= numerator_u
+            # estimate for the next iteration
+            np.dot(h, u, out=hu)
         if display_log:
             logging.info('nmf: iter {}: loss {}'.format(i, cost[i]))
+        if tol is not None and compute_cost:
+            # cost is the one before this iteration's update
+            if cost_prev is not None and abs(cost_prev - cost[i]) <= tol * max(abs(cost_prev), EPS):
+                logging.info('nmf: converged at iter {} (loss {})'.format(i, cost[i]))
+                cost = cost[:i + 1]
+                break
+            cost_prev = cost[i]
+    if batch is not None:
+        u = np.stack([u[:, b * n_col:(b + 1) * n_col] for b in range(batch)])
     return [h, u, cost]
 
 
+def wiener_filter(y_stft, h, u, basis_noise_num: int, basis_num: int, length: int = None):
+    """ Mask spectrogram by the ratio of the target components in NMF estimate, and revert it to signal (spectrogram
+    and u can have leading channel axis) """
+    y_est = np.matmul(h, u)
+    y_target = np.matmul(h[0:, basis_noise_num:basis_noise_num + basis_num],
+                         u[..., basis_noise_num:basis_noise_num + basis_num, 0:])
+
+    # smoothing
+    y_mask = y_target / (y_est + EPS)
+
+    y_sep = np.abs(y_stft) ** 2 * y_mask
+    y_phase = np.cos(np.angle(y_stft) + 1j * np.sin(np.angle(y_stft)))
+    return istft(y_sep * y_phase, hop_length=HOP_LENGTH, length=length)
+
+
 def nmf_filter(y_o: List,
                y_n: List,
                n_iter: int = 50,
                div: str = "kl",
                normalize_scale: float = 2,
                basis_noise_num: int = 20,
-               basis_num: int = 20):
+               basis_num: int = 20,
+               tol: float = 1e-4,
+               cost_interval: int = 5,
+               init_state: dict = None,
+               return_state: bool = False,
+               block_size: int = None,
+               n_jobs: int = 1,
+               basis_noise=None):
     """ NMF based noise reduction filter
 
      Parameter
     -----------
     y_o: List
-        1-d raw signal
+        1-d raw signal, or 2-d signal of shape (channel, sample), where the channels are decomposed at once with
+        shared bases and activation of each channel
     y_n: List
-        1-d noise reference signal
+        1-d noise reference signal, or 2-d signal of shape (channel, sample) (not used if `basis_noise` is given)
     n_iter: int
         optimization steps at NMF
     div: str
@@ -134,31 +224,97 @@ def nmf_filter(y_o: List,
         after NMF denoising, the signal is normalized to avoid having excessive volume by
             norm = max(denoised_signal) / (normalize_scale * max(y_o))
             denoised_signal = denoised_signal / norm
+    tol: float
+        relative tolerance of early stopping of NMF, where NMF stops before `n_iter` once the relative decrease of
+        the cost is less than `tol` (None to run all of `n_iter` as before the default was changed to 1e-4)
+    cost_interval: int
+        the cost is computed every `cost_interval` iterations for early stopping and report
+    init_state: dict
+        state returned by the previous call to warm start NMF (each matrix is used only if its shape matches)
+    return_state: bool
+        return the state of NMF as well
+    block_size: int
+        if the signal is longer than this (sample), online mode is used: the bases are fitted over the frames
+        subsampled from the signal (`block_size` samples in total), and with the bases fixed, activation and the
+        wiener filter are computed block by block of `block_size` samples, so the memory scales with the block size.
+    n_jobs: int
+        number of blocks processed in parallel in online mode
+    basis_noise: 2d nd.array
+        noise basis learnt beforehand (eg. `h_noise` of the state), where the NMF on noise reference is skipped and
+        `basis_noise_num` is given by its shape
+
+     Return
+    -----------
+    y_denoised: 1d nd.array
+    state: dict
+        (if `return_state`) `h_noise`, `h`, `u` (NMF matrices, `u` is None in online mode), `n_iter_noise`,
+        `loss_noise`, `n_iter`, `loss` (iterations actually run and the last loss of the noise basis fit and the
+        separation)
     """
 
+    def init(key, shape):
+        if init_state is None or init_state.get(key) is None or np.shape(init_state[key]) != shape:
+            return None
+        return init_state[key]
+
+    def last_loss(cost):
+        cost = cost[~np.isnan(cost)]
+        return float(cost[-1]) if len(cost) > 0 else None
+
+    y_o = np.asarray(y_o)
+    length = y_o.shape[-1]
     max_amp = np.abs(y_o).max()
 
-    nmf_shared = {'n_iter': n_iter, 'div': div}
+    nmf_shared = {'n_iter': n_iter, 'div': div, 'cost_interval': cost_interval, 'tol': tol}
     # training
-    logging.info('nmf on noise reference: {}'.format(len(y_n)))
-    y_n = librosa.stft(y_n)
-    h_n, u_n, _ = nmf(np.abs(y_n), r=basis_noise_num, **nmf_shared)
+    if basis_noise is not None:
+        h_n, cost_n = np.asarray(basis_noise, dtype=np.float64), np.zeros(0)
+        assert h_n.shape[0] == N_FFT // 2 + 1, 'inconsistent shape of noise basis: {}'.format(h_n.shape)
+        basis_noise_num = h_n.shape[1]
+    else:
+        logging.info('nmf on noise reference: {}'.format(np.shape(y_n)[-1]))
+        y_n = stft(np.asarray(y_n), n_fft=N_FFT, hop_length=HOP_LENGTH)
+        h_n, u_n, cost_n = nmf(np.abs(y_n), r=basis_noise_num,
+                               init_h=init('h_noise', (y_n.shape[-2], basis_noise_num)), **nmf_shared)
 
     # separation
-    logging.info('nmf on source signal: {}'.format(len(y_o)))
-    y_o = librosa.stft(y_o)
-    h_o, u_o, _ = nmf(np.abs(y_o), r=basis_noise_num + basis_num, basis_h=h_n, **nmf_shared)
+    r = basis_noise_num + basis_num
+    if block_size is None or length <= block_size:
+        logging.info('nmf on source signal: {}'.format(y_o.shape))
+        y_o = stft(y_o, n_fft=N_FFT, hop_length=HOP_LENGTH)
+        h_o, u_o, cost_o = nmf(np.abs(y_o), r=r, basis_h=h_n, init_h=init('h', (y_o.shape[-2], r)),
+                               init_u=init('u', y_o.shape[:-2] + (r, y_o.shape[-1])), **nmf_shared)
+        y_denoised = wiener_filter(y_o, h_o, u_o, basis_noise_num, basis_num)
+    else:
+        # fit bases on the frames subsampled over the signal, and solve activation block by block with the bases fixed
+        n_block = int(np.ceil(length / block_size))
+        logging.info('online nmf on source signal: {} ({} blocks)'.format(y_o.shape, n_block))
+        y_sub = np.concatenate([
+            np.abs(stft(y_o[..., s:s + block_size // n_block], n_fft=N_FFT, hop_length=HOP_LENGTH))
+            for s in np.linspace(0, length - block_size // n_block, n_block).astype(int)], axis=-1)
+        h_o, _, cost_o = nmf(y_sub, r=r, basis_h=h_n, init_h=init('h', (y_sub.shape[-2], r)), **nmf_shared)
+        u_o = None
+        block_size = int(np.ceil(block_size / HOP_LENGTH)) * HOP_LENGTH  # aligned to the frames
+        y_denoised = np.zeros(y_o.shape, dtype=np.float32)
 
-    # wiener filter
-    y_est = np.dot(h_o, u_o)
-    y_target = np.dot(h_o[0:, basis_noise_num:basis_noise_num + basis_num],
-                      u_o[basis_noise_num:basis_noise_num + basis_num, 0:])
+        def denoise_block(block_start):
+            # padding of n_fft gives the frames covering the block same as the frames of the whole signal
+            pad_start = max(block_start - N_FFT, 0)
+            block_end = min(block_start + block_size, length)
+            pad_end = min(block_end + N_FFT, length)
+            y_block = stft(y_o[..., pad_start:pad_end], n_fft=N_FFT, hop_length=HOP_LENGTH)
+            _, u_block, _ = nmf(np.abs(y_block), r=r, init_h=h_o, update_h=False, n_iter=n_iter, div=div,
+                                cost_interval=cost_interval, tol=tol)
+            y_block = wiener_filter(y_block, h_o, u_block, basis_noise_num, basis_num, length=pad_end - pad_start)
+            y_denoised[..., block_start:block_end] = y_block[..., block_start - pad_start:block_end - pad_start]
 
-    # smoothing
-    y_mask = y_target / (y_est + EPS)
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            list(executor.map(denoise_block, range(0, length, block_size)))
+    logging.info('nmf: {} iterations (noise), {} iterations (source)'.format(len(cost_n), len(cost_o)))
 
-    y_sep = np.abs(y_o) ** 2 * y_mask
-    y_phase = np.cos(np.angle(y_o) + 1j * np.sin(np.angle(y_o)))
-    y_denoised = librosa.istft(y_sep * y_phase)
     y_denoised_normalize = y_denoised / np.max(y_denoised) * (max_amp * normalize_scale)
-    return y_denoised_normalize
+    if not return_state:
+        return y_denoised_normalize
+    state = {'h_noise': h_n, 'h': h_o, 'u': u_o, 'n_iter_noise': len(cost_n), 'loss_noise': last_loss(cost_n),
+             'n_iter': len(cost_o), 'loss': last_loss(cost_o)}
+    return y_denoised_normalize, state
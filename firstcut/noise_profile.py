@@ -0,0 +1,113 @@
+""" Persistent library of noise bases learned by NMF, to reuse them across jobs recorded in the same environment
+
+profile_dir
+├── <profile id>.npy    noise basis `h` of shape (n_fft / 2 + 1, basis_noise_num) in float32
+└── <profile id>.json   frame_rate, n_fft, hop_length and any other metadata
+"""
+import json
+import logging
+import os
+import re
+from collections import OrderedDict
+from threading import Lock
+
+import numpy as np
+
+from .nmf import N_FFT, HOP_LENGTH
+
+__all__ = 'NoiseProfileLibrary'
+
+PROFILE_ID_PATTERN = re.compile(r'\A[A-Za-z0-9_\-]{1,128}\Z')
+
+
+class NoiseProfileLibrary:
+    """ Persistent library of noise bases with in-memory LRU cache """
+
+    def __init__(self, profile_dir: str, max_cache: int = 16):
+        """ Persistent library of noise bases
+
+         Parameter
+        ----------------
+        profile_dir: str
+            directory to store the profiles
+        max_cache: int
+            number of profiles kept in memory
+        """
+        self.profile_dir = profile_dir
+        self.max_cache = max_cache
+        self.__cache = OrderedDict()
+        self.__lock = Lock()
+        os.makedirs(self.profile_dir, exist_ok=True)
+
+    def __path(self, profile_id: str, extension: str):
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            raise ValueError('invalid profile id: {}'.format(profile_id))
+        return os.path.join(self.profile_dir, '{}.{}'.format(profile_id, extension))
+
+    def __contains__(self, profile_id: str):
+        return isinstance(profile_id, str) and PROFILE_ID_PATTERN.match(profile_id) is not None and \
+            os.path.exists(self.__path(profile_id, 'json'))
+
+    @property
+    def profile_ids(self):
+        return sorted(os.path.splitext(i)[0] for i in os.listdir(self.profile_dir) if i.endswith('.json'))
+
+    def save(self, profile_id: str, h, frame_rate: int, n_fft: int = N_FFT, hop_length: int = HOP_LENGTH, **kwargs):
+        """ Save noise basis
+
+         Parameter
+        ----------------
+        profile_id: str
+            alphanumeric id (`_` and `-` are allowed), which is overwritten if it exists
+        h: 2d nd.array
+            noise basis of shape (n_fft / 2 + 1, basis_noise_num)
+        frame_rate: int
+            frame rate of the audio the basis is learnt from
+        n_fft, hop_length: int
+            STFT parameter
+        kwargs:
+            any other metadata to save
+        """
+        h = np.asarray(h, dtype=np.float32)
+        assert h.ndim == 2 and h.shape[0] == n_fft // 2 + 1, 'inconsistent shape of basis: {}'.format(h.shape)
+        info = dict(frame_rate=frame_rate, n_fft=n_fft, hop_length=hop_length, basis_noise_num=h.shape[1], **kwargs)
+        with self.__lock:
+            # basis first, so the profile becomes visible (json) only when it's complete
+            np.save(self.__path(profile_id, 'npy'), h)
+            with open(self.__path(profile_id, 'json'), 'w') as f:
+                json.dump(info, f)
+            self.__cache.pop(profile_id, None)
+        logging.info('save noise profile: {} {}'.format(profile_id, info))
+
+    def load(self, profile_id: str):
+        """ Load noise profile
+
+         Parameter
+        ----------------
+        profile_id: str
+
+         Return
+        ----------------
+        profile: dict
+            `h` (noise basis) and the metadata
+        """
+        with self.__lock:
+            if profile_id in self.__cache:
+                self.__cache.move_to_end(profile_id)
+                return self.__cache[profile_id]
+            if profile_id not in self:
+                raise ValueError('unknown noise profile: {}'.format(profile_id))
+            with open(self.__path(profile_id, 'json')) as f:
+                profile = json.load(f)
+            profile['h'] = np.load(self.__path(profile_id, 'npy'))
+            self.__cache[profile_id] = profile
+            if len(self.__cache) > self.max_cache:
+                self.__cache.popitem(last=False)
+            return profile
+
+    def remove(self, profile_id: str):
+        with self.__lock:
+            self.__cache.pop(profile_id, None)
+            for extension in ['json', 'npy']:
+                if os.path.exists(self.__path(profile_id, extension)):
+                    os.remove(self.__path(profile_id, extension))
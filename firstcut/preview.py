@@ -0,0 +1,178 @@
+""" Analysis-only preview of amplitude clipping: intervals to drop and the edited duration for many parameters over
+the same audio, without rendering """
+import logging
+from collections import OrderedDict
+from threading import BoundedSemaphore, Event, Lock
+
+import numpy as np
+
+from .cutoff_amplitude import get_cutoff_amplitude_histogram, absolute_amplitude
+from .interval import get_mask_interval
+from .render import get_keep_interval
+from .edl import EditDecisionList
+from .api_util import QueueFullError
+
+logging.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s', level=logging.INFO, datefmt='%Y-%m-%d %H:%M:%S')
+__all__ = ('ClipPreview', 'PreviewCache')
+BLOCK_SEC = 0.02  # block to summarize the amplitude by its max
+
+
+class ClipPreview:
+    """ Preview of `Editor.amplitude_clipping`: the absolute amplitude of the first channel, its histogram and the max
+    of each block are computed once. A silent interval longer than two blocks contains a whole block whose max is under
+    the cutoff, so such intervals are found over the blocks and their ends are refined within the neighbouring blocks.
+    The intervals are same as `Editor.get_cutoff_interval` with sample-level detection. """
+
+    def __init__(self, editor, block_sec: float = BLOCK_SEC):
+        """ Preview of amplitude clipping
+
+         Parameter
+        ---------------
+        editor: Editor
+            editor of the audio (the decoded audio isn't referred after this)
+        block_sec: float
+            length of block (sec)
+        """
+        self.frame_rate = editor.frame_rate
+        self.amplitude = absolute_amplitude(editor.wave_array_np_list[0])
+        self.amplitude_histogram = editor.amplitude_histogram
+        self.length_sec = editor.length_sec  # exact length is given once the audio is decoded
+        self.block_size = max(int(block_sec * self.frame_rate), 1)
+        self.block_max = np.maximum.reduceat(self.amplitude, np.arange(0, len(self.amplitude), self.block_size)) \
+            if len(self.amplitude) > 0 else self.amplitude[:0]
+
+    @property
+    def length(self):
+        return len(self.amplitude)
+
+    @property
+    def nbytes(self):
+        return self.amplitude.nbytes + self.amplitude_histogram.nbytes + self.block_max.nbytes
+
+    def __silence(self, cutoff_amplitude: int):
+        """ intervals (sample) where the amplitude is not greater than the cutoff, at least of two blocks length """
+        interval = []
+        size = self.block_size
+        for s, e in get_mask_interval(self.block_max <= cutoff_amplitude) * size:
+            # the neighbouring blocks have a loud sample
+            if s > 0:
+                s = s - size + np.flatnonzero(self.amplitude[s - size:s] > cutoff_amplitude)[-1] + 1
+            if e < len(self.amplitude):
+                e = e + np.flatnonzero(self.amplitude[e:e + size] > cutoff_amplitude)[0]
+            interval.append([s, min(e, len(self.amplitude))])
+        interval = np.array(interval, dtype=np.int64).reshape(-1, 2)
+        return interval[interval[:, 1] - interval[:, 0] >= 2 * self.block_size - 1]
+
+    def preview(self, parameters):
+        """ Preview amplitude clipping
+
+         Parameter
+        ---------------
+        parameters: List
+            a list of dict with `cutoff_ratio`, `min_interval_sec` and optionally `crossfade_sec` (see
+            `Editor.amplitude_clipping`)
+
+         Return
+        ---------------
+        a list of dict for each parameter, `cutoff_amplitude`, `interval` (a list of (start, end) in second to drop)
+        and `duration` (length of the edited audio in second) in addition to the parameter
+        """
+        cutoff_amplitude = get_cutoff_amplitude_histogram(
+            self.amplitude_histogram, cutoff_ratio=[p['cutoff_ratio'] for p in parameters])
+        interval_all = dict()  # runs of silence for each cutoff amplitude
+        output = []
+        for p, amplitude in zip(parameters, cutoff_amplitude.tolist()):
+            min_interval_sec = p['min_interval_sec']
+            crossfade_sec = p.get('crossfade_sec')
+            crossfade_sec = min_interval_sec / 2 if crossfade_sec is None else crossfade_sec
+            min_interval = int(min_interval_sec * self.frame_rate)
+            if min_interval >= 2 * self.block_size - 1:
+                if amplitude not in interval_all:
+                    interval_all[amplitude] = self.__silence(amplitude)
+                interval = interval_all[amplitude]
+            else:
+                interval = get_mask_interval(self.amplitude <= amplitude)
+            interval = interval[interval[:, 1] - interval[:, 0] >= min_interval]
+            interval = (interval / self.frame_rate).tolist()
+            keep_interval, crossfade = get_keep_interval(
+                interval, crossfade_sec=crossfade_sec, length_sec=self.length_sec, frame_rate=self.frame_rate)
+            edl = EditDecisionList(keep_interval, crossfade, frame_rate=self.frame_rate, length_sec=self.length_sec)
+            output.append(dict(p, crossfade_sec=crossfade_sec, cutoff_amplitude=amplitude, interval=interval,
+                               duration=edl.edited_length_sec))
+        logging.info('preview {} parameters ({} cutoff amplitudes)'.format(len(parameters), len(interval_all)))
+        return output
+
+
+class PreviewCache:
+    """ In-memory LRU cache of `ClipPreview` by source id under a byte budget. At most `max_load` previews are built at
+    once, beyond which the request is rejected, and concurrent requests of the same source wait for the one in
+    progress instead of decoding the file again. """
+
+    def __init__(self, max_bytes: int = pow(2, 30), max_load: int = 2):
+        """ In-memory LRU cache of `ClipPreview`
+
+         Parameter
+        ---------------
+        max_bytes: int
+            byte budget of the previews (`ClipPreview.nbytes`)
+        max_load: int
+            maximum number of previews to build concurrently
+        """
+        self.max_bytes = max_bytes
+        self.__previews = OrderedDict()  # source id -> ClipPreview in order of access
+        self.__nbytes = 0
+        self.__loading = dict()  # source id -> Event set when the preview in progress is built (or failed)
+        self.__lock = Lock()
+        self.__semaphore = BoundedSemaphore(max_load)
+
+    def __len__(self):
+        return len(self.__previews)
+
+    @property
+    def nbytes(self):
+        return self.__nbytes
+
+    def get(self, source_id, load):
+        """ Get preview of the source from the cache, or build it
+
+         Parameter
+        ---------------
+        source_id: str
+            id of the content of the file (None not to cache the preview)
+        load: callable
+            function to build the `ClipPreview`, called without argument
+
+         Return
+        ---------------
+        ClipPreview
+        """
+        while True:
+            with self.__lock:
+                if source_id in self.__previews:
+                    self.__previews.move_to_end(source_id)
+                    return self.__previews[source_id]
+                loading = self.__loading.get(source_id)
+                if loading is None:
+                    if not self.__semaphore.acquire(blocking=False):
+                        raise QueueFullError('{} previews in progress'.format(len(self.__loading)))
+                    if source_id is not None:
+                        self.__loading[source_id] = Event()
+                    break
+            # the preview in progress is cached, or it's built by this thread if it failed
+            loading.wait()
+        preview = None
+        try:
+            preview = load()
+        finally:
+            self.__semaphore.release()
+            with self.__lock:
+                if preview is not None and source_id is not None and preview.nbytes <= self.max_bytes:
+                    self.__previews[source_id] = preview
+                    self.__nbytes += preview.nbytes
+                    while self.__nbytes > self.max_bytes:
+                        _, evicted = self.__previews.popitem(last=False)
+                        self.__nbytes -= evicted.nbytes
+                loading = self.__loading.pop(source_id, None)
+            if loading is not None:
+                loading.set()
+        return preview
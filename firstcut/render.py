@@ -0,0 +1,112 @@
+""" Render edited audio from a cut list """
+import numpy as np
+from pydub import AudioSegment
+
+__all__ = ('get_keep_interval', 'assemble_audio', 'to_audio_segment')
+
+
+def get_keep_interval(interval_to_drop: list, crossfade_sec: float, length_sec: float, frame_rate: int):
+    """ Convert intervals to drop into intervals to keep, with crossfade at each join
+
+     Parameter
+    ------------
+    interval_to_drop: List
+        a list of (start, end) in second, attained from `Editor.get_cutoff_interval`
+    crossfade_sec: float
+        maximum crossfade (sec)
+    length_sec: float
+        length of the audio (sec)
+    frame_rate: int
+        frame rate of the audio
+
+     Return
+    ------------
+    keep_interval: 2d nd.array
+        (start, end) in second of each span to keep, including the region overlapping with the neighbours
+    crossfade: 1d nd.array
+        crossfade (sec) between each span and the previous one (the first one is always 0)
+    """
+    if len(interval_to_drop) == 0:
+        return np.array([[0.0, length_sec]]), np.zeros(1)
+
+    def to_frame(__sec):
+        return int(__sec * frame_rate)
+
+    start, end = interval_to_drop[0]
+    cf_sec = min(start / 1000, min((end - start) / 2, crossfade_sec))
+    cf_sec = 0 if cf_sec < 0.001 else cf_sec  # clip too small value
+    keep_interval = [[0.0, start + cf_sec]]
+    crossfade = [0.0]
+    frame_combined = to_frame(start + cf_sec)  # frame size of the audio combined so far
+    pointer = end
+    prev_cf_sec = cf_sec
+
+    for start, end in interval_to_drop[1:]:
+        length_ms = round(1000 * frame_combined / frame_rate)
+        cf_sec = min((end - start) / 2, crossfade_sec)  # clip cf smaller than crossfade_sec
+        cf_sec = min((length_ms + start - pointer) / 1000, cf_sec)  # clip cf smaller than tmp audio
+        cf_sec = min((length_sec - end) / 1000, cf_sec)  # clip cf smaller than remaining audio
+        cf_sec = 0 if cf_sec < 0.001 else cf_sec  # clip too small value
+        keep_interval.append([pointer - prev_cf_sec, start + cf_sec])
+        crossfade.append(prev_cf_sec)
+        frame_combined += to_frame(start + cf_sec) - to_frame(pointer - prev_cf_sec) - to_frame(prev_cf_sec)
+        prev_cf_sec = cf_sec
+        pointer = end
+
+    if pointer != length_sec:
+        keep_interval.append([pointer - prev_cf_sec, length_sec])
+        crossfade.append(prev_cf_sec)
+    return np.array(keep_interval), np.array(crossfade)
+
+
+def assemble_audio(wave_array_np_list: list, keep_interval, crossfade):
+    """ Concatenate spans of audio with linear crossfade at each join. The output buffer is allocated once and each
+    span is copied by slice assignment, so the cost is linear in the output length regardless of number of spans.
+
+     Parameter
+    ------------
+    wave_array_np_list: List
+        list of numpy array audio signal for each channel
+    keep_interval: 2d nd.array
+        (start, end) sample index of each span to keep
+    crossfade: 1d nd.array
+        number of samples overlapping with the previous span (the first one is ignored)
+
+     Return
+    ------------
+    wave: 2d nd.array
+        edited audio signal of shape (sample, channel)
+    """
+    length = len(wave_array_np_list[0])
+    keep_interval = np.clip(np.asarray(keep_interval, dtype=np.int64), 0, length)
+    span = np.maximum(keep_interval[:, 1] - keep_interval[:, 0], 0)
+    crossfade = np.asarray(crossfade, dtype=np.int64).copy()
+    crossfade[0] = 0
+    # crossfade can't exceed neither the span to append nor the previous span
+    crossfade = np.minimum(np.maximum(crossfade, 0), span)
+    crossfade[1:] = np.minimum(crossfade[1:], span[:-1])
+
+    dtype = wave_array_np_list[0].dtype
+    info = np.iinfo(dtype) if np.issubdtype(dtype, np.integer) else np.finfo(dtype)
+    wave = np.empty((int(span.sum() - crossfade.sum()), len(wave_array_np_list)), dtype=dtype)
+    ramp_cache = dict()
+    pointer = 0
+    for (start, end), cf in zip(keep_interval, crossfade):
+        if cf > 0:
+            if cf not in ramp_cache:
+                ramp_cache[cf] = (np.arange(cf) / cf)[:, None]
+            ramp = ramp_cache[cf]
+            head = np.stack([w[start:start + cf] for w in wave_array_np_list], axis=1)
+            fade = wave[pointer - cf:pointer] * (1 - ramp) + head * ramp
+            wave[pointer - cf:pointer] = np.clip(np.round(fade), info.min, info.max)
+        n = end - start - cf
+        for c, w in enumerate(wave_array_np_list):
+            wave[pointer:pointer + n, c] = w[start + cf:end]
+        pointer += n
+    return wave
+
+
+def to_audio_segment(wave, frame_rate: int, sample_width: int):
+    """ Wrap audio signal of shape (sample, channel) as `pydub.AudioSegment` """
+    return AudioSegment(data=np.ascontiguousarray(wave).tobytes(), sample_width=sample_width, frame_rate=frame_rate,
+                        channels=wave.shape[1])
@@ -0,0 +1,73 @@
+""" Spectral gating noise reduction: per-frequency noise floor is estimated from the noise reference, and the
+spectrogram bins below the floor are attenuated by a mask smoothed over frequency and time. Much faster than NMF, which
+suits stationary noise such as hum or hiss. """
+import logging
+
+import numpy as np
+from scipy.ndimage import uniform_filter1d
+
+from .nmf import N_FFT, HOP_LENGTH, EPS
+from .stft import stft, istft
+
+logging.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s', level=logging.INFO, datefmt='%Y-%m-%d %H:%M:%S')
+__all__ = 'spectral_gate'
+
+
+def smooth(x, n: int, axis: int):
+    """ triangular smoothing of half width `n` along the axis, as two passes of moving average of `n + 1` samples
+    (each is O(1) per sample regardless of the width) """
+    if n == 0:
+        return x
+    # window of even size is off center by a half sample, which is canceled out by shifting the second pass
+    x = uniform_filter1d(x, n + 1, axis=axis, mode='nearest')
+    return uniform_filter1d(x, n + 1, axis=axis, mode='nearest', origin=-1 if n % 2 == 1 else 0)
+
+
+def spectral_gate(y_o,
+                  y_n,
+                  frame_rate: int,
+                  n_std: float = 1.5,
+                  prop_decrease: float = 1.0,
+                  smooth_freq_hz: float = 50,
+                  smooth_time_sec: float = 0.05):
+    """ Spectral gating noise reduction filter
+
+     Parameter
+    -----------
+    y_o: List
+        1-d raw signal, or 2-d signal of shape (channel, sample)
+    y_n: List
+        noise reference signal of the same number of channels as `y_o`
+    frame_rate: int
+        frame rate of the signal (to convert the smoothing width)
+    n_std: float
+        bin is regarded as signal if its level is above the noise mean by more than `n_std` standard deviations (dB)
+    prop_decrease: float
+        proportion to decrease the noise (1 to remove it all)
+    smooth_freq_hz: float
+        half width of the mask smoothing over frequency (Hz)
+    smooth_time_sec: float
+        half width of the mask smoothing over time (sec)
+
+     Return
+    -----------
+    y_denoised: nd.array
+        denoised signal of the same shape as `y_o` in float32
+    """
+    assert 0 <= prop_decrease <= 1, 'prop_decrease should be in [0, 1]: {}'.format(prop_decrease)
+    y_o = np.asarray(y_o, dtype=np.float32)
+    y_n = np.asarray(y_n, dtype=np.float32)
+    assert y_n.shape[:-1] == y_o.shape[:-1], 'inconsistent channels: {} != {}'.format(y_n.shape, y_o.shape)
+    logging.info('spectral gate: noise reference {}, source signal {}'.format(y_n.shape[-1], y_o.shape))
+
+    # noise floor of each frequency (and channel) in dB, which is compared with the magnitude in linear scale
+    db_n = 20 * np.log10(np.abs(stft(y_n, n_fft=N_FFT, hop_length=HOP_LENGTH)) + EPS)
+    threshold = 10 ** ((db_n.mean(axis=-1, keepdims=True) + n_std * db_n.std(axis=-1, keepdims=True)) / 20) - EPS
+
+    # mask of noise bins, smoothed over frequency and time
+    y_stft = stft(y_o, n_fft=N_FFT, hop_length=HOP_LENGTH)
+    mask = (np.abs(y_stft) <= threshold).astype(np.float32)
+    mask = smooth(mask, int(smooth_freq_hz / (frame_rate / N_FFT)), axis=-2)
+    mask = smooth(mask, int(smooth_time_sec * frame_rate / HOP_LENGTH), axis=-1)
+    y_stft *= 1 - prop_decrease * mask
+    return istft(y_stft, hop_length=HOP_LENGTH, length=y_o.shape[-1])
@@ -0,0 +1,110 @@
+""" Short-time Fourier transform over strided frame views with `numpy.fft`, which gives same output as `librosa.stft`
+and `librosa.istft` with their default (periodic Hann window, centered frames with zero padding) """
+import numpy as np
+
+__all__ = ('stft', 'istft')
+
+FRAME_BLOCK_SIZE = pow(2, 7)  # frames transformed at once (small enough to stay in cache)
+
+
+def hann_window(n_fft: int, dtype=np.float64):
+    """ periodic Hann window (`scipy.signal.get_window('hann', n_fft)`) """
+    return (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n_fft) / n_fft)).astype(dtype)
+
+
+def stft(y, n_fft: int = 2048, hop_length: int = None):
+    """ Short-time Fourier transform
+
+     Parameter
+    ---------------
+    y: nd.array
+        signal of shape (..., sample) in float32 or float64
+    n_fft: int
+        FFT size (same as the window length)
+    hop_length: int
+        `n_fft // 4` as default
+
+     Return
+    ---------------
+    spectrogram: nd.array
+        complex64 (complex128 if the signal is float64) array of shape (..., 1 + n_fft // 2, 1 + sample // hop_length)
+    """
+    hop_length = n_fft // 4 if hop_length is None else hop_length
+    y = np.asarray(y)
+    if not np.issubdtype(y.dtype, np.floating):
+        y = y.astype(np.float64)
+    complex_dtype = np.complex64 if y.dtype == np.float32 else np.complex128
+    window = hann_window(n_fft, y.dtype)
+
+    # center frames by padding zeros
+    pad = n_fft // 2
+    y_pad = np.zeros(y.shape[:-1] + (y.shape[-1] + 2 * pad,), dtype=y.dtype)
+    y_pad[..., pad:pad + y.shape[-1]] = y
+    n_frame = 1 + (y_pad.shape[-1] - n_fft) // hop_length
+    frames = np.lib.stride_tricks.as_strided(
+        y_pad, shape=y_pad.shape[:-1] + (n_frame, n_fft),
+        strides=y_pad.strides[:-1] + (hop_length * y_pad.strides[-1], y_pad.strides[-1]), writeable=False)
+
+    spectrogram = np.empty(y.shape[:-1] + (1 + n_fft // 2, n_frame), dtype=complex_dtype)
+    for i in range(0, n_frame, FRAME_BLOCK_SIZE):
+        spectrogram[..., i:i + FRAME_BLOCK_SIZE] = np.fft.rfft(
+            frames[..., i:i + FRAME_BLOCK_SIZE, :] * window, axis=-1).swapaxes(-1, -2)
+    return spectrogram
+
+
+def overlap_add(frames, hop_length: int):
+    """ Overlap-add frames of shape (..., n_frame, frame_length) with hop, where the frames are summed up segment by
+    segment of `hop_length` (number of segments is `ceil(frame_length / hop_length)`) """
+    n_frame, frame_length = frames.shape[-2:]
+    length = frame_length + hop_length * (n_frame - 1)
+    n_segment = -(-frame_length // hop_length)
+    y = np.zeros(frames.shape[:-2] + (hop_length * (n_frame + n_segment),), dtype=frames.dtype)
+    for k in range(n_segment):
+        segment = frames[..., k * hop_length:(k + 1) * hop_length]
+        y_view = y[..., k * hop_length:(k + n_frame) * hop_length].reshape(frames.shape[:-2] + (n_frame, hop_length))
+        y_view[..., :segment.shape[-1]] += segment
+    return y[..., :length]
+
+
+def istft(spectrogram, hop_length: int = None, length: int = None):
+    """ Inverse short-time Fourier transform
+
+     Parameter
+    ---------------
+    spectrogram: nd.array
+        complex array of shape (..., 1 + n_fft // 2, frame)
+    hop_length: int
+        `n_fft // 4` as default
+    length: int
+        sample size of output (trimmed or padded by zeros), `hop_length * (frame - 1)` as default
+
+     Return
+    ---------------
+    signal: nd.array
+        float32 (float64 if the spectrogram is complex128) array of shape (..., sample)
+    """
+    spectrogram = np.asarray(spectrogram)
+    n_fft = 2 * (spectrogram.shape[-2] - 1)
+    hop_length = n_fft // 4 if hop_length is None else hop_length
+    dtype = np.float32 if spectrogram.dtype == np.complex64 else np.float64
+    window = hann_window(n_fft, dtype)
+    n_frame = spectrogram.shape[-1]
+
+    frames = np.empty(spectrogram.shape[:-2] + (n_frame, n_fft), dtype=dtype)
+    for i in range(0, n_frame, FRAME_BLOCK_SIZE):
+        frames[..., i:i + FRAME_BLOCK_SIZE, :] = np.fft.irfft(
+            spectrogram[..., i:i + FRAME_BLOCK_SIZE].swapaxes(-1, -2), n=n_fft, axis=-1)
+    frames *= window
+    y = overlap_add(frames, hop_length)
+
+    # normalize by sum of squared window, where it's not too small
+    window_sum = overlap_add(np.tile(window ** 2, (n_frame, 1)), hop_length)
+    nonzero = window_sum > np.finfo(dtype).tiny
+    y[..., nonzero] /= window_sum[nonzero]
+
+    # remove padding of centered frames
+    y = y[..., n_fft // 2:]
+    length = hop_length * (n_frame - 1) if length is None else length
+    if y.shape[-1] >= length:
+        return y[..., :length]
+    return np.concatenate([y, np.zeros(y.shape[:-1] + (length - y.shape[-1],), dtype=dtype)], axis=-1)
@@ -0,0 +1,252 @@
+""" Bounded-memory streaming amplitude clipping for long audio: the signal is decoded block by block, and the audio
+to keep is written to the encoder as it goes, so the memory doesn't depend on the duration. """
+import logging
+import os
+import subprocess
+import tempfile
+
+import numpy as np
+
+from .cutoff_amplitude import get_amplitude_histogram, get_cutoff_amplitude_histogram, absolute_amplitude
+from .interval import get_mask_interval
+from .util import get_media_info
+
+__all__ = ('iter_audio_block', 'get_amplitude_histogram_stream', 'SilenceClipper', 'stream_clip')
+
+
+def iter_audio_block(file_path: str, block_size: int, frame_rate: int, channels: int):
+    """ Decode audio by ffmpeg and yield 16-bit PCM block by block
+
+     Parameter
+    --------------------
+    file_path: str
+        path to audio/video file
+    block_size: int
+        sample size of each block (the last one can be shorter)
+    frame_rate: int
+    channels: int
+
+     Return
+    --------------------
+    generator of 2d nd.array of shape (sample, channel), which is a view of a buffer reused over the blocks
+    """
+    command = ['ffmpeg', '-v', 'error', '-i', file_path, '-vn', '-f', 's16le', '-acodec', 'pcm_s16le',
+               '-ar', str(frame_rate), '-ac', str(channels), '-']
+    logging.info("execute `{}`".format(' '.join(command)))
+    block = np.empty((block_size, channels), dtype=np.int16)
+    buffer = memoryview(block).cast('B')
+    # error message goes to a file not to block ffmpeg on a full stderr pipe (see `util.decode_audio`)
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr, bufsize=0)
+        try:
+            while True:
+                pointer = 0
+                while pointer < len(buffer):
+                    n = process.stdout.readinto(buffer[pointer:])
+                    if not n:
+                        break
+                    pointer += n
+                n_sample = pointer // block.itemsize // channels
+                if n_sample > 0:
+                    yield block[:n_sample]
+                if pointer < len(buffer):
+                    break
+            process.stdout.close()
+            if process.wait() != 0:
+                stderr.seek(0)
+                raise ValueError('fail to decode {}:\n {}'.format(file_path, stderr.read().decode('utf-8', 'ignore')))
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+
+def get_amplitude_histogram_stream(file_path: str, block_size: int, frame_rate: int, channels: int):
+    """ Cumulative histogram of absolute amplitude of the first channel over the whole file (see
+    `get_amplitude_histogram`), accumulated block by block """
+    histogram = np.zeros(pow(2, 15) + 1, dtype=np.int64)
+    for block in iter_audio_block(file_path, block_size, frame_rate, channels):
+        histogram += get_amplitude_histogram(block[:, 0])
+    return histogram
+
+
+class SilenceClipper:
+    """ Incremental amplitude clipping: the silence in a block is detected with the run state carried over from the
+    previous block, and the audio to keep is returned for each block. The state is bounded by the minimum interval
+    and the crossfade. As in `Editor.amplitude_clipping`, the first channel is used for detection, and the audio
+    around a dropped interval is joined by a crossfade of `min(crossfade, interval / 2)` over its head and tail.
+    """
+
+    def __init__(self, cutoff_amplitude: int, min_interval: int, crossfade: int):
+        """ Incremental amplitude clipping
+
+         Parameter
+        ---------------
+        cutoff_amplitude: int
+            sample is silent if its absolute amplitude of the first channel is not greater than this
+        min_interval: int
+            minimum sample size of silence to drop
+        crossfade: int
+            maximum sample size of crossfade
+        """
+        self.cutoff_amplitude = cutoff_amplitude
+        self.min_interval = max(min_interval, 1)
+        self.crossfade = crossfade
+        self.position = 0  # sample size of the input so far
+        self.interval_to_drop = []  # (start, end) sample index
+        self.__pending = None  # trailing silence shorter than min_interval, which is not determined yet
+        self.__drop = None  # [head, tail, start] of the silence being dropped
+        self.__ramp_cache = dict()
+
+    def __ramp(self, cf: int):
+        if cf not in self.__ramp_cache:
+            self.__ramp_cache[cf] = (np.arange(cf) / cf)[:, None]
+        return self.__ramp_cache[cf]
+
+    def __join(self, head, tail, start: int, end: int):
+        """ crossfade over the head and the tail of the dropped interval [start, end) """
+        self.interval_to_drop.append((int(start), int(end)))
+        cf = 0 if start == 0 else min(self.crossfade, (end - start) // 2, len(head), len(tail))
+        if cf == 0:
+            return head[:0]
+        ramp = self.__ramp(cf)
+        fade = head[:cf] * (1 - ramp) + tail[len(tail) - cf:] * ramp
+        return np.clip(np.round(fade), -pow(2, 15), pow(2, 15) - 1).astype(np.int16)
+
+    def process(self, block):
+        """ Process a block of 16-bit PCM
+
+         Parameter
+        ---------------
+        block: 2d nd.array
+            signal of shape (sample, channel)
+
+         Return
+        ---------------
+        list of 2d nd.array to be written in order
+        """
+        output = []
+        offset = self.position  # sample index of block[0]
+        self.position += len(block)
+        mask = absolute_amplitude(block[:, 0]) <= self.cutoff_amplitude
+
+        if self.__drop is not None:
+            # silence being dropped continues until the first loud sample
+            head, tail, start = self.__drop
+            loud = np.flatnonzero(~mask)
+            n = len(block) if len(loud) == 0 else int(loud[0])
+            tail = np.concatenate([tail, block[:n]])[-self.crossfade:] if self.crossfade > 0 else tail
+            if n == len(block):
+                self.__drop = [head, tail.copy(), start]
+                return output
+            output.append(self.__join(head, tail, start, offset + n))
+            self.__drop = None
+            block, mask, offset = block[n:], mask[n:], offset + n
+        elif self.__pending is not None:
+            block = np.concatenate([self.__pending, block])
+            mask = np.concatenate([np.ones(len(self.__pending), dtype=bool), mask])
+            offset -= len(self.__pending)
+            self.__pending = None
+
+        interval = get_mask_interval(mask)
+        trailing = None
+        if len(interval) > 0 and interval[-1, 1] == len(block):
+            trailing, interval = interval[-1], interval[:-1]
+        interval = interval[interval[:, 1] - interval[:, 0] >= self.min_interval]
+
+        pointer = 0
+        for start, end in interval:
+            output.append(block[pointer:start])
+            output.append(self.__join(block[start:end], block[start:end], offset + start, offset + end))
+            pointer = end
+        if trailing is None:
+            output.append(block[pointer:])
+        else:
+            start = trailing[0]
+            output.append(block[pointer:start])
+            if len(block) - start >= self.min_interval:
+                self.__drop = [block[start:start + self.crossfade].copy(),
+                               block[max(start, len(block) - self.crossfade):].copy(), offset + start]
+            else:
+                self.__pending = block[start:].copy()
+        return [o for o in output if len(o) > 0]
+
+    def flush(self):
+        """ Audio left at the end of the stream (silence reaching the end is dropped without crossfade) """
+        if self.__drop is not None:
+            self.interval_to_drop.append((int(self.__drop[2]), self.position))
+            self.__drop = None
+        if self.__pending is not None:
+            pending, self.__pending = self.__pending, None
+            return [pending]
+        return []
+
+
+def stream_clip(file_path: str,
+                output_file: str,
+                min_interval_sec: float = 0.12,
+                cutoff_ratio: float = 0.5,
+                crossfade_sec: float = None,
+                block_sec: float = 10.0,
+                amplitude_histogram=None):
+    """ Amplitude clipping of audio with bounded memory. The file is decoded twice: the first pass computes the
+    amplitude histogram to get the cutoff amplitude, and the second pass detects the silence block by block
+    (see `SilenceClipper`) to pipe the audio to keep into an ffmpeg encoder.
+
+     Parameter
+    ---------------
+    file_path: str
+        path to audio/video file (only the audio is processed)
+    output_file: str
+        path to the edited audio file (format is given by the extension)
+    min_interval_sec, cutoff_ratio, crossfade_sec:
+        see `Editor.amplitude_clipping`
+    block_sec: float
+        length of each block to decode (sec)
+    amplitude_histogram: 1d nd.array
+        cumulative amplitude histogram of the first channel, the first pass is skipped if it's given
+
+     Return
+    ---------------
+    interval_to_drop: List
+        a list of (start, end) in second, which are dropped
+    """
+    crossfade_sec = min_interval_sec / 2 if crossfade_sec is None else crossfade_sec
+    assert min_interval_sec > 0 and crossfade_sec >= 0
+    info = get_media_info(file_path)
+    frame_rate, channels = info['frame_rate'], info['channels']
+    block_size = max(int(block_sec * frame_rate), 1)
+    if amplitude_histogram is None:
+        logging.info('first pass: amplitude histogram')
+        amplitude_histogram = get_amplitude_histogram_stream(file_path, block_size, frame_rate, channels)
+    cutoff_amplitude = get_cutoff_amplitude_histogram(amplitude_histogram, cutoff_ratio=cutoff_ratio)
+    logging.info('second pass: clipping (cutoff amplitude {})'.format(cutoff_amplitude))
+
+    clipper = SilenceClipper(cutoff_amplitude=cutoff_amplitude, min_interval=int(min_interval_sec * frame_rate),
+                             crossfade=int(crossfade_sec * frame_rate))
+    if os.path.exists(output_file):
+        os.remove(output_file)
+    command = ['ffmpeg', '-v', 'error', '-f', 's16le', '-ar', str(frame_rate), '-ac', str(channels), '-i', '-',
+               output_file]
+    logging.info("execute `{}`".format(' '.join(command)))
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=stderr)
+        try:
+            for block in iter_audio_block(file_path, block_size, frame_rate, channels):
+                for chunk in clipper.process(block):
+                    process.stdin.write(np.ascontiguousarray(chunk).data)
+            for chunk in clipper.flush():
+                process.stdin.write(np.ascontiguousarray(chunk).data)
+            process.stdin.close()
+        except BrokenPipeError:
+            # encoder exited early, whose error is reported below
+            pass
+        except Exception:
+            process.kill()
+            process.wait()
+            raise
+        if process.wait() != 0:
+            stderr.seek(0)
+            raise ValueError('fail to encode {}:\n {}'.format(output_file, stderr.read().decode('utf-8', 'ignore')))
+    logging.info('complete editing: {} intervals dropped'.format(len(clipper.interval_to_drop)))
+    return [(s / frame_rate, e / frame_rate) for s, e in clipper.interval_to_drop]
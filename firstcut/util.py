@@ -1,6 +1,9 @@
 """ FFMPEG and relevant audio/video operating tools """
 import os
+import json
+import struct
 import subprocess
+import tempfile
 import logging
 from typing import List
 import wave
@@ -12,7 +15,14 @@ from moviepy import editor
 
 logging.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s', level=logging.INFO, datefmt='%Y-%m-%d %H:%M:%S')
 
-__all__ = ('combine_audio_video', 'mov_to_mp4', 'load_file', 'write_file', 'load_file_wav', 'write_file_wav')
+__all__ = ('combine_audio_video', 'cut_video', 'cut_video_stream_copy', 'probe_keyframe', 'snap_to_keyframe',
+           'ffconcat_script', 'mov_to_mp4', 'is_mp4_compatible', 'probe_file', 'get_media_info', 'get_file_format',
+           'decode_audio', 'load_file_wav_memmap', 'load_audio', 'load_file', 'write_file', 'load_file_wav',
+           'write_file_wav')
+
+PCM_FORMAT = {'s16le': (np.int16, 'pcm_s16le'), 'f32le': (np.float32, 'pcm_f32le')}
+MP4_VIDEO_CODEC = ['h264', 'hevc', 'mpeg4']
+MP4_AUDIO_CODEC = ['aac', 'mp3', 'alac', 'ac3']
 
 
 def exe_shell(command: str, exported_file: str = None):
@@ -37,9 +47,26 @@ def exe_shell(command: str, exported_file: str = None):
         raise ValueError("fail to execute command `{}`:\n {}\n {}".format(command, exc.returncode, exc.output))
 
 
-def mov_to_mp4(video_file: str, overwrite: bool = False):
-    """ Convert sample.MOV to sample.mp4 by ffmpeg: (the converted mp4 doesn't have audio)
-    `ffmpeg -i sample.MOV -vcodec h264 -acodec mp2 sample.mp4`
+def exe_probe(command: List):
+    """ Execute ffprobe given as a list of arguments (no shell, so the file path needs no quoting) and return stdout
+
+     Parameter
+    -------------
+    command: List
+        command and its arguments
+    """
+    logging.info("execute `{}`".format(' '.join(command)))
+    try:
+        return subprocess.check_output(command, stderr=subprocess.PIPE, timeout=600, universal_newlines=True)
+    except subprocess.CalledProcessError as exc:
+        raise ValueError("fail to execute command `{}`:\n {}\n {}".format(command, exc.returncode, exc.stderr))
+
+
+def mov_to_mp4(video_file: str, overwrite: bool = False, transcode: bool = None):
+    """ Convert sample.MOV to sample.mp4 by ffmpeg: streams are copied without re-encoding if the codecs are
+    compatible with mp4 container, otherwise transcoded into h264/aac
+    `ffmpeg -i sample.MOV -c copy sample.mp4` or
+    `ffmpeg -i sample.MOV -vcodec libx264 -pix_fmt yuv420p -acodec aac sample.mp4`
 
      Parameter
     --------------------
@@ -47,6 +74,8 @@ def mov_to_mp4(video_file: str, overwrite: bool = False):
         path to target MOV file eg) sample.MOV
     overwrite: bool
         overwrite if it exists
+    transcode: bool
+        force to transcode (True) or stream copy (False), decided by the codecs if None
 
      Return
     --------------------
@@ -58,7 +87,6 @@ def mov_to_mp4(video_file: str, overwrite: bool = False):
     if _id not in ['mov', 'MOV']:
         raise ValueError('{} is not MOV/mov format'.format(video_file))
     output_file += '.mp4'
-    command = "ffmpeg -i {} -vcodec h264 -acodec mp2 {}".format(video_file, output_file)
     if os.path.exists(output_file):
         logging.info('found file at {}'.format(output_file))
         if overwrite:
@@ -67,11 +95,28 @@ def mov_to_mp4(video_file: str, overwrite: bool = False):
         else:
             logging.info('found file at {0}: returning it'.format(output_file))
             return output_file
+    if transcode is None:
+        transcode = not is_mp4_compatible(video_file)
+    if transcode:
+        command = "ffmpeg -i {} -vcodec libx264 -pix_fmt yuv420p -acodec aac {}".format(video_file, output_file)
+    else:
+        command = "ffmpeg -i {} -c copy {}".format(video_file, output_file)
     exe_shell(command, exported_file=output_file)
     assert os.path.exists(output_file), 'file has not produced at {}'.format(output_file)
     return output_file
 
 
+def is_mp4_compatible(video_file: str):
+    """ Check if all the audio/video streams can be stream-copied into mp4 container """
+    streams = probe_file(video_file)['streams']
+    for stream in streams:
+        if stream['codec_type'] == 'video' and stream.get('codec_name') not in MP4_VIDEO_CODEC:
+            return False
+        if stream['codec_type'] == 'audio' and stream.get('codec_name') not in MP4_AUDIO_CODEC:
+            return False
+    return True
+
+
 def combine_audio_video(video_file: str, audio_file: str, output_file: str):
     """ Combine audio data and video by ffmpeg:
     `ffmpeg -i sample.mp4 -i sample.mp3 -vcodec copy sample_combined.mp4`
@@ -102,6 +147,239 @@ def combine_audio_video(video_file: str, audio_file: str, output_file: str):
     assert os.path.exists(output_file), 'file has not produced at {}'.format(output_file)
 
 
+def cut_video(video_file: str, audio_file: str, output_file: str, interval: List):
+    """ Cut video and embed edited audio in a single ffmpeg process: frames in the intervals are selected by `select`
+    filter, and the timestamp of each frame is shifted back by the duration dropped before its interval by `setpts`,
+    so the timing of the source frames is kept (variable frame rate as well), and the video is decoded, cut and encoded
+    natively without passing frames to python.
+    `ffmpeg -i sample.mp4 -i sample.mp3 -filter_complex_script filter.txt -map [v] -map 1:a sample_cut.mp4`
+
+     Parameter
+    --------------------
+    video_file: str
+        path to source video file
+    audio_file: str
+        path to edited audio file
+    output_file: str
+        export file path
+    interval: List
+        a list of (start, end) in second of the video to keep, which doesn't overlap each other
+    """
+    if not os.path.exists(video_file):
+        raise ValueError('No video file at: {}'.format(video_file))
+    if os.path.exists(output_file):
+        os.system('rm -rf {}'.format(output_file))
+
+    # filter graph is given as a file, since it can be too long for command line
+    interval = np.asarray(interval, dtype=np.float64).reshape(-1, 2)
+    offset = interval[:, 0] - np.concatenate([[0], np.cumsum(interval[:, 1] - interval[:, 0])[:-1]])
+    select = '+'.join(map(lambda x: 'gte(t,{:.6f})*lt(t,{:.6f})'.format(*x), interval))
+    shift = '+'.join(map(lambda x: 'gte(T,{:.6f})*lt(T,{:.6f})*{:.6f}'.format(*x), zip(*interval.T, offset)))
+    filter_file = '{}.filter.txt'.format(output_file)
+    with open(filter_file, 'w') as f:
+        f.write("[0:v]select='{}',setpts='PTS-({})/TB'[v]".format(select or '0', shift or '0'))
+    command = 'ffmpeg -i {} -i {} -filter_complex_script {} -map "[v]" -map 1:a -vcodec libx264 -pix_fmt yuv420p ' \
+              '-acodec aac {}'.format(video_file, audio_file, filter_file, output_file)
+    try:
+        exe_shell(command, exported_file=output_file)
+    finally:
+        os.remove(filter_file)
+    assert os.path.exists(output_file), 'file has not produced at {}'.format(output_file)
+
+
+def probe_keyframe(video_file: str):
+    """ Get timestamps of keyframes in the video stream by ffprobe (only packet flags are read, no decoding)
+    `ffprobe -v error -select_streams v:0 -show_entries packet=pts_time,flags -of csv=p=0 sample.mp4`
+
+     Parameter
+    --------------------
+    video_file: str
+        path to video file
+
+     Return
+    --------------------
+    keyframe: 1d nd.array
+        sorted timestamps (sec) of keyframes
+    """
+    log = exe_probe(['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'packet=pts_time,flags',
+                     '-of', 'csv=p=0', video_file])
+    keyframe = []
+    for line in log.split('\n'):
+        line = line.strip().split(',')
+        if len(line) == 2 and 'K' in line[1] and line[0] not in ['', 'N/A']:
+            keyframe.append(float(line[0]))
+    return np.unique(keyframe)
+
+
+def snap_to_keyframe(interval: List, keyframe: List, tolerance_sec: float = 0.5):
+    """ Snap boundaries of intervals to keyframes, and merge intervals overlapping after snapping. The start is snapped
+    to the nearest keyframe within tolerance, or else to the keyframe before it, where stream copy starts anyway. The
+    end is snapped to the nearest keyframe within tolerance, or else kept as it is.
+
+     Parameter
+    --------------------
+    interval: List
+        a list of (start, end) in second
+    keyframe: List
+        timestamps (sec) of keyframes attained from `probe_keyframe`
+    tolerance_sec: float
+        maximum shift of each boundary to the nearest keyframe (sec)
+
+     Return
+    --------------------
+    interval: 2d nd.array
+        snapped intervals (start, end) in second
+    shift: 2d nd.array
+        shift (sec) of each boundary of the input intervals (snapped - original), before the intervals are merged
+    """
+    interval = np.asarray(interval, dtype=np.float64).reshape(-1, 2)
+    keyframe = np.asarray(keyframe, dtype=np.float64)
+    if len(keyframe) == 0:
+        return interval, np.zeros_like(interval)
+    ind = np.clip(np.searchsorted(keyframe, interval), 1, len(keyframe) - 1)
+    left, right = keyframe[ind - 1], keyframe[ind]
+    nearest = np.where(np.abs(interval - left) <= np.abs(right - interval), left, right)
+    snapped = np.where(np.abs(nearest - interval) <= tolerance_sec, nearest, interval)
+    # start far from keyframes goes back to the previous keyframe (if any)
+    ind_previous = np.searchsorted(keyframe, interval[:, 0], side='right') - 1
+    far = np.abs(nearest[:, 0] - interval[:, 0]) > tolerance_sec
+    snapped[:, 0] = np.where(far & (ind_previous >= 0), keyframe[np.maximum(ind_previous, 0)], snapped[:, 0])
+
+    # merge overlapping intervals and drop empty ones
+    merged = []
+    for start, end in snapped:
+        if end <= start:
+            continue
+        if len(merged) > 0 and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return np.array(merged, dtype=np.float64).reshape(-1, 2), snapped - interval
+
+
+def ffconcat_script(video_file: str, interval: List):
+    """ Script of ffmpeg concat demuxer to take the intervals (start, end) in second from the video """
+    script = 'ffconcat version 1.0\n'
+    for start, end in interval:
+        script += "file '{}'\ninpoint {:.6f}\noutpoint {:.6f}\n".format(os.path.abspath(video_file), start, end)
+    return script
+
+
+def cut_video_stream_copy(video_file: str, output_file: str, interval: List):
+    """ Cut video by stream copy over ffmpeg concat demuxer (no re-encoding, both of video and audio are copied from
+    the source). Each interval should start at a keyframe to be cut cleanly (see `snap_to_keyframe`). For mp4 output,
+    the codecs of the source should fit mp4 container (see `is_mp4_compatible`), eg) MOV is remuxed into mp4.
+    `ffmpeg -f concat -safe 0 -i list.txt -c copy sample_cut.mp4`
+
+     Parameter
+    --------------------
+    video_file: str
+        path to source video file
+    output_file: str
+        export file path
+    interval: List
+        a list of (start, end) in second of the video to keep
+    """
+    if not os.path.exists(video_file):
+        raise ValueError('No video file at: {}'.format(video_file))
+    if output_file.lower().endswith('.mp4') and not is_mp4_compatible(video_file):
+        raise ValueError('streams of {} cannot be copied into mp4 container'.format(video_file))
+    if os.path.exists(output_file):
+        os.system('rm -rf {}'.format(output_file))
+
+    concat_file = '{}.concat.txt'.format(output_file)
+    with open(concat_file, 'w') as f:
+        f.write(ffconcat_script(video_file, interval))
+    command = 'ffmpeg -f concat -safe 0 -i {} -c copy {}'.format(concat_file, output_file)
+    try:
+        exe_shell(command, exported_file=output_file)
+    finally:
+        os.remove(concat_file)
+    assert os.path.exists(output_file), 'file has not produced at {}'.format(output_file)
+
+
+def load_file_wav_memmap(file_path: str):
+    """ Open 16-bit PCM wav file as memory-mapped array over the data chunk (copy-on-write, so the file is never
+    modified and pages are copied only if the signal is edited in place)
+
+     Parameter
+    --------------------
+    file_path: str
+        path to wav file
+
+     Return
+    --------------------
+    wave: 2d nd.array
+        memory-mapped audio signal of shape (sample, channel), or None if the file is not 16-bit PCM wav
+    frame_rate: int
+    channels: int
+    """
+    file_size = os.path.getsize(file_path)
+    fmt = None
+    with open(file_path, 'rb') as f:
+        riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or wave_id != b'WAVE':
+            return None, None, None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return None, None, None
+            chunk_id, chunk_size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                if chunk_size < 16:
+                    return None, None, None
+                fmt = struct.unpack('<HHIIHH', f.read(16))
+                f.seek(chunk_size - 16 + chunk_size % 2, 1)
+            elif chunk_id == b'data':
+                offset = f.tell()
+                break
+            else:
+                f.seek(chunk_size + chunk_size % 2, 1)
+    if fmt is None:
+        return None, None, None
+    audio_format, channels, frame_rate, _, block_align, bits = fmt
+    # 1: PCM, 0xFFFE: WAVE_FORMAT_EXTENSIBLE (assumed to be PCM as 16-bit)
+    if audio_format not in [1, 0xFFFE] or bits != 16:
+        return None, None, None
+    # data chunk size is 0 or 0xFFFFFFFF for a streamed wav file, where the data lasts to the end of the file
+    if chunk_size in [0, 0xFFFFFFFF]:
+        chunk_size = file_size - offset
+    length = min(chunk_size, file_size - offset) // block_align
+    if length == 0:
+        return None, None, None
+    wave = np.memmap(file_path, dtype='<i2', mode='c', offset=offset, shape=(length, channels))
+    return wave, frame_rate, channels
+
+
+def load_audio(file_path: str, frame_rate: int = None, channels: int = None, duration: float = None):
+    """ Load audio signal of audio/video file into numpy array (16-bit PCM wav file is memory-mapped, and the others
+    are decoded by ffmpeg)
+
+     Parameter
+    --------------------
+    file_path: str
+        path to audio/video file
+    frame_rate, channels, duration:
+        see `decode_audio`
+
+     Return
+    --------------------
+    wave_array_np_list: List
+        list of numpy array audio signal for each channel (view of the buffer)
+    frame_rate: int
+    channels: int
+    """
+    wave = None
+    if get_file_format(file_path)[0] == 'wav':
+        wave, frame_rate, channels = load_file_wav_memmap(file_path)
+    if wave is None:
+        wave, frame_rate, channels = decode_audio(
+            file_path, frame_rate=frame_rate, channels=channels, duration=duration)
+    if channels > 2:
+        raise ValueError('audio has more than two channel: {}'.format(channels))
+    return [wave[:, c] for c in range(channels)], frame_rate, channels
+
+
 def load_file_wav(file_path):
     logging.info('load audio from {}'.format(file_path))
     signal, frame_rate = sf.read(file_path)
@@ -117,13 +395,156 @@ def write_file_wav(export_file_prefix: str, wave_signal: List, frame_rate: int):
     return export_file_prefix
 
 
-def load_file(file_path):
+def probe_file(file_path: str):
+    """ Get stream/format information of audio/video file by ffprobe
+    `ffprobe -v error -show_streams -show_format -of json sample.mp4`
+
+     Parameter
+    --------------------
+    file_path: str
+        path to audio/video file
+
+     Return
+    --------------------
+    information: dict
+        ffprobe output with keys `streams` and `format`
+    """
+    return json.loads(exe_probe(['ffprobe', '-v', 'error', '-show_streams', '-show_format', '-of', 'json', file_path]))
+
+
+def get_media_info(file_path: str):
+    """ Get audio/video information by ffprobe without decoding
+
+     Parameter
+    --------------------
+    file_path: str
+        path to audio/video file
+
+     Return
+    --------------------
+    information: dict
+        duration (sec), frame_rate (of audio), channels, audio_codec, video_codec (None if no video stream)
+    """
+    info = probe_file(file_path)
+    audio = [i for i in info['streams'] if i['codec_type'] == 'audio']
+    # cover art of audio file is a video stream with `attached_pic`
+    video = [i for i in info['streams']
+             if i['codec_type'] == 'video' and not i.get('disposition', {}).get('attached_pic', 0)]
+    if len(audio) == 0:
+        raise ValueError('no audio stream in {}'.format(file_path))
+    return {
+        'duration': float(audio[0].get('duration', info['format'].get('duration', 0))),
+        'frame_rate': int(audio[0]['sample_rate']),
+        'channels': int(audio[0]['channels']),
+        'audio_codec': audio[0].get('codec_name'),
+        'video_codec': video[0].get('codec_name') if len(video) > 0 else None
+    }
+
+
+def get_file_format(file_path: str):
+    """ Get audio/video format identifier from the file name
+
+     Parameter
+    --------------------
+    file_path: str
+        path to audio/video file
+
+     Return
+    --------------------
+    audio_format: str
+    video_format: str
+        None if it's an audio file
+    """
+    if file_path.endswith('.wav') or file_path.endswith('.WAV'):
+        return 'wav', None
+    elif file_path.endswith('.mp3') or file_path.endswith('.MP3'):
+        return 'mp3', None
+    elif file_path.endswith('.m4a') or file_path.endswith('.M4A'):
+        return 'm4a', None
+    elif file_path.endswith('.mp4') or file_path.endswith('.MP4') \
+            or file_path.endswith('.mov') or file_path.endswith('.MOV'):
+        return 'mp3', 'mp4'
+    else:
+        raise ValueError('unknown format {}'.format(file_path))
+
+
+def decode_audio(file_path: str,
+                 frame_rate: int = None,
+                 channels: int = None,
+                 sample_format: str = 's16le',
+                 duration: float = None):
+    """ Decode audio stream by ffmpeg into numpy array: raw PCM is piped from ffmpeg and read directly into a
+    preallocated buffer, so the decoded audio is held only once in memory.
+    `ffmpeg -i sample.mp3 -vn -f s16le -acodec pcm_s16le -`
+
+     Parameter
+    --------------------
+    file_path: str
+        path to audio/video file
+    frame_rate: int
+        target frame rate (original frame rate as default)
+    channels: int
+        target number of channel (original number of channel as default)
+    sample_format: str
+        's16le' (int16) or 'f32le' (float32)
+    duration: float
+        duration (sec) to estimate the buffer size (if all of frame_rate, channels and duration are given, the file
+        is not probed)
+
+     Return
+    --------------------
+    wave: 2d nd.array
+        audio signal of shape (sample, channel)
+    frame_rate: int
+    channels: int
+    """
+    if sample_format not in PCM_FORMAT:
+        raise ValueError('unknown sample_format: {}'.format(sample_format))
+    dtype, codec = PCM_FORMAT[sample_format]
+    if frame_rate is None or channels is None or duration is None:
+        info = get_media_info(file_path)
+        frame_rate = info['frame_rate'] if frame_rate is None else frame_rate
+        channels = info['channels'] if channels is None else channels
+        duration = info['duration'] if duration is None else duration
+
+    # preallocate buffer from the duration (with margin), and extend it only if the estimate was short
+    wave = np.empty((int(duration * frame_rate * 1.01) + frame_rate, channels), dtype=dtype)
+    command = ['ffmpeg', '-v', 'error', '-i', file_path, '-vn', '-f', sample_format, '-acodec', codec,
+               '-ar', str(frame_rate), '-ac', str(channels), '-']
+    logging.info("execute `{}`".format(' '.join(command)))
+    # error message goes to a file not to block ffmpeg on a full stderr pipe while stdout is read
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr, bufsize=0)
+        pointer = 0
+        buffer = memoryview(wave).cast('B')
+        while True:
+            if pointer == len(buffer):
+                wave_extend = np.empty((len(wave) * 2, channels), dtype=dtype)
+                wave_extend[:len(wave)] = wave
+                wave = wave_extend
+                buffer = memoryview(wave).cast('B')
+            n = process.stdout.readinto(buffer[pointer:])
+            if not n:
+                break
+            pointer += n
+        process.stdout.close()
+        if process.wait() != 0:
+            stderr.seek(0)
+            raise ValueError('fail to decode {}:\n {}'.format(file_path, stderr.read().decode('utf-8', 'ignore')))
+    return wave[:pointer // wave.itemsize // channels], frame_rate, channels
+
+
+def load_file(file_path, decoder: str = 'pydub'):
     """ Load audio/video file
 
      Parameter
     -----------
     file_path: str
         path to audio/video file
+    decoder: str
+        'pydub' to decode audio as pydub.AudioSegment, or 'ffmpeg' to decode audio into numpy array directly
+        (see `decode_audio`), where pydub.AudioSegment is not created and None is returned instead. With 'ffmpeg',
+        16-bit PCM wav file is memory-mapped instead of decoding (see `load_file_wav_memmap`)
 
      Return
     -----------
@@ -139,33 +560,38 @@ def load_file(file_path):
     # check file
     assert os.path.exists(file_path), 'No file: {}'.format(file_path)
     logging.info('loading {}'.format(file_path))
-
-    # validate sound file (load as AudioSegment object
-    video, video_format, convert_mov = None, None, False
-    if file_path.endswith('.wav') or file_path.endswith('.WAV'):
-        audio_format = 'wav'
-        audio = AudioSegment.from_wav(file_path)
-    elif file_path.endswith('.mp3') or file_path.endswith('.MP3'):
-        audio_format = 'mp3'
-        audio = AudioSegment.from_mp3(file_path)
-    elif file_path.endswith('.m4a') or file_path.endswith('.M4A'):
-        audio_format = 'm4a'
-        audio = AudioSegment.from_file(file_path, audio_format)
-    elif file_path.endswith('.mp4') or file_path.endswith('.MP4') \
-            or file_path.endswith('.mov') or file_path.endswith('.MOV'):
-        if file_path.endswith('.mov') or file_path.endswith('.MOV'):
-            # mov format needs to be converted to mp4 firstly
+    if decoder not in ['pydub', 'ffmpeg']:
+        raise ValueError('unknown decoder: {}'.format(decoder))
+
+    # validate sound file
+    video, convert_mov = None, False
+    audio_format, video_format = get_file_format(file_path)
+    if video_format is not None:
+        if (file_path.endswith('.mov') or file_path.endswith('.MOV')) and decoder == 'pydub':
+            # mov format needs to be converted to mp4 firstly for pydub (ffmpeg decoder demuxes the audio track from
+            # mov directly, and the video is transcoded only when it's rendered)
             file_path = mov_to_mp4(file_path)
             convert_mov = True
             logging.info('convert MOV to mp4: {}'.format(file_path))
-        audio_format = 'mp3'
-        video_format = 'mp4'
-        audio = AudioSegment.from_file(file_path)
         video = editor.VideoFileClip(file_path)
+    logging.info('audio ({}), video ({})'.format(audio_format, video_format))
+    video_stats = (video, video_format, convert_mov)
+
+    if decoder == 'ffmpeg':
+        wave_array_np_list, frame_rate, channels = load_audio(file_path)
+        audio_stats = (None, wave_array_np_list, audio_format, frame_rate, wave_array_np_list[0].itemsize, channels)
+        return audio_stats, video_stats
+
+    # load as AudioSegment object
+    if audio_format == 'wav':
+        audio = AudioSegment.from_wav(file_path)
+    elif audio_format == 'm4a':
+        audio = AudioSegment.from_file(file_path, audio_format)
+    elif video_format is None:
+        audio = AudioSegment.from_mp3(file_path)
     else:
-        raise ValueError('unknown format {}'.format(file_path))
+        audio = AudioSegment.from_file(file_path)
 
-    logging.info('audio ({}), video ({})'.format(audio_format, video_format))
     # numpy array from array.array object
     wave_array_np = np.array(audio.get_array_of_samples())
 
@@ -181,7 +607,6 @@ def load_file(file_path):
 
     # information of audio file
     audio_stats = (audio, wave_array_np_list, audio_format, audio.frame_rate, audio.sample_width, audio.channels)
-    video_stats = (video, video_format, convert_mov)
     return audio_stats, video_stats
 
 
@@ -189,7 +614,9 @@ def write_file(export_file_prefix: str,
                audio,
                audio_format: str,
                video=None,
-               video_format: str = None):
+               video_format: str = None,
+               video_interval: List = None,
+               stream_copy: bool = False):
     """ Write audio/video to file (format should be same as the input audio file)
 
      Parameter
@@ -199,9 +626,14 @@ def write_file(export_file_prefix: str,
     audio:
         pydub.AudioSegment audio instance
     video:
-        moviepy.editor video instance
+        moviepy.editor video instance, or path to source video file to be cut by ffmpeg (see `cut_video`)
     audio_format, video_format: str
         audio/video identifier
+    video_interval: List
+        a list of (start, end) in second of the source video to keep (required if `video` is a file path)
+    stream_copy: bool
+        cut the source video by stream copy without re-encoding (`video` should be a file path), where the audio is
+        also copied from the source instead of `audio` (see `cut_video_stream_copy`)
 
      Return
     ---------
@@ -214,13 +646,30 @@ def write_file(export_file_prefix: str,
         if not os.path.exists(os.path.dirname(__path)):
             os.makedirs(os.path.dirname(__path), exist_ok=True)
 
+    if stream_copy:
+        assert type(video) is str, 'stream copy requires path to the source video'
+        assert video_format and video_interval is not None, 'video_format/video_interval need to be specified'
+        video_file = '{}.{}'.format(export_file_prefix, video_format)
+        validate_path(video_file)
+        logging.info('cut video by stream copy, and save to {}'.format(video_file))
+        cut_video_stream_copy(video_file=video, output_file=video_file, interval=video_interval)
+        return video_file
+
     audio_file = '{}.{}'.format(export_file_prefix, audio_format)
     validate_path(audio_file)
 
     logging.info('save audio to {}'.format(audio_file))
     audio.export(audio_file, format=audio_format)
 
-    if video is not None:
+    if type(video) is str:
+        assert video_format, 'video_format need to be specified'
+        assert video_interval is not None, 'video_interval need to be specified'
+        video_file = '{}.{}'.format(export_file_prefix, video_format)
+        validate_path(video_file)
+        logging.info('cut video and embed audio, and save to {}'.format(video_file))
+        cut_video(video_file=video, audio_file=audio_file, output_file=video_file, interval=video_interval)
+        return video_file
+    elif video is not None:
         assert video_format, 'video_format need to be specified'
 
         video_file_mute = '{}_no_audio.{}'.format(export_file_prefix, video_format)
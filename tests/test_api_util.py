@@ -0,0 +1,199 @@
+""" UnitTest API job status and scheduler """
+import unittest
+import logging
+import os
+import signal
+from threading import Event, Lock, Thread
+from time import sleep
+
+import firstcut
+
+logging.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s', level=logging.INFO, datefmt='%Y-%m-%d %H:%M:%S')
+status_proxy = None  # set in worker process
+
+
+def init_worker(status):
+    global status_proxy
+    status_proxy = status
+
+
+def process_job(job_id):
+    status_proxy.update(job_id=job_id, status='running', progress=50)
+    status_proxy.complete(job_id=job_id, pid=os.getpid())
+
+
+def process_job_hang(job_id):
+    status_proxy.update(job_id=job_id, status=str(os.getpid()))
+    sleep(60)
+
+
+class TestStatus(unittest.TestCase):
+    """ Test """
+
+    def test(self):
+        status = firstcut.Status(keep_log_second=0, sweep_interval_second=0)
+        job_ids = [status.register_job() for _ in range(5)]
+        self.assertEqual(status.job_ids(offset=1, limit=2), job_ids[1:3])
+        self.assertEqual(status.job_ids(offset=4), job_ids[4:])
+        status.update(job_id=job_ids[0], status='decode', progress=20)
+        self.assertEqual(status.get_status(job_ids[0])['progress'], 20)
+        status.complete(job_id=job_ids[0], url='url', file_name='file')
+        status.error(job_id=job_ids[1], error_message='error')
+        record = status.get_status(job_ids[0])
+        self.assertEqual((record['status_code'], record['url'], record['file_name']), ('0', 'url', 'file'))
+        self.assertNotIn('url', status.get_status(job_ids[2]))
+        # other job ids aren't exposed on a miss
+        self.assertNotIn(job_ids[0], status.get_status('unknown')['error_message'])
+        with self.assertRaises(ValueError):
+            status.update(job_id='unknown', status='decode')
+        sleep(0.01)
+        # only finished jobs are dropped
+        self.assertEqual(sorted(status.drop()), sorted(job_ids[:2]))
+        self.assertEqual(status.get_job_ids, job_ids[2:])
+
+    def test_sweep(self):
+        status = firstcut.Status(keep_log_second=0.05, sweep_interval_second=0.01)
+        job_id = status.register_job()
+        status.complete(job_id=job_id)
+        sleep(0.2)
+        self.assertEqual(len(status), 0)
+        status.close()
+
+    def test_concurrent(self):
+        status = firstcut.Status(sweep_interval_second=0)
+
+        def run():
+            for _ in range(200):
+                job_id = status.register_job()
+                status.update(job_id=job_id, status='running', progress=50)
+                status.complete(job_id=job_id)
+
+        threads = [Thread(target=run) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(status), 1600)
+        self.assertTrue(all(status.get_status(i)['status_code'] == '0' for i in status.get_job_ids))
+
+
+class TestRequestCache(unittest.TestCase):
+    """ Test """
+
+    def test(self):
+        status = firstcut.Status(sweep_interval_second=0)
+        cache = firstcut.RequestCache(ttl_second=0.1)
+        status.add_listener(cache.finish)
+        key = cache.request_key('etag', cutoff_ratio=0.9, min_interval_sec=0.12)
+        self.assertEqual(key, cache.request_key('etag', min_interval_sec=0.1200000001, cutoff_ratio=0.9))
+        self.assertNotEqual(key, cache.request_key('etag_updated', min_interval_sec=0.12, cutoff_ratio=0.9))
+
+        job_id = status.register_job()
+        self.assertEqual(cache.attach(key, job_id), (job_id, None))
+        # duplicate is attached to the job in progress
+        self.assertEqual(cache.attach(key, status.register_job()), (job_id, None))
+        status.complete(job_id=job_id, url='url', file_name='file')
+        self.assertEqual(cache.attach(key, status.register_job()), (job_id, {'url': 'url', 'file_name': 'file'}))
+        sleep(0.15)
+        # result is expired
+        new_job_id = status.register_job()
+        self.assertEqual(cache.attach(key, new_job_id), (new_job_id, None))
+        # failed job isn't kept
+        status.error(job_id=new_job_id, error_message='error')
+        self.assertEqual(len(cache), 0)
+        # rejected job isn't attached
+        cache.attach(key, 'rejected')
+        cache.discard('rejected')
+        self.assertEqual(cache.attach(key, 'next'), ('next', None))
+
+    def test_timeout(self):
+        cache = firstcut.RequestCache(timeout_second=0.1)
+        key = cache.request_key('etag', cutoff_ratio=0.9)
+        self.assertEqual(cache.attach(key, 'lost'), ('lost', None))
+        self.assertEqual(cache.attach(key, 'next'), ('lost', None))
+        sleep(0.15)
+        # the job which never reports back isn't attached
+        self.assertEqual(cache.attach(key, 'next'), ('next', None))
+        cache.finish('lost', {'status_code': '0', 'url': 'url'})
+        self.assertEqual(cache.attach(key, 'other'), ('next', None))
+
+
+class TestScheduler(unittest.TestCase):
+    """ Test """
+
+    def test(self):
+        scheduler = firstcut.JobScheduler(n_workers=2, max_queue=3)
+        release = Event()
+        lock = Lock()
+        log = {'running': 0, 'max_running': 0, 'order': []}
+
+        def job(n):
+            with lock:
+                log['running'] += 1
+                log['max_running'] = max(log['max_running'], log['running'])
+                log['order'].append(n)
+            release.wait()
+            with lock:
+                log['running'] -= 1
+            if n == 0:
+                raise ValueError('error in job is caught by the worker')
+
+        for n in range(2):
+            scheduler.submit(str(n), job, (n,))
+        while scheduler.n_running < 2:
+            release.wait(0.01)
+        # workers are busy, so the rest wait in order
+        self.assertEqual([scheduler.submit(str(n), job, (n,)) for n in range(2, 5)], [1, 2, 3])
+        self.assertEqual(scheduler.position('3'), 2)
+        self.assertIsNone(scheduler.position('0'))
+        with self.assertRaises(firstcut.QueueFullError):
+            scheduler.submit('5', job, (5,))
+        self.assertTrue(scheduler.retry_after >= 1)
+
+        release.set()
+        scheduler.shutdown()
+        self.assertEqual(log['max_running'], 2)
+        self.assertEqual(sorted(log['order'][:2]), [0, 1])
+        self.assertEqual(sorted(log['order']), [0, 1, 2, 3, 4])
+        self.assertEqual(scheduler.n_waiting, 0)
+        with self.assertRaises(ValueError):
+            scheduler.submit('6', job, (6,))
+
+    def test_process(self):
+        status = firstcut.Status()
+        scheduler = firstcut.JobScheduler(n_workers=2, max_queue=4, backend='process', status=status,
+                                          initializer=init_worker)
+        job_ids = [status.register_job() for _ in range(4)]
+        for job_id in job_ids:
+            scheduler.submit(job_id, process_job, (job_id,))
+        scheduler.shutdown()
+        for job_id in job_ids:
+            # progress is relayed from the worker process
+            self.assertEqual(status.get_status(job_id)['status_code'], '0')
+            self.assertNotEqual(status.get_status(job_id)['pid'], os.getpid())
+
+    def test_process_warm(self):
+        scheduler = firstcut.JobScheduler(n_workers=2, max_queue=4, backend='process')
+        # worker processes are started before any job is submitted
+        self.assertEqual(len(scheduler._JobScheduler__pool._processes), 2)
+        scheduler.shutdown()
+
+    def test_process_killed(self):
+        status = firstcut.Status()
+        scheduler = firstcut.JobScheduler(n_workers=1, max_queue=4, backend='process', status=status,
+                                          initializer=init_worker)
+        job_ids = [status.register_job() for _ in range(2)]
+        scheduler.submit(job_ids[0], process_job_hang, (job_ids[0],))
+        while status.get_status(job_ids[0])['status'] == 'start_job':
+            sleep(0.01)
+        scheduler.submit(job_ids[1], process_job, (job_ids[1],))
+        # worker is killed (eg. by OOM killer) while running the job
+        os.kill(int(status.get_status(job_ids[0])['status']), signal.SIGKILL)
+        scheduler.shutdown()
+        self.assertEqual(status.get_status(job_ids[0])['status_code'], '-1')
+        # next job runs on the restarted pool
+        self.assertEqual(status.get_status(job_ids[1])['status_code'], '0')
+
+
+if __name__ == "__main__":
+    unittest.main()
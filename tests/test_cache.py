@@ -0,0 +1,76 @@
+""" UnitTest decoded audio cache """
+import unittest
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import firstcut
+
+logging.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s', level=logging.INFO, datefmt='%Y-%m-%d %H:%M:%S')
+# samples from VoxCeleb1 test set
+sample_mp3 = './sample_data/vc_1.mp3'
+sample_mp4 = './sample_data/vc_4.mp4'
+
+
+class TestCache(unittest.TestCase):
+    """ Test """
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_editor(self):
+        cache = firstcut.DecodeCache(self.cache_dir)
+        editor = firstcut.Editor(sample_mp3)
+        interval = editor.get_cutoff_interval(cutoff_ratio=0.5, min_interval_sec=0.1)
+        for _ in range(2):
+            editor_cache = firstcut.Editor(sample_mp3, cache=cache)
+            self.assertEqual(interval, editor_cache.get_cutoff_interval(cutoff_ratio=0.5, min_interval_sec=0.1))
+            for a, b in zip(editor.wave_array_np_list, editor_cache.wave_array_np_list):
+                self.assertTrue(np.array_equal(a, b))
+        # the second one is loaded from the cache
+        self.assertTrue(isinstance(editor_cache.wave_array_np_list[0], np.memmap))
+        self.assertEqual(len(cache.entries), 1)
+
+    def test_source(self):
+        path = os.path.join(self.cache_dir, 'download.mp3')
+        shutil.copy(sample_mp3, path)
+        cache = firstcut.DecodeCache(os.path.join(self.cache_dir, 'cache'))
+        self.assertIsNone(cache.get_source('vc_1.mp3:etag'))
+        path_cache = cache.register_source('vc_1.mp3:etag', path)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(path_cache, cache.get_source('vc_1.mp3:etag'))
+        self.assertIsNone(cache.get_source('vc_1.mp3:updated'))
+
+    def test_evict(self):
+        cache = firstcut.DecodeCache(self.cache_dir, max_bytes=1, pin_second=0)
+        for sample in [sample_mp3, sample_mp4]:
+            firstcut.Editor(sample, cache=cache).get_cutoff_interval(cutoff_ratio=0.5, min_interval_sec=0.1)
+        # only the last one is kept
+        entries = cache.entries
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0][0], cache.content_hash(sample_mp4))
+
+    def test_pin(self):
+        path = os.path.join(self.cache_dir, 'download.mp3')
+        shutil.copy(sample_mp3, path)
+        # caches of two processes on the same directory
+        cache, cache_other = [firstcut.DecodeCache(os.path.join(self.cache_dir, 'cache'), max_bytes=1)
+                              for _ in range(2)]
+        cache.register_source('vc_1.mp3:etag', path)
+        path_cache = cache.get_source('vc_1.mp3:etag')
+        firstcut.Editor(sample_mp4, cache=cache_other).get_cutoff_interval(cutoff_ratio=0.5, min_interval_sec=0.1)
+        # the file in use isn't evicted beyond the budget
+        self.assertTrue(os.path.exists(path_cache))
+        self.assertEqual(len(cache.entries), 2)
+        cache_other.pin_second = 0
+        cache_other.evict()
+        self.assertEqual(len(cache.entries), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,8 @@ import os
 import unittest
 import logging
 
+import numpy as np
+
 import firstcut
 
 logging.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s', level=logging.INFO, datefmt='%Y-%m-%d %H:%M:%S')
@@ -27,6 +29,20 @@ class TestCut(unittest.TestCase):
             frame_rate=frame_rate,
             path_to_save='./tests/test_output/test_cutoff.{}.png'.format(basename))
 
+    def test_method_type(self):
+        np.random.seed(0)
+        wave = (np.random.randn(100000) * 8000).clip(-32768, 32767).astype(np.int16)
+        wave[:100] = -32768
+        histogram = firstcut.get_amplitude_histogram(wave)
+        for p in [0.0, 0.01, 0.5, 0.9, 0.99, 1.0]:
+            c = firstcut.get_cutoff_amplitude(wave, cutoff_ratio=p, method_type='ratio')
+            assert c == firstcut.get_cutoff_amplitude(wave, cutoff_ratio=p, method_type='partition')
+            assert c == firstcut.get_cutoff_amplitude(wave, cutoff_ratio=p, method_type='histogram')
+            assert c == firstcut.get_cutoff_amplitude_histogram(histogram, cutoff_ratio=p)
+        p = [0.1, 0.5, 0.9]
+        c = firstcut.get_cutoff_amplitude_histogram(histogram, cutoff_ratio=p)
+        assert c.tolist() == [firstcut.get_cutoff_amplitude(wave, cutoff_ratio=_p) for _p in p]
+
     def test_editor(self):
         basename = os.path.basename(sample_wav).split('.')[0]
         editor = firstcut.Editor(sample_wav)
@@ -3,7 +3,10 @@ import unittest
 import logging
 import os
 
+import numpy as np
 import firstcut
+from firstcut import util
+from firstcut.render import assemble_audio
 
 logging.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s', level=logging.INFO, datefmt='%Y-%m-%d %H:%M:%S')
 # samples from VoxCeleb1 test set
@@ -35,6 +38,71 @@ class TestEditor(unittest.TestCase):
         editor.amplitude_clipping()
         editor.export('./tests/test_output/test_editor.{}.denoised'.format(basename))
 
+    def test_denoised_audio(self):
+        editor = firstcut.Editor(sample_noise)
+        with self.assertRaises(AssertionError):
+            editor.amplitude_clipping(denoised_audio=True)
+        editor.noise_reduction(method='spectral_gate')
+        for denoised_audio in [False, True]:
+            edl = editor.amplitude_clipping(denoised_audio=denoised_audio)
+            wave = editor.wave_array_np_list if denoised_audio else editor.wave_array_np_list_raw
+            wave = assemble_audio(wave, keep_interval=edl.keep_interval_sample, crossfade=edl.crossfade_sample)
+            self.assertTrue(np.array_equal(
+                np.frombuffer(editor.audio_edit.raw_data, dtype=np.int16), wave.reshape(-1)))
+
+    def test_render(self):
+        """ video and audio rendered by ffmpeg last as long as the EDL within a frame """
+        editor = firstcut.Editor(sample_mp4)
+        edl = editor.amplitude_clipping()
+        export_file = editor.export('./tests/test_output/test_editor.render')
+        streams = {i['codec_type']: i for i in util.probe_file(export_file)['streams']}
+        frame = 1 / eval(streams['video']['r_frame_rate'])
+        duration = np.sum(np.diff(edl.video_interval, axis=1))
+        self.assertTrue(abs(float(streams['audio']['duration']) - duration) <= frame)
+        # audio of the source can last a little longer than the video
+        video_duration = float([i for i in util.probe_file(sample_mp4)['streams'] if i['codec_type'] == 'video'][0][
+            'duration'])
+        duration = np.sum(np.diff(np.clip(edl.video_interval, 0, video_duration), axis=1))
+        self.assertTrue(abs(float(streams['video']['duration']) - duration) <= frame)
+
+    def test_render_vfr(self):
+        """ timing of frames is kept for video of variable frame rate (40 msec for the first second, 80 msec after) """
+        video_file = './tests/test_output/test_editor.vfr.mp4'
+        audio_file = './tests/test_output/test_editor.vfr.mp3'
+        export_file = './tests/test_output/test_editor.vfr_cut.mp4'
+        util.exe_shell("ffmpeg -y -f lavfi -i testsrc=d=1.5:s=64x64:r=25 -vf \"setpts='if(lt(N,25),N*0.04,"
+                       "1+(N-25)*0.08)/TB'\" -fps_mode vfr -vcodec libx264 {}".format(video_file))
+        util.exe_shell('ffmpeg -y -f lavfi -i sine=d=1 {}'.format(audio_file))
+        util.cut_video(video_file, audio_file, export_file, [[0.2, 0.6], [1.2, 1.8]])
+        for stream in util.probe_file(export_file)['streams']:
+            self.assertTrue(abs(float(stream['duration']) - 1) <= 0.04 + 1e-6)
+
+    def test_stream_copy(self):
+        editor = firstcut.Editor(sample_mp4)
+        editor.amplitude_clipping()
+        prefix = './tests/test_output/test_editor.stream_copy'
+        for keyframe_fallback in [False, True]:
+            editor.export(prefix, video_backend='stream_copy', keyframe_fallback=keyframe_fallback)
+            self.assertTrue(os.path.exists('{}.mp4'.format(prefix)))
+            # shift is of each boundary of the intervals to keep, and the cuts lost by merging are reported
+            self.assertEqual(editor.keyframe_shift.shape, (len(editor.video_interval), 2))
+            self.assertTrue(editor.keyframe_report['dropped_cut'] > 0)
+            self.assertTrue(editor.keyframe_report['extra_duration'] > 0)
+
+    def test_lazy(self):
+        editor = firstcut.Editor(sample_mp4)
+        self.assertTrue(editor.has_video)
+        self.assertIsNone(editor._Editor__wave)
+        self.assertIsNone(editor._Editor__video)
+        length = editor.length
+        editor.get_cutoff_interval(cutoff_ratio=0.5, min_interval_sec=0.1)
+        self.assertIsNone(editor._Editor__video)
+        self.assertTrue(abs(editor.length - length) < editor.frame_rate * 0.1)
+
+        # rejected before decoding
+        with self.assertRaises(ValueError):
+            firstcut.Editor(sample_mp4, max_sample_length=1000)
+
     def test(self):
 
         for sample in [sample_mp3, sample_wav, sample_mov, sample_mp4]:
@@ -0,0 +1,37 @@
+""" UnitTest edit decision list """
+import unittest
+import logging
+
+import numpy as np
+
+import firstcut
+
+logging.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s', level=logging.INFO, datefmt='%Y-%m-%d %H:%M:%S')
+# samples from VoxCeleb1 test set
+sample_wav = './sample_data/vc_3.wav'
+
+
+class TestEDL(unittest.TestCase):
+    """ Test """
+
+    def test(self):
+        edl = firstcut.EditDecisionList([[0, 1.1], [1.9, 3.2], [3.8, 5]], [0, 0.2, 0.4], frame_rate=100, length_sec=5,
+                                        source='sample.mp4')
+        assert abs(edl.edited_length_sec - 3.0) < 1e-8
+        assert np.allclose(edl.video_interval, [[0, 1.0], [2.0, 3.0], [4.0, 5]])
+        edl_load = firstcut.EditDecisionList.from_json(edl.to_json())
+        assert edl_load.to_dict() == edl.to_dict()
+        assert edl.to_ffmpeg_concat().count('inpoint') == 3
+        cmx = edl.to_cmx3600(fps=10).split('\n')
+        assert cmx[3] == '001  AX       AA/V  C        00:00:00:00 00:00:01:00 00:00:00:00 00:00:01:00'
+        assert cmx[7] == '003  AX       AA/V  C        00:00:04:00 00:00:05:00 00:00:02:00 00:00:03:00'
+
+    def test_editor(self):
+        editor = firstcut.Editor(sample_wav)
+        edl = editor.amplitude_clipping(min_interval_sec=0.12, cutoff_ratio=0.9)
+        assert edl is editor.edl
+        assert abs(len(editor.audio_edit) / 1000 - edl.edited_length_sec) < 0.01
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+""" UnitTest interval detection """
+import unittest
+import logging
+from itertools import groupby
+
+import numpy as np
+
+from firstcut.cutoff_amplitude import get_cutoff_amplitude
+from firstcut.interval import get_mask_interval, get_frame_energy, frame_to_sample_interval
+
+logging.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s', level=logging.INFO, datefmt='%Y-%m-%d %H:%M:%S')
+
+
+def get_mask_interval_groupby(mask, min_interval):
+    """ reference implementation based on `itertools.groupby` """
+    interval, pointer = [], 0
+    for value, chunk in groupby(mask):
+        length = len(list(chunk))
+        if value and length >= min_interval:
+            interval.append([pointer, pointer + length])
+        pointer += length
+    return interval
+
+
+class TestInterval(unittest.TestCase):
+    """ Test """
+
+    def test(self):
+        np.random.seed(0)
+        for n in [1, 2, 10, 1000, 10000]:
+            for p in [0.1, 0.5, 0.9]:
+                mask = np.random.rand(n) < p
+                for min_interval in [0, 1, 3, 10]:
+                    interval = get_mask_interval(mask, min_interval).tolist()
+                    assert interval == get_mask_interval_groupby(mask, min_interval), (n, p, min_interval)
+
+    def test_edge(self):
+        assert get_mask_interval(np.zeros(0, dtype=bool)).shape == (0, 2)
+        assert get_mask_interval(np.ones(5, dtype=bool)).tolist() == [[0, 5]]
+        assert get_mask_interval(np.zeros(5, dtype=bool)).tolist() == []
+        assert get_mask_interval(np.array([1, 0, 0, 1, 1], dtype=bool), 2).tolist() == [[3, 5]]
+
+    def test_frame(self):
+        np.random.seed(0)
+        wave = (np.random.randn(10000) * 1000).astype(np.int16)
+        wave[2000:5000] = 0
+        for frame_length, hop_length in [(100, 100), (100, 50), (200, 40)]:
+            for energy_type in ['rms', 'peak']:
+                energy = get_frame_energy(wave, frame_length, hop_length, energy_type=energy_type)
+                assert len(energy) == 1 + (len(wave) - frame_length) // hop_length
+                frame = np.stack([wave[i * hop_length:i * hop_length + frame_length] for i in range(len(energy))])
+                if energy_type == 'rms':
+                    assert np.allclose(energy, np.sqrt((frame.astype(float) ** 2).mean(1)))
+                else:
+                    assert (energy == np.abs(frame.astype(int)).max(1)).all()
+                interval = frame_to_sample_interval(
+                    get_mask_interval(energy == 0), frame_length, hop_length, len(wave))
+                assert interval.tolist() == [[2000, 5000]], interval
+
+        # signal shorter than a frame
+        for wave in [wave[:0], wave[:99]]:
+            with self.assertRaises(ValueError):
+                get_frame_energy(wave, 100)
+
+    def test_frame_silent(self):
+        """ frame-level cutoff drops a known silent segment, where the cutoff is a percentile of frame energy """
+        frame_rate = 16000
+        wave = (np.sin(np.arange(3 * frame_rate) * 0.05) * 10000).astype(np.int16)
+        wave[frame_rate:2 * frame_rate] = 0
+        for frame_length, hop_length in [(160, 160), (400, 160)]:
+            energy = get_frame_energy(wave, frame_length, hop_length)
+            # a third of the frames are silent
+            cutoff = get_cutoff_amplitude(energy, cutoff_ratio=0.3, method_type='partition')
+            interval = frame_to_sample_interval(
+                get_mask_interval(energy <= cutoff), frame_length, hop_length, len(wave))
+            assert len(interval) == 1, interval
+            assert abs(interval[0, 0] - frame_rate) <= frame_length, interval
+            assert abs(interval[0, 1] - 2 * frame_rate) <= frame_length, interval
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+""" UnitTest noise profile library """
+import unittest
+import logging
+import shutil
+import tempfile
+
+import numpy as np
+import firstcut
+
+logging.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s', level=logging.INFO, datefmt='%Y-%m-%d %H:%M:%S')
+# samples from VoxCeleb1 test set
+sample_wav = './sample_data/vc_3.wav'
+sample_noise = './sample_data/vc_6.wav'
+
+
+class TestNoiseProfile(unittest.TestCase):
+    """ Test """
+
+    def setUp(self):
+        self.profile_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.profile_dir)
+
+    def test(self):
+        library = firstcut.NoiseProfileLibrary(self.profile_dir, max_cache=1)
+        editor = firstcut.Editor(sample_noise)
+        editor.noise_reduction(custom_noise_reference_interval=[0, 8000])
+        library.save('room-1', **editor.noise_profile)
+        self.assertEqual(library.profile_ids, ['room-1'])
+        self.assertTrue('room-1' in library)
+        self.assertFalse('../room-1' in library)
+
+        profile = library.load('room-1')
+        self.assertEqual(profile['h'].dtype, np.float32)
+        self.assertTrue(np.allclose(profile['h'], editor.noise_profile['h'], rtol=1e-6))
+        self.assertTrue(library.load('room-1') is profile)
+
+        # noise NMF is skipped
+        editor = firstcut.Editor(sample_wav)
+        editor.noise_reduction(noise_profile=profile)
+        self.assertEqual(editor.nmf_log[-1]['n_iter_noise'], 0)
+        editor.amplitude_clipping()
+
+        library.remove('room-1')
+        with self.assertRaises(ValueError):
+            library.load('room-1')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,7 +3,10 @@ import unittest
 import logging
 import os
 
+import numpy as np
 import firstcut
+from firstcut.nmf import nmf, nmf_filter, euclid_divergence, kl_divergence, EPS
+from firstcut.spectral_gate import spectral_gate
 
 logging.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s', level=logging.INFO, datefmt='%Y-%m-%d %H:%M:%S')
 # samples from VoxCeleb1 test set
@@ -11,6 +14,30 @@ sample_mp3 = './sample_data/vc_1.mp3'
 sample_wav = './sample_data/vc_6.wav'
 
 
+def legacy_nmf(y, r: int = 20, n_iter: int = 50, div: str = "kl", init_h=None, init_u=None):
+    """ previous implementation of `nmf.nmf` (allocates every intermediate in each iteration) """
+    m, n = y.shape
+    u = np.random.rand(r, n) if init_u is None else np.array(init_u)
+    h = np.random.rand(m, r) if init_h is None else np.array(init_h)
+    cost = np.zeros(n_iter)
+    lam = np.dot(h, u)
+    for i in range(n_iter):
+        if div == "euc":
+            cost[i] = euclid_divergence(y, lam)
+            h *= np.dot(y, u.T) / (np.dot(np.dot(h, u), u.T) + EPS)
+            u *= np.dot(h.T, y) / (np.dot(np.dot(h.T, h), u) + EPS)
+        else:
+            cost[i] = kl_divergence(y, lam)
+            numerator_h = np.dot((y / (np.dot(h, u) + EPS)), u.T)
+            denominator_h = np.tile(u.sum(axis=1), (m, 1))
+            h *= numerator_h / (denominator_h + EPS)
+            numerator_u = np.dot(h.T, (y / (np.dot(h, u) + EPS)))
+            denominator_u = np.tile(h.sum(axis=0), (n, 1))
+            u *= numerator_u / (denominator_u.T + EPS)
+        lam = np.dot(h, u)
+    return [h, u, cost]
+
+
 class TestNR(unittest.TestCase):
     """ Test """
 
@@ -25,6 +52,87 @@ class TestNR(unittest.TestCase):
                 path_to_save='./tests/test_output/test_noise_reduction.iter.{}.png'.format(basename))
             editor.export('./tests/test_output/test_noise_reduction.iter.{}.wav'.format(os.path.basename(basename)))
 
+    def test_nmf_legacy(self):
+        """ update over work buffers gives the same h, u and cost as the previous implementation """
+        np.random.seed(0)
+        y = np.dot(np.random.rand(50, 3), np.random.rand(3, 200)) + np.random.rand(50, 200)
+        init_h, init_u = np.random.rand(50, 5), np.random.rand(5, 200)
+        for div in ['kl', 'euc']:
+            out_legacy = legacy_nmf(y, r=5, n_iter=30, div=div, init_h=init_h, init_u=init_u)
+            # no early stopping with tol=0 unless the cost doesn't change at all
+            out = nmf(y, r=5, n_iter=30, div=div, init_h=init_h, init_u=init_u, tol=0)
+            self.assertEqual(len(out[2]), 30)
+            for a, b in zip(out_legacy, out):
+                self.assertTrue(np.allclose(a, b, rtol=1e-12, atol=0))
+
+    def test_nmf_tol(self):
+        np.random.seed(0)
+        y = np.dot(np.random.rand(50, 3), np.random.rand(3, 200)) + np.random.rand(50, 200)
+        for div in ['kl', 'euc']:
+            _, _, cost = nmf(y, r=5, n_iter=500, div=div, tol=1e-4)
+            self.assertTrue(len(cost) < 500)
+            # multiplicative update doesn't increase the cost
+            self.assertTrue(np.all(np.diff(cost) <= 0))
+
+    def test_warm_start(self):
+        log_second = []
+        for warm_start in [False, True]:
+            np.random.seed(0)
+            editor = firstcut.Editor(sample_wav)
+            editor.nmf_noise_reduction([0, 8000])
+            # positional argument is given to `nmf_filter` as `n_iter`
+            editor.nmf_noise_reduction([0, 8000], 10, warm_start=warm_start)
+            self.assertEqual(len(editor.nmf_log), 2)
+            self.assertEqual(editor.nmf_log[0]['n_iter'], 50)
+            self.assertTrue(editor.nmf_log[1]['n_iter'] <= 10 and editor.nmf_log[1]['loss'] is not None)
+            log_second.append(editor.nmf_log[1])
+        # warm start begins from the converged point, so reaches lower loss in the same iterations
+        self.assertTrue(log_second[1]['loss'] < 0.5 * log_second[0]['loss'])
+        # noise basis, which is fitted on the same reference again, converges much faster
+        editor.nmf_noise_reduction([0, 8000], warm_start=True)
+        self.assertTrue(editor.nmf_log[2]['n_iter_noise'] < editor.nmf_log[0]['n_iter_noise'])
+
+    def test_online(self):
+        editor = firstcut.Editor(sample_wav)
+        signal = editor.wave_array_np_list[0] / pow(2, 15)
+        np.random.seed(0)
+        y = nmf_filter(signal, signal[:8000])
+        y_online = nmf_filter(signal, signal[:8000], block_size=len(signal) // 3, n_jobs=3)
+        self.assertEqual(len(y_online), len(signal))
+        self.assertTrue(np.corrcoef(y, y_online[:len(y)])[0, 1] > 0.99)
+        editor.noise_reduction(custom_noise_reference_interval=[0, 8000], block_sec=1.0)
+
+    def test_stereo(self):
+        editor = firstcut.Editor(sample_mp3)
+        signal = np.stack(editor.wave_array_np_list)[:, :100000] / pow(2, 15)
+        signal[1] = 0.5 * np.roll(signal[1], 100)
+        np.random.seed(0)
+        y = nmf_filter(signal, signal[:, :8000])
+        self.assertEqual(y.shape[0], 2)
+        # channels are denoised separately with shared bases
+        self.assertFalse(np.allclose(y[0], y[1]))
+        _, u, _ = nmf(np.abs(np.random.rand(2, 30, 40)), r=5, n_iter=5)
+        self.assertEqual(u.shape, (2, 5, 40))
+
+    def test_spectral_gate(self):
+        np.random.seed(0)
+        t = np.arange(32000) / 16000
+        noise = 0.01 * (np.sin(2 * np.pi * 50 * t) + np.random.randn(len(t)))
+        tone = np.sin(2 * np.pi * 440 * t) * (t > 1)
+        y = spectral_gate(np.stack([tone + noise, noise]), np.stack([noise[:8000], noise[:8000]]), 16000)
+        self.assertEqual(y.shape, (2, len(t)))
+        # noise is attenuated while the tone is kept
+        self.assertTrue(np.std(y[1]) < 0.2 * np.std(noise))
+        self.assertTrue(np.corrcoef(y[0, 20000:], tone[20000:])[0, 1] > 0.99)
+
+        editor = firstcut.Editor(sample_mp3)
+        length = len(editor.wave_array_np_list[0])
+        editor.noise_reduction(method='spectral_gate')
+        self.assertTrue(editor.if_noise_reduction)
+        self.assertEqual(len(editor.wave_array_np_list[0]), length)
+        with self.assertRaises(ValueError):
+            editor.noise_reduction(method='spectral_gate', noise_profile={'h': np.ones((1025, 20))})
+
     def test(self):
 
         logging.info('process {}'.format(sample_wav))
@@ -0,0 +1,71 @@
+""" UnitTest preview of amplitude clipping """
+import unittest
+import logging
+from threading import Event, Thread
+
+import firstcut
+
+logging.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s', level=logging.INFO, datefmt='%Y-%m-%d %H:%M:%S')
+# samples from VoxCeleb1 test set
+sample_mp3 = './sample_data/vc_1.mp3'
+sample_wav = './sample_data/vc_6.wav'
+
+
+class TestPreview(unittest.TestCase):
+    """ Test """
+
+    def test(self):
+        for sample in [sample_mp3, sample_wav]:
+            editor = firstcut.Editor(sample)
+            preview = firstcut.ClipPreview(editor)
+            parameters = [dict(cutoff_ratio=r, min_interval_sec=m) for r in [0.3, 0.9, 0.99] for m in [0, 0.01, 0.3]]
+            parameters.append(dict(cutoff_ratio=0.9, min_interval_sec=0.3, crossfade_sec=0))
+            output = preview.preview(parameters)
+            self.assertEqual(len(output), len(parameters))
+            for o in output:
+                # same as the editor
+                interval = editor.get_cutoff_interval(o['cutoff_ratio'], o['min_interval_sec'], in_second=True)
+                self.assertEqual(o['interval'], interval)
+                edl = editor.amplitude_clipping(min_interval_sec=max(o['min_interval_sec'], 1e-6),
+                                                cutoff_ratio=o['cutoff_ratio'], crossfade_sec=o['crossfade_sec'])
+                self.assertAlmostEqual(o['duration'], edl.edited_length_sec)
+
+    def test_cache(self):
+        preview = firstcut.ClipPreview(firstcut.Editor(sample_mp3))
+        cache = firstcut.PreviewCache(max_bytes=2 * preview.nbytes, max_load=1)
+        release = Event()
+        loaded = []
+
+        def load():
+            loaded.append(1)
+            release.wait()
+            return preview
+
+        # concurrent requests of the same source decode it once
+        threads = [Thread(target=cache.get, args=('etag', load)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        while len(loaded) == 0:
+            release.wait(0.01)
+        # other source is rejected while the loads are bounded
+        with self.assertRaises(firstcut.QueueFullError):
+            cache.get('other', load)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(loaded), 1)
+        self.assertIs(cache.get('etag', load), preview)
+        # least recently used one is removed by the byte budget
+        for source_id in ['etag_2', 'etag_3']:
+            cache.get(source_id, load)
+        self.assertEqual((len(cache), cache.nbytes), (2, 2 * preview.nbytes))
+        self.assertEqual(len(loaded), 3)
+        # failed load isn't cached
+        with self.assertRaises(AssertionError):
+            cache.get('broken', lambda: firstcut.ClipPreview(firstcut.Editor('./sample_data/unknown.mp3')))
+        self.assertEqual(len(cache), 2)
+        self.assertIs(cache.get('broken', load), preview)
+
+
+if __name__ == "__main__":
+    unittest.main()
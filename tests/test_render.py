@@ -0,0 +1,40 @@
+""" UnitTest rendering """
+import unittest
+import logging
+
+import numpy as np
+
+from firstcut.render import get_keep_interval, assemble_audio
+
+logging.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s', level=logging.INFO, datefmt='%Y-%m-%d %H:%M:%S')
+
+
+class TestRender(unittest.TestCase):
+    """ Test """
+
+    def test_keep_interval(self):
+        keep_interval, crossfade = get_keep_interval([], crossfade_sec=0.1, length_sec=10.0, frame_rate=100)
+        assert keep_interval.tolist() == [[0.0, 10.0]] and crossfade.tolist() == [0.0]
+        keep_interval, crossfade = get_keep_interval(
+            [[1.0, 2.0], [5.0, 6.0]], crossfade_sec=0.0, length_sec=10.0, frame_rate=100)
+        assert keep_interval.tolist() == [[0.0, 1.0], [2.0, 5.0], [6.0, 10.0]]
+        assert crossfade.tolist() == [0.0, 0.0, 0.0]
+
+    def test_assemble_audio(self):
+        wave = [np.arange(100, dtype=np.int16), -np.arange(100, dtype=np.int16)]
+        keep_interval = np.array([[0, 10], [20, 50], [80, 100]])
+        out = assemble_audio(wave, keep_interval, crossfade=[0, 0, 0])
+        assert out.shape == (60, 2)
+        assert out[:, 0].tolist() == list(range(10)) + list(range(20, 50)) + list(range(80, 100))
+        assert (out[:, 1] == -out[:, 0]).all()
+
+        # crossfade overlaps the tail of the previous span with the head of the next one
+        out = assemble_audio(wave, keep_interval, crossfade=[0, 4, 10])
+        assert out.shape == (46, 2)
+        assert out[:6, 0].tolist() == list(range(6))
+        assert out[6, 0] == 6 and out[9, 0] == round(9 * 0.25 + 23 * 0.75)
+        assert out[-10:, 0].tolist() == list(range(90, 100))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+""" UnitTest STFT """
+import unittest
+import logging
+
+import numpy as np
+from firstcut.stft import stft, istft
+
+logging.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s', level=logging.INFO, datefmt='%Y-%m-%d %H:%M:%S')
+try:
+    import librosa
+except ImportError:
+    librosa = None
+
+
+class TestSTFT(unittest.TestCase):
+    """ Test """
+
+    def test_inverse(self):
+        np.random.seed(0)
+        for length in [1000, 2047, 16000, 16001]:
+            y = np.random.randn(2, length).astype(np.float32)
+            spectrogram = stft(y, n_fft=2048, hop_length=512)
+            self.assertEqual(spectrogram.shape, (2, 1025, 1 + length // 512))
+            self.assertEqual(spectrogram.dtype, np.complex64)
+            y_inverse = istft(spectrogram, hop_length=512, length=length)
+            self.assertEqual(y_inverse.dtype, np.float32)
+            self.assertTrue(np.allclose(y, y_inverse, atol=1e-5))
+            self.assertEqual(istft(spectrogram, hop_length=512).shape, (2, 512 * (length // 512)))
+            # channels are transformed independently
+            self.assertTrue(np.allclose(spectrogram[1], stft(y[1], n_fft=2048, hop_length=512)))
+
+    @unittest.skipIf(librosa is None, 'librosa is not installed')
+    def test_librosa(self):
+        np.random.seed(0)
+        for dtype in [np.float32, np.float64]:
+            for length in [1000, 16000, 16001]:
+                y = np.random.randn(2, length).astype(dtype)
+                spectrogram, spectrogram_librosa = stft(y), librosa.stft(y)
+                self.assertEqual(spectrogram.dtype, spectrogram_librosa.dtype)
+                self.assertTrue(np.allclose(spectrogram, spectrogram_librosa, atol=1e-3))
+                for length_inverse in [None, length, length + 1000]:
+                    y_inverse = istft(spectrogram, length=length_inverse)
+                    y_librosa = librosa.istft(spectrogram_librosa, length=length_inverse)
+                    self.assertEqual(y_inverse.shape, y_librosa.shape)
+                    # beyond the signal, the window sum to normalize is too small to compare
+                    self.assertTrue(np.allclose(y_inverse[..., :length], y_librosa[..., :length], atol=1e-5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+""" UnitTest streaming clipping """
+import unittest
+import logging
+import os
+import tempfile
+
+import numpy as np
+import firstcut
+from firstcut.stream import SilenceClipper
+from firstcut.interval import get_mask_interval
+
+logging.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s', level=logging.INFO, datefmt='%Y-%m-%d %H:%M:%S')
+# samples from VoxCeleb1 test set
+sample_mp3 = './sample_data/vc_1.mp3'
+
+
+def clip(wave, block_size, **kwargs):
+    clipper = SilenceClipper(**kwargs)
+    output = []
+    for i in range(0, len(wave), block_size):
+        output += clipper.process(wave[i:i + block_size])
+    output += clipper.flush()
+    return np.concatenate(output), clipper.interval_to_drop
+
+
+class TestStream(unittest.TestCase):
+    """ Test """
+
+    def test_block(self):
+        """ result doesn't depend on block size """
+        np.random.seed(0)
+        # bursts of loud/silent runs
+        length = np.random.randint(1, 400, 200)
+        level = np.repeat(np.random.randint(0, 2, len(length)) * 10000 + 10, length)
+        wave = (np.random.randn(len(level), 2) * level[:, None]).astype(np.int16)
+        wave[:, 1] = -wave[:, 1]
+        param = dict(cutoff_amplitude=100, min_interval=120, crossfade=50)
+        output, interval = clip(wave, len(wave), **param)
+        self.assertEqual(
+            interval, [tuple(i) for i in get_mask_interval(np.abs(wave[:, 0]) <= 100, 120).tolist()])
+        for block_size in [1, 7, 64, 1000]:
+            output_block, interval_block = clip(wave, block_size, **param)
+            self.assertEqual(interval, interval_block)
+            self.assertTrue(np.array_equal(output, output_block))
+
+    def test_stream_clip(self):
+        path = './tests/test_output/test_stream.wav'
+        editor = firstcut.Editor(sample_mp3)
+        interval = editor.get_cutoff_interval(cutoff_ratio=0.5, min_interval_sec=0.12, in_second=True)
+        interval_stream = firstcut.stream_clip(sample_mp3, path, min_interval_sec=0.12, cutoff_ratio=0.5,
+                                               block_sec=0.5)
+        self.assertTrue(np.allclose(interval, interval_stream))
+        self.assertTrue(os.path.exists(path))
+
+    def test_error(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # encoder exits early
+            with self.assertRaises(ValueError) as context:
+                firstcut.stream_clip(sample_mp3, os.path.join(tmp_dir, 'no_dir', 'output.wav'), block_sec=0.5)
+            self.assertIn('fail to encode', str(context.exception))
+            # decoder fails on a broken file
+            path = os.path.join(tmp_dir, 'broken.mp3')
+            with open(path, 'wb') as f:
+                f.write(b'not an audio file' * 4096)
+            with self.assertRaises(ValueError):
+                list(firstcut.stream.iter_audio_block(path, 1000, 16000, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
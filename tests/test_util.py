@@ -2,7 +2,13 @@
 import unittest
 import logging
 import os
+import shutil
+import subprocess
+import tempfile
 
+import numpy as np
+import soundfile as sf
+import firstcut
 from firstcut import util
 
 logging.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s', level=logging.INFO, datefmt='%Y-%m-%d %H:%M:%S')
@@ -42,6 +48,99 @@ class TestUtil(unittest.TestCase):
         logging.info(export_file)
         assert os.path.exists(export_file)
         os.remove(export_file)
+        # remux (mpeg4/aac) and transcode (mjpeg/pcm into h264/aac)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for codec, compatible in [(['mpeg4', 'aac'], True), (['mjpeg', 'pcm_s16le'], False)]:
+                path = os.path.join(tmp_dir, '{}.mov'.format(codec[0]))
+                subprocess.check_call(['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', 'testsrc=d=1:s=64x64:r=10',
+                                       '-f', 'lavfi', '-i', 'sine=d=1', '-vcodec', codec[0], '-acodec', codec[1], path])
+                assert util.is_mp4_compatible(path) == compatible
+                export_file = util.mov_to_mp4(path)
+                assert util.is_mp4_compatible(export_file)
+                codec_mp4 = codec if compatible else ['h264', 'aac']
+                assert util.get_media_info(export_file)['video_codec'] == codec_mp4[0]
+                assert util.get_media_info(export_file)['audio_codec'] == codec_mp4[1]
+                assert abs(util.get_media_info(export_file)['duration'] - 1) < 0.1
+                # stream copy into mp4 needs compatible codecs
+                output_file = os.path.join(tmp_dir, 'cut.mp4')
+                if compatible:
+                    util.cut_video_stream_copy(path, output_file, [[0, 0.5]])
+                    assert os.path.exists(output_file)
+                else:
+                    with self.assertRaises(ValueError):
+                        util.cut_video_stream_copy(path, output_file, [[0, 0.5]])
+
+    def test_decode_audio(self):
+        """ decode_audio gives same signal as pydub """
+        for sample in [sample_mp3, sample_wav, sample_mp4]:
+            (_, wave_array_np_list, _, frame_rate, _, channels), _ = util.load_file(sample, decoder='pydub')
+            wave, frame_rate_ffmpeg, channels_ffmpeg = util.decode_audio(sample)
+            assert (frame_rate, channels) == (frame_rate_ffmpeg, channels_ffmpeg)
+            assert wave.shape == (len(wave_array_np_list[0]), channels)
+            for c, w in enumerate(wave_array_np_list):
+                assert np.array_equal(w, wave[:, c])
+        # error message of ffmpeg is given for a broken file
+        with tempfile.NamedTemporaryFile(suffix='.mp3') as f:
+            f.write(b'not an audio file' * 4096)
+            f.flush()
+            with self.assertRaises(ValueError):
+                util.decode_audio(f.name, frame_rate=16000, channels=1, duration=1)
+
+    def test_probe_file(self):
+        """ probe_file/probe_keyframe with a path of space and shell metacharacter """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.makedirs(os.path.join(tmp_dir, 'sp ace'))
+            path_wav = os.path.join(tmp_dir, 'sp ace', "a b;'$(x).wav")
+            path_mp4 = os.path.join(tmp_dir, 'sp ace', 'a b.mp4')
+            shutil.copy(sample_wav, path_wav)
+            shutil.copy(sample_mp4, path_mp4)
+            assert util.get_media_info(path_wav) == util.get_media_info(sample_wav)
+            assert np.array_equal(util.probe_keyframe(path_mp4), util.probe_keyframe(sample_mp4))
+            editor = firstcut.Editor(path_wav)
+            assert editor.length == len(editor.wave_array_np_list[0])
+        with self.assertRaises(ValueError):
+            util.probe_file('./sample_data/unknown.wav')
+
+    def test_load_file_wav_memmap(self):
+        """ load_file_wav_memmap """
+        signal, frame_rate, _ = util.load_file_wav(sample_wav)
+        wave, frame_rate_memmap, channels = util.load_file_wav_memmap(sample_wav)
+        assert (frame_rate_memmap, channels) == (frame_rate, 1)
+        assert np.array_equal(wave[:, 0], np.round(signal * pow(2, 15)))
+        with open(sample_wav, 'rb') as f:
+            data = f.read()
+        offset = data.index(b'data') + 4
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'stream.wav')
+            for size in [0, 0xFFFFFFFF]:
+                # data size isn't given in the header of streamed wav file
+                with open(path, 'wb') as f:
+                    f.write(data[:offset] + size.to_bytes(4, 'little') + data[offset + 4:])
+                wave_stream, _, _ = util.load_file_wav_memmap(path)
+                assert np.array_equal(wave_stream, wave)
+            # empty data is not memory-mapped
+            with open(path, 'wb') as f:
+                f.write(data[:offset] + bytes(4))
+            assert util.load_file_wav_memmap(path) == (None, None, None)
+            # non-PCM wav file is not memory-mapped
+            sf.write(path, signal, frame_rate, subtype='FLOAT')
+            assert util.load_file_wav_memmap(path) == (None, None, None)
+
+    def test_snap_to_keyframe(self):
+        """ snap_to_keyframe """
+        interval, shift = util.snap_to_keyframe([[0, 1.1], [1.9, 3.5], [5.2, 5.6]], [0, 1, 2, 3, 4, 5], 0.3)
+        assert interval.tolist() == [[0, 1], [2, 3.5], [5, 5.6]]
+        assert abs(shift - [[0, -0.1], [0.1, 0], [-0.2, 0]]).max() < 1e-8
+        # start far from keyframes goes back to the previous keyframe
+        interval, shift = util.snap_to_keyframe([[2.5, 3.5], [5.5, 6]], [0, 1, 2, 3, 4, 5], 0.3)
+        assert interval.tolist() == [[2, 3.5], [5, 6]]
+        assert abs(shift - [[-0.5, 0], [-0.5, 0]]).max() < 1e-8
+        # overlapping intervals after snapping are merged, and the shift is of each boundary of the input intervals
+        interval, shift = util.snap_to_keyframe([[0, 1.1], [1.2, 3.5], [4.6, 4.7]], [0, 1, 2, 3, 4], 0.3)
+        assert interval.tolist() == [[0, 3.5], [4, 4.7]]
+        assert abs(shift - [[0, -0.1], [-0.2, 0], [-0.6, 0]]).max() < 1e-8
+        interval, shift = util.snap_to_keyframe([], [0, 1], 0.3)
+        assert interval.shape == shift.shape == (0, 2)
 
 
 if __name__ == "__main__":